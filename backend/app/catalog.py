@@ -0,0 +1,364 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import watchfiles
+except ImportError:  # optional: fall back to periodic rescans only
+    watchfiles = None
+
+from .encoders import match_image_filename
+
+logger = logging.getLogger(__name__)
+
+SORT_ORDERS = ("name", "recent", "images")
+# Sorts after every character a project name can contain
+_PREFIX_END = "\U0010ffff"
+
+
+@dataclass
+class ProjectInfo:
+    """Catalog entry of one project."""
+    name: str
+    image_count: int = 0
+    last_modified: float = 0.0
+
+
+@dataclass
+class _Entry:
+    info: ProjectInfo
+    # Directory mtime the image count was taken at; None forces a recount
+    dir_mtime: Optional[float] = None
+    # Bumped by every update from ProjectStorage, so a rescan that raced
+    # with one doesn't overwrite it with an older count
+    version: int = 0
+
+
+class _SortedKeys:
+    """Sorted list of unique tuples searchable by bisection.
+
+    Lookups are O(log n); inserts and removals shift the underlying list,
+    which for the few thousand keys of a catalog is a fast memmove.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple] = []
+
+    def add(self, key: Tuple) -> None:
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            self._keys.insert(i, key)
+
+    def discard(self, key: Tuple) -> None:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def prefixed(self, prefix: str) -> List[Tuple]:
+        """Keys whose first element starts with ``prefix``, in order."""
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + _PREFIX_END,), lo)
+        return self._keys[lo:hi]
+
+    def slice(self, start: int, stop: Optional[int]) -> List[Tuple]:
+        return self._keys[start:stop]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class ProjectCatalog:
+    """In-memory list of projects with their image count and last change.
+
+    Loaded from the storage directory on first use (or by ``start()`` at
+    startup) and then kept current by ProjectStorage as it creates projects
+    and adds or deletes images. Changes made outside this process are picked
+    up by a watcher on the storage directory when ``watchfiles`` is installed
+    and by periodic rescans, which only recount projects whose directory
+    mtime changed.
+
+    Besides the entries themselves it keeps sorted keys by name, by recent
+    activity and by image count, plus a suffix array of the lower-cased
+    names, so ``search()`` finds prefix and substring matches by bisection
+    instead of scanning every project.
+    """
+
+    def __init__(self, base_dir: Path, is_valid_name: Callable[[str], bool]):
+        self._base_dir = base_dir
+        self._is_valid_name = is_valid_name
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._by_name = _SortedKeys()
+        self._by_recent = _SortedKeys()
+        self._by_images = _SortedKeys()
+        self._suffixes = _SortedKeys()
+        self._loaded = False
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @staticmethod
+    def _sort_key(order: str, info: ProjectInfo) -> Tuple:
+        if order == "recent":
+            return (-info.last_modified, info.name)
+        if order == "images":
+            return (-info.image_count, info.name)
+        return (info.name.lower(), info.name)
+
+    def _index(self, info: ProjectInfo) -> None:
+        self._by_name.add(self._sort_key("name", info))
+        self._by_recent.add(self._sort_key("recent", info))
+        self._by_images.add(self._sort_key("images", info))
+        lowered = info.name.lower()
+        for start in range(1, len(lowered)):
+            self._suffixes.add((lowered[start:], info.name))
+
+    def _unindex(self, info: ProjectInfo) -> None:
+        self._by_name.discard(self._sort_key("name", info))
+        self._by_recent.discard(self._sort_key("recent", info))
+        self._by_images.discard(self._sort_key("images", info))
+        lowered = info.name.lower()
+        for start in range(1, len(lowered)):
+            self._suffixes.discard((lowered[start:], info.name))
+
+    def _rekey(self, old: ProjectInfo, new: ProjectInfo) -> None:
+        """Move a project's keys from ``old`` to ``new`` (lock held).
+
+        The name and its suffixes don't change; only the orders whose key
+        did are touched.
+        """
+        for order, keys in (("recent", self._by_recent), ("images", self._by_images)):
+            old_key, new_key = self._sort_key(order, old), self._sort_key(order, new)
+            if old_key != new_key:
+                keys.discard(old_key)
+                keys.add(new_key)
+
+    def _put(self, name: str, entry: _Entry) -> None:
+        """Insert or replace an entry (lock held)."""
+        current = self._entries.get(name)
+        self._entries[name] = entry
+        if current is not None:
+            self._rekey(current.info, entry.info)
+        else:
+            self._index(entry.info)
+
+    def _drop(self, name: str) -> None:
+        """Remove an entry if present (lock held)."""
+        current = self._entries.pop(name, None)
+        if current is not None:
+            self._unindex(current.info)
+
+    def _scan_project(self, path: Path) -> Optional[_Entry]:
+        try:
+            dir_mtime = path.stat().st_mtime
+            with os.scandir(path) as entries:
+                count = sum(1 for entry in entries if match_image_filename(entry.name))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return _Entry(ProjectInfo(path.name, count, dir_mtime), dir_mtime)
+
+    def _list_dirs(self) -> Dict[str, os.DirEntry]:
+        try:
+            with os.scandir(self._base_dir) as entries:
+                return {
+                    entry.name: entry for entry in entries
+                    if self._is_valid_name(entry.name) and entry.is_dir()
+                }
+        except FileNotFoundError:
+            return {}
+
+    def refresh(self) -> None:
+        """Rescan the storage directory, recounting projects that changed."""
+        dirs = self._list_dirs()
+        with self._lock:
+            snapshot = {name: (entry.dir_mtime, entry.version) for name, entry in self._entries.items()}
+
+        scanned: Dict[str, _Entry] = {}
+        for name, dir_entry in dirs.items():
+            known = snapshot.get(name)
+            try:
+                dir_mtime = dir_entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if known is not None and known[0] == dir_mtime:
+                continue
+            entry = self._scan_project(Path(dir_entry.path))
+            if entry is not None:
+                scanned[name] = entry
+
+        with self._lock:
+            # Only drop projects known before the scan started, not ones
+            # created while it ran
+            for name in snapshot:
+                if name not in dirs:
+                    self._drop(name)
+            for name, entry in scanned.items():
+                current = self._entries.get(name)
+                if current is not None and current.version != snapshot.get(name, (None, 0))[1]:
+                    # Updated while we were counting; recount next time
+                    current.dir_mtime = None
+                    continue
+                if current is not None:
+                    entry.version = current.version
+                self._put(name, entry)
+            self._loaded = True
+
+    def refresh_project(self, name: str) -> None:
+        """Re-read a single project, e.g. after the watcher saw it change."""
+        if not self._is_valid_name(name):
+            return
+        entry = self._scan_project(self._base_dir / name)
+        with self._lock:
+            if entry is None:
+                self._drop(name)
+            else:
+                current = self._entries.get(name)
+                entry.version = current.version + 1 if current else 0
+                self._put(name, entry)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.refresh()
+
+    def names(self) -> List[str]:
+        """Sorted project names."""
+        self._ensure_loaded()
+        with self._lock:
+            return sorted(self._entries)
+
+    def infos(self) -> List[ProjectInfo]:
+        """Copies of all entries, sorted by name."""
+        self._ensure_loaded()
+        with self._lock:
+            return [replace(self._entries[name].info) for name in sorted(self._entries)]
+
+    def get(self, name: str) -> Optional[ProjectInfo]:
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(name)
+            return replace(entry.info) if entry else None
+
+    def search(
+        self,
+        query: str = "",
+        match: str = "prefix",
+        sort: str = "name",
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[List[ProjectInfo], int]:
+        """Find projects whose name starts with (or contains) ``query``.
+
+        Matching is case-insensitive. Returns one page of entries in ``sort``
+        order (name, most recently changed first, or most images first) and
+        the total number of matches.
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        self._ensure_loaded()
+        needle = query.lower()
+        stop = offset + limit if limit is not None else None
+        with self._lock:
+            if not needle:
+                ordered = {"name": self._by_name, "recent": self._by_recent, "images": self._by_images}[sort]
+                total = len(ordered)
+                names = [key[-1] for key in ordered.slice(offset, stop)]
+            else:
+                names = [key[1] for key in self._by_name.prefixed(needle)]
+                if match == "substring":
+                    # Names containing the query somewhere after the start
+                    seen = set(names)
+                    for _, name in self._suffixes.prefixed(needle):
+                        if name not in seen:
+                            seen.add(name)
+                            names.append(name)
+                    names.sort(key=lambda name: self._sort_key("name", self._entries[name].info))
+                if sort != "name":
+                    names.sort(key=lambda name: self._sort_key(sort, self._entries[name].info))
+                total = len(names)
+                names = names[offset:stop]
+            return [replace(self._entries[name].info) for name in names], total
+
+    def add(self, name: str) -> None:
+        """Record a project directory that was just created (or found to exist)."""
+        with self._lock:
+            if name in self._entries:
+                return
+        entry = self._scan_project(self._base_dir / name)
+        if entry is None:
+            return
+        with self._lock:
+            if name not in self._entries:
+                self._put(name, entry)
+
+    def _update(self, name: str, delta: int) -> None:
+        path = self._base_dir / name
+        try:
+            dir_mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                old = replace(entry.info)
+                entry.info.image_count = max(0, entry.info.image_count + delta)
+                entry.info.last_modified = max(entry.info.last_modified, dir_mtime, time.time())
+                if entry.dir_mtime is not None:
+                    entry.dir_mtime = dir_mtime
+                entry.version += 1
+                self._rekey(old, entry.info)
+                return
+        # Not known yet (e.g. created by another process): a scan already
+        # includes this change
+        if self._loaded:
+            self.refresh_project(name)
+
+    def record_images(self, name: str, delta: int) -> None:
+        """Adjust a project's image count after images were added or deleted."""
+        self._update(name, delta)
+
+    def touch(self, name: str) -> None:
+        """Note a change to a project that doesn't affect its image count."""
+        self._update(name, 0)
+
+    def start(self, rescan_interval: float = 0) -> None:
+        """Load the catalog and start watching for changes made elsewhere."""
+        self.refresh()
+        self._stop.clear()
+        if watchfiles is not None:
+            self._start_thread("catalog-watcher", self._watch)
+        if rescan_interval > 0:
+            self._start_thread("catalog-rescan", self._rescan_loop, rescan_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def _start_thread(self, name: str, target, *args) -> None:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _rescan_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Project catalog rescan failed")
+
+    def _watch(self) -> None:
+        try:
+            # Only direct children: project folders appearing or disappearing
+            for changes in watchfiles.watch(
+                self._base_dir, watch_filter=None, recursive=False,
+                stop_event=self._stop, raise_interrupt=False,
+            ):
+                for name in {Path(path).name for _, path in changes}:
+                    self.refresh_project(name)
+        except Exception:
+            logger.exception("Project catalog watcher stopped; relying on rescans")
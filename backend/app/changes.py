@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from typing import Dict, Set
+
+
+class Subscription:
+    """Wake-up flag for one listener on one project."""
+
+    def __init__(self, notifier: "ChangeNotifier", project_name: str):
+        self._notifier = notifier
+        self.project_name = project_name
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def clear(self) -> None:
+        """Forget earlier wake-ups; call before looking for changes."""
+        self.event.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a change notification; False when ``timeout`` passed without one."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def close(self) -> None:
+        self._notifier._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ChangeNotifier:
+    """Wakes up async listeners (SSE streams) when a project changes.
+
+    ProjectStorage calls ``notify()`` from worker threads after recording a
+    change; listeners then read the change feed from the index. Changes made
+    by other processes aren't notified, so listeners also poll.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, project_name: str) -> Subscription:
+        """Start listening to a project; must be called on the event loop."""
+        subscription = Subscription(self, project_name)
+        with self._lock:
+            self._subscriptions.setdefault(project_name, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_name)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.project_name]
+
+    def notify(self, project_name: str) -> None:
+        """Wake up the listeners of a project; safe to call from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(project_name, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def listeners(self, project_name: str) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(project_name, ()))
@@ -0,0 +1,68 @@
+"""Command line tools working directly on the storage directory.
+
+    cd backend
+    python -m app.cli import PROJECT SOURCE [--readme] [--workers N]
+
+SOURCE is a directory (searched recursively) or a ZIP file. Images are
+numbered in natural filename order after the project's existing images.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from .config import BASE_DIR, IMPORT_WORKERS
+from .importer import import_path
+from .storage import ProjectStorage
+
+
+def _import(args: argparse.Namespace) -> int:
+    storage = ProjectStorage(base_dir=args.storage_dir)
+    if not storage.validate_project_name(args.project):
+        print(f"Invalid project name: {args.project}", file=sys.stderr)
+        return 2
+
+    def progress(done: int, total: int, name: str, error: Optional[str]) -> None:
+        status = f"failed: {error}" if error else "ok"
+        print(f"[{done}/{total}] {name} {status}", file=sys.stderr)
+
+    try:
+        result = import_path(
+            storage, args.project, args.source, args.readme, args.workers,
+            progress=None if args.quiet else progress,
+        )
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    for source, filename in result.imported:
+        print(f"{source} -> {filename}")
+    readme = ", README imported" if result.readme else ""
+    print(f"Imported {len(result.imported)} images into {args.project}, {len(result.errors)} failed{readme}")
+    for source, error in result.errors:
+        print(f"  {source}: {error}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage-dir", type=Path, default=BASE_DIR,
+                        help="storage directory (default: $STORAGE_DIR or ./data)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import images from a directory or ZIP file")
+    import_parser.add_argument("project")
+    import_parser.add_argument("source", type=Path)
+    import_parser.add_argument("--readme", action="store_true", help="also import README.md as the project README")
+    import_parser.add_argument("--workers", type=int, default=IMPORT_WORKERS,
+                               help=f"conversion processes (default {IMPORT_WORKERS})")
+    import_parser.add_argument("--quiet", action="store_true", help="don't report each image")
+    import_parser.set_defaults(handler=_import)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
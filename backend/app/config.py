@@ -10,9 +10,90 @@ CORS_ORIGINS = [
 ]
 
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
+UPLOAD_SPOOL_SIZE = 1024 * 1024  # uploads larger than this are spooled to disk
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", "100"))
 ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
 
+# Uploads are rejected from their header, before decoding, when larger than
+# this: a small PNG can otherwise expand to gigabytes of pixels
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", "100000000"))
+MAX_IMAGE_DIMENSION = int(os.environ.get("MAX_IMAGE_DIMENSION", "65500"))  # JPEG's own limit
+# Store images scaled down to fit in this many pixels on the longest side
+# (0 keeps the original size); JPEGs are then decoded at reduced resolution
+MAX_STORED_DIMENSION = int(os.environ.get("MAX_STORED_DIMENSION", "0"))
+
+# Thumbnail edge lengths in pixels; the first one is used by the image grid
+THUMBNAIL_SIZES = [int(size) for size in os.environ.get("THUMBNAIL_SIZES", "320").split(",")]
+THUMBNAIL_QUALITY = 80
+
+# Stored image format: "jpeg", "webp" or "png" (see app/encoders.py)
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "jpeg")
+# Store inputs that are already in the output format without re-encoding
+PASSTHROUGH = os.environ.get("PASSTHROUGH", "1") == "1"
+JPEG_QUALITY = int(os.environ.get("JPEG_QUALITY", "90"))
+JPEG_OPTIMIZE = os.environ.get("JPEG_OPTIMIZE", "0") == "1"
+JPEG_PROGRESSIVE = os.environ.get("JPEG_PROGRESSIVE", "0") == "1"
+WEBP_QUALITY = int(os.environ.get("WEBP_QUALITY", "85"))
+WEBP_LOSSLESS = os.environ.get("WEBP_LOSSLESS", "0") == "1"
+WEBP_METHOD = int(os.environ.get("WEBP_METHOD", "4"))
+PNG_COMPRESS_LEVEL = int(os.environ.get("PNG_COMPRESS_LEVEL", "6"))
+
+# Duplicate uploads (same bytes, or same pixels in another format):
+#   "link"  - store under a new number as a hard link to the existing file
+#   "reuse" - return the existing filename without storing anything
+#   "off"   - always decode and encode
+DEDUP_MODE = os.environ.get("DEDUP_MODE", "link")
+
+# "durable": fsync files and their directory before an image or README counts
+# as saved, so it survives a power loss; "fast": leave flushing to the OS
+DURABILITY = os.environ.get("DURABILITY", "durable")
+# Temp files older than this are left over from a crash and removed at startup
+# (younger ones may belong to another worker process still running)
+TEMP_FILE_MAX_AGE = float(os.environ.get("TEMP_FILE_MAX_AGE", "3600"))
+
+# Worker pools used to keep blocking work off the event loop
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", os.cpu_count() or 4))
+IMAGE_QUEUE_SIZE = int(os.environ.get("IMAGE_QUEUE_SIZE", "32"))
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "16"))
+IO_QUEUE_SIZE = int(os.environ.get("IO_QUEUE_SIZE", "256"))
+RETRY_AFTER_SECONDS = 1
+
+# Bulk imports (app/importer.py) convert images in this many processes
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", os.cpu_count() or 4))
+# Imports the HTTP endpoint runs at once (each with IMPORT_WORKERS
+# processes); further ones are refused with 503 + Retry-After
+MAX_CONCURRENT_IMPORTS = int(os.environ.get("MAX_CONCURRENT_IMPORTS", "1"))
+# Largest ZIP accepted by the import endpoint
+MAX_IMPORT_SIZE = int(os.environ.get("MAX_IMPORT_SIZE", str(2 * 1024 ** 3)))
+
+# Background jobs (app/jobs.py), e.g. thumbnails of new uploads, run in
+# this many threads per process
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_DELAY = 2.0  # seconds before the first retry, doubled for each further one
+JOB_LEASE_SECONDS = 300  # a running job is taken over after this long (its worker died)
+JOB_RETENTION_SECONDS = 24 * 3600  # done and failed jobs stay visible in /api/jobs this long
+JOB_POLL_SECONDS = 5  # workers look for jobs queued by other processes this often
+
+# Full rescans of the project catalog pick up folders added or changed by
+# other processes; 0 disables them (the watcher still runs if available)
+CATALOG_RESCAN_SECONDS = float(os.environ.get("CATALOG_RESCAN_SECONDS", "60"))
+
+# Change streams (SSE) recheck for changes made by other worker processes
+# this often, and send a keep-alive comment after this much silence
+CHANGES_POLL_SECONDS = float(os.environ.get("CHANGES_POLL_SECONDS", "2"))
+SSE_HEARTBEAT_SECONDS = 15
+
+# README searches rank a query's matches by BM25. A positive value ranks
+# only the most recently written this many (for very common terms on huge
+# instances); 0 ranks every match
+README_SEARCH_MAX_RANKED = int(os.environ.get("README_SEARCH_MAX_RANKED", "0"))
+
+# Similarity searches first fold in images saved or deleted by other worker
+# processes, at most this often
+SIMILARITY_SYNC_SECONDS = float(os.environ.get("SIMILARITY_SYNC_SECONDS", "5"))
+
 def ensure_base_dir():
     BASE_DIR.mkdir(parents=True, exist_ok=True)
     if not os.access(BASE_DIR, os.W_OK):
-        raise PermissionError(f"Cannot write to storage directory: {BASE_DIR}")
\ No newline at end of file
+        raise PermissionError(f"Cannot write to storage directory: {BASE_DIR}")
@@ -0,0 +1,38 @@
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def connect(db_path: Path, schema: str) -> Iterator[sqlite3.Connection]:
+    """Open an autocommit connection to ``db_path``, creating it with ``schema``.
+
+    Writers wait up to 30 seconds for another process's write lock.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.executescript(schema)
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Hold the database write lock; commit on success, roll back on error."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+@contextmanager
+def write(db_path: Path, schema: str) -> Iterator[sqlite3.Connection]:
+    """Open a connection holding the database write lock."""
+    with connect(db_path, schema) as conn, transaction(conn):
+        yield conn
@@ -0,0 +1,139 @@
+import re
+from typing import BinaryIO, Dict, Optional, Type
+
+from PIL import Image
+
+from .config import (
+    OUTPUT_FORMAT,
+    JPEG_QUALITY,
+    JPEG_OPTIMIZE,
+    JPEG_PROGRESSIVE,
+    WEBP_QUALITY,
+    WEBP_LOSSLESS,
+    WEBP_METHOD,
+    PNG_COMPRESS_LEVEL,
+)
+
+MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+    "png": "image/png",
+}
+# Stored images are named N.<ext>; which extensions count is up to ENCODERS
+_NUMBERED_FILENAME_RE = re.compile(r'^(\d+)\.([a-z0-9]+)$')
+
+
+class Encoder:
+    """Writes decoded images in the format images are stored in.
+
+    Subclasses set the Pillow format name, the file extension used for stored
+    images and whether an alpha channel can be kept. Inputs already in the
+    stored format and in an accepted mode are passed through byte-for-byte.
+    """
+
+    name = ""
+    pil_format = ""
+    extension = ""
+    supports_alpha = False
+    passthrough_modes: tuple = ()
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.extension]
+
+    def can_passthrough(self, image: Image.Image) -> bool:
+        """Whether the undecoded input can be stored unchanged."""
+        return image.format == self.pil_format and image.mode in self.passthrough_modes
+
+    def encode(self, image: Image.Image, fp: BinaryIO) -> None:
+        raise NotImplementedError
+
+
+class JpegEncoder(Encoder):
+    name = "jpeg"
+    pil_format = "JPEG"
+    extension = "jpg"
+    passthrough_modes = ("RGB", "L")
+
+    def __init__(self, quality: int = JPEG_QUALITY, optimize: bool = JPEG_OPTIMIZE,
+                 progressive: bool = JPEG_PROGRESSIVE):
+        self.quality = quality
+        self.optimize = optimize
+        self.progressive = progressive
+
+    def encode(self, image: Image.Image, fp: BinaryIO) -> None:
+        image.save(fp, "JPEG", quality=self.quality, optimize=self.optimize,
+                   progressive=self.progressive)
+
+
+class WebpEncoder(Encoder):
+    name = "webp"
+    pil_format = "WEBP"
+    extension = "webp"
+    supports_alpha = True
+    passthrough_modes = ("RGB", "RGBA")
+
+    def __init__(self, quality: int = WEBP_QUALITY, lossless: bool = WEBP_LOSSLESS,
+                 method: int = WEBP_METHOD):
+        self.quality = quality
+        self.lossless = lossless
+        self.method = method
+
+    def encode(self, image: Image.Image, fp: BinaryIO) -> None:
+        image.save(fp, "WEBP", quality=self.quality, lossless=self.lossless, method=self.method)
+
+
+class PngEncoder(Encoder):
+    name = "png"
+    pil_format = "PNG"
+    extension = "png"
+    supports_alpha = True
+    passthrough_modes = ("RGB", "RGBA", "L", "LA", "P")
+
+    def __init__(self, compress_level: int = PNG_COMPRESS_LEVEL):
+        self.compress_level = compress_level
+
+    def encode(self, image: Image.Image, fp: BinaryIO) -> None:
+        image.save(fp, "PNG", compress_level=self.compress_level)
+
+
+# Additional formats (e.g. AVIF through a Pillow plugin) register here
+ENCODERS: Dict[str, Type[Encoder]] = {
+    JpegEncoder.name: JpegEncoder,
+    WebpEncoder.name: WebpEncoder,
+    PngEncoder.name: PngEncoder,
+}
+
+
+def register_encoder(encoder_class: Type[Encoder]) -> None:
+    """Make an encoder selectable through OUTPUT_FORMAT.
+
+    Images stored with its extension are indexed, listed and served like
+    the built-in formats.
+    """
+    ENCODERS[encoder_class.name] = encoder_class
+    MEDIA_TYPES.setdefault(encoder_class.extension, f"image/{encoder_class.extension}")
+
+
+def match_image_filename(filename: str) -> Optional[re.Match]:
+    """Match a stored image name, ``N.<ext>`` with an encoder's extension.
+
+    Group 1 is the number, group 2 the extension; None for other names.
+    """
+    match = _NUMBERED_FILENAME_RE.match(filename)
+    if match and any(encoder.extension == match.group(2) for encoder in ENCODERS.values()):
+        return match
+    return None
+
+
+def get_encoder(name: str = OUTPUT_FORMAT) -> Encoder:
+    """Build the configured encoder."""
+    try:
+        return ENCODERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown output format: {name}")
+
+
+def media_type_for(filename: str) -> str:
+    """Media type of a stored image from its extension."""
+    return MEDIA_TYPES.get(filename.rsplit(".", 1)[-1].lower(), "application/octet-stream")
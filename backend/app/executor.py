@@ -0,0 +1,68 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .config import IMAGE_WORKERS, IMAGE_QUEUE_SIZE, IO_WORKERS, IO_QUEUE_SIZE
+
+
+class ExecutorBusy(Exception):
+    """Raised when a worker pool has no free queue slots."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} pool is busy")
+        self.name = name
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded queue for running blocking calls from async code.
+
+    At most ``max_workers`` calls run at once and at most ``max_pending`` more
+    wait for a worker; anything beyond that is rejected with ``ExecutorBusy``
+    instead of piling up behind the pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-worker",
+                )
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func`` in the pool and wait for its result."""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusy(self.name)
+        try:
+            future = self._get_executor().submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        # Release the slot when the work is actually done, not when the
+        # awaiting request goes away.
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads; the pool is recreated on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# CPU-heavy image decoding/encoding (Pillow releases the GIL while it works)
+image_pool = BoundedExecutor("image", IMAGE_WORKERS, IMAGE_QUEUE_SIZE)
+# Filesystem calls: stat, directory listing, small reads and writes
+io_pool = BoundedExecutor("io", IO_WORKERS, IO_QUEUE_SIZE)
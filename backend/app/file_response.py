@@ -0,0 +1,139 @@
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Read size when the server can't send files itself (uvicorn, which we run)
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a Range header into an inclusive ``(start, end)`` byte range.
+
+    Returns None when the header should be ignored and the whole file sent:
+    other units, syntax errors and multiple ranges (which a server may
+    decline to serve as multipart/byteranges). Raises RangeNotSatisfiable
+    when the range lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec or "," in spec:
+        return None
+    match = _RANGE_RE.match(spec)
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """Serve a file, or a single byte range of it.
+
+    The file is read in worker threads and sent in CHUNK_SIZE pieces, which
+    is what happens under uvicorn. ASGI servers offering the
+    ``http.response.zerocopysend`` or (for whole files)
+    ``http.response.pathsend`` extension are handed the file instead.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        stat_result: os.stat_result,
+        media_type: str,
+        headers: Optional[Mapping[str, str]] = None,
+    ):
+        self.path = path
+        self.stat_result = stat_result
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers.setdefault("accept-ranges", "bytes")
+
+    def _if_range_matches(self, if_range: str) -> bool:
+        """Whether an If-Range validator still matches this file."""
+        if_range = if_range.strip()
+        if if_range.startswith('"'):
+            return if_range == self.headers.get("etag")
+        return if_range == formatdate(self.stat_result.st_mtime, usegmt=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        size = self.stat_result.st_size
+        request_headers = Headers(scope=scope)
+        byte_range = None
+        range_header = request_headers.get("range")
+        if range_header is not None:
+            if_range = request_headers.get("if-range")
+            if if_range is None or self._if_range_matches(if_range):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except RangeNotSatisfiable:
+                    response = Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+                    await response(scope, receive, send)
+                    return
+
+        if byte_range is None:
+            status, start, length = 200, 0, size
+        else:
+            status, start, length = 206, byte_range[0], byte_range[1] - byte_range[0] + 1
+            self.headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+        self.headers["content-length"] = str(length)
+
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": length,
+                    "more_body": False,
+                })
+        elif "http.response.pathsend" in extensions and status == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            await self._send_chunks(send, start, length)
+
+    async def _send_chunks(self, send: Send, start: int, length: int) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            file.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(file.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break  # file shrank; never the case for stored images
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            file.close()
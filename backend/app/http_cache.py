@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from .file_response import RangeFileResponse
+
+# Image numbers are never reused, so a given image URL always has the same bytes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Mutable resources may be cached but must be revalidated on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Build a strong ETag for a file that is never rewritten in place."""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current representation."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= since
+    return False
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def cached_file_response(
+    request: Request,
+    path: Path,
+    stat_result: os.stat_result,
+    media_type: str,
+) -> Response:
+    """Serve an immutable file with validators, answering 304 when the client is current.
+
+    Range requests get 206 responses (see RangeFileResponse).
+    """
+    headers = {
+        "ETag": file_etag(stat_result),
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+    if is_not_modified(request, headers["ETag"], stat_result.st_mtime):
+        return not_modified_response(headers)
+    return RangeFileResponse(path, stat_result, media_type, headers=headers)
+
+
+def cached_json_response(request: Request, content: Any) -> Response:
+    """Serve JSON with a content-derived ETag so unchanged data costs a 304."""
+    body = json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
+    return Response(content=body, media_type="application/json", headers=headers)
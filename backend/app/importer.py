@@ -0,0 +1,204 @@
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import ALLOWED_EXTENSIONS, IMPORT_WORKERS, MAX_FILE_SIZE
+from .encoders import Encoder
+from .storage import PreparedImage, ProjectStorage
+
+README_NAME = "readme.md"
+# Folders other tools leave in archives
+IGNORED_DIRS = {"__MACOSX"}
+
+# Called after each image with (done, total, source name, error or None)
+Progress = Callable[[int, int, str, Optional[str]], None]
+
+
+@dataclass
+class ImportSource:
+    """A file to import: a file on disk, or ``member`` of the ZIP archive at ``path``."""
+    name: str
+    path: Path
+    member: Optional[str] = None
+
+    def read(self, limit: int = MAX_FILE_SIZE, archive: Optional[zipfile.ZipFile] = None) -> bytes:
+        """Read the file, refusing more than ``limit`` bytes.
+
+        ``archive`` is an already open ZipFile of ``path``; opening one per
+        member would re-read the central directory every time.
+        """
+        if self.member is None:
+            with open(self.path, "rb") as f:
+                data = f.read(limit + 1)
+        elif archive is not None:
+            with archive.open(self.member) as f:
+                data = f.read(limit + 1)
+        else:
+            with zipfile.ZipFile(self.path) as archive, archive.open(self.member) as f:
+                data = f.read(limit + 1)
+        if len(data) > limit:
+            raise ValueError("File too large")
+        return data
+
+
+@dataclass
+class ImportResult:
+    # (source name, stored filename) in import order
+    imported: List[Tuple[str, str]] = field(default_factory=list)
+    # (source name, error message)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+    readme: bool = False
+
+
+def _natural_key(name: str) -> list:
+    """Sort key putting ``shot2.png`` before ``shot10.png``."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def _select(sources: Iterable[ImportSource]) -> Tuple[List[ImportSource], Optional[ImportSource]]:
+    """Pick the images (in natural name order) and the top-most README."""
+    images = []
+    readme = None
+    for source in sources:
+        parts = PurePosixPath(source.name).parts
+        if any(part.startswith(".") or part in IGNORED_DIRS for part in parts):
+            continue
+        if parts[-1].lower() == README_NAME:
+            if readme is None or len(parts) < len(PurePosixPath(readme.name).parts):
+                readme = source
+        elif PurePosixPath(parts[-1]).suffix.lower() in ALLOWED_EXTENSIONS:
+            images.append(source)
+    images.sort(key=lambda source: _natural_key(source.name))
+    return images, readme
+
+
+def scan_directory(path: Path) -> Tuple[List[ImportSource], Optional[ImportSource]]:
+    """Images and README found in a directory tree."""
+    sources = []
+    for root, dirs, files in os.walk(path):
+        for filename in files:
+            file_path = Path(root) / filename
+            sources.append(ImportSource(file_path.relative_to(path).as_posix(), file_path))
+    return _select(sources)
+
+
+def scan_zip(path: Path) -> Tuple[List[ImportSource], Optional[ImportSource]]:
+    """Images and README in a ZIP archive; only the central directory is read."""
+    with zipfile.ZipFile(path) as archive:
+        members = [info.filename for info in archive.infolist() if not info.is_dir()]
+    return _select(ImportSource(member, path, member) for member in members)
+
+
+# Archives opened by this worker process, which lives for one import
+_worker_archives: Dict[Path, zipfile.ZipFile] = {}
+
+
+def _read(source: ImportSource, archives: Dict[Path, zipfile.ZipFile]) -> bytes:
+    """Read a source, reusing (and caching) open archives."""
+    archive = None
+    if source.member is not None:
+        archive = archives.get(source.path)
+        if archive is None:
+            archive = archives[source.path] = zipfile.ZipFile(source.path)
+    return source.read(archive=archive)
+
+
+def _prepare(
+    base_dir: Path, encoder: Encoder, durable: bool, project_name: str, source: ImportSource
+) -> PreparedImage:
+    """Convert one image to its stored form; runs in a worker process."""
+    storage = ProjectStorage(base_dir=base_dir, encoder=encoder, durable=durable)
+    return storage.prepare_image(project_name, _read(source, _worker_archives))
+
+
+def import_images(
+    storage: ProjectStorage,
+    project_name: str,
+    images: List[ImportSource],
+    readme: Optional[ImportSource] = None,
+    workers: int = IMPORT_WORKERS,
+    progress: Optional[Progress] = None,
+) -> ImportResult:
+    """Convert images in parallel and store them with one number reservation.
+
+    Each image goes through ``ProjectStorage.prepare_image``, the conversion
+    behind ``save_image``, in a pool of ``workers`` processes (in this
+    process when ``workers`` is 1). Images that fail are reported and
+    skipped; the rest are committed together, numbered in input order.
+    """
+    storage.create_project(project_name)
+    result = ImportResult()
+    prepared: List[Optional[PreparedImage]] = [None] * len(images)
+    errors: List[Optional[str]] = [None] * len(images)
+    done = 0
+
+    def finish(i: int, outcome) -> None:
+        nonlocal done
+        try:
+            prepared[i] = outcome()
+        except Exception as e:
+            errors[i] = str(e) or type(e).__name__
+        done += 1
+        if progress is not None:
+            progress(done, len(images), images[i].name, errors[i])
+
+    try:
+        if workers > 1 and len(images) > 1:
+            # spawn: forking a server process with running threads isn't safe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(min(workers, len(images)), mp_context=context) as pool:
+                futures = {
+                    pool.submit(_prepare, storage.base_dir, storage.encoder, storage.durable, project_name, source): i
+                    for i, source in enumerate(images)
+                }
+                for future in as_completed(futures):
+                    finish(futures[future], future.result)
+        else:
+            archives: Dict[Path, zipfile.ZipFile] = {}
+            try:
+                for i, source in enumerate(images):
+                    finish(i, lambda: storage.prepare_image(project_name, _read(source, archives)))
+            finally:
+                for archive in archives.values():
+                    archive.close()
+
+        ready = [(source, item) for source, item in zip(images, prepared) if item is not None]
+        if ready:
+            filenames = storage.commit_images(project_name, [item for _, item in ready])
+            result.imported = [(source.name, filename) for (source, _), filename in zip(ready, filenames)]
+        result.errors = [(source.name, error) for source, error in zip(images, errors) if error is not None]
+    finally:
+        for item in prepared:
+            if item is not None:
+                storage.discard_prepared(item)
+
+    if readme is not None:
+        storage.write_readme(project_name, readme.read().decode("utf-8", errors="replace"))
+        result.readme = True
+    return result
+
+
+def import_path(
+    storage: ProjectStorage,
+    project_name: str,
+    path: Path,
+    include_readme: bool = False,
+    workers: int = IMPORT_WORKERS,
+    progress: Optional[Progress] = None,
+) -> ImportResult:
+    """Import the images (and optionally the README) of a directory or ZIP file."""
+    path = Path(path)
+    if path.is_dir():
+        images, readme = scan_directory(path)
+    elif zipfile.is_zipfile(path):
+        images, readme = scan_zip(path)
+    else:
+        raise ValueError(f"Not a directory or ZIP file: {path}")
+    return import_images(
+        storage, project_name, images, readme if include_readme else None, workers, progress,
+    )
@@ -0,0 +1,531 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from .db import connect, transaction
+from .encoders import match_image_filename
+
+SCHEMA_VERSION = 2
+# Change feed entries kept per project; clients further behind start over
+CHANGES_RETAINED = 10000
+# Seconds a writer may take between announcing a file change and recording
+# it; after that the change counts as out-of-band (its writer died)
+PENDING_TIMEOUT = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    number INTEGER PRIMARY KEY,
+    size INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    ext TEXT NOT NULL DEFAULT 'jpg'
+);
+CREATE TABLE IF NOT EXISTS image_hashes (
+    number INTEGER PRIMARY KEY,
+    raw_hash TEXT,
+    pixel_hash TEXT,
+    dhash INTEGER
+);
+CREATE INDEX IF NOT EXISTS image_hashes_raw ON image_hashes (raw_hash);
+CREATE INDEX IF NOT EXISTS image_hashes_pixel ON image_hashes (pixel_hash);
+CREATE TABLE IF NOT EXISTS pending (
+    number INTEGER PRIMARY KEY,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    number INTEGER,
+    ext TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_number ON changes (number);
+"""
+
+
+class ImageIndex:
+    """SQLite-backed index of the images stored in one project directory.
+
+    The database lives outside the project directory, so the directory mtime
+    only changes when image files (or the README) are added or removed. The
+    mtime recorded after each indexed change is compared against the live one
+    to detect out-of-band edits, in which case the index is rebuilt from disk.
+    Writers announce the files they are about to link or unlink (``pending``)
+    before touching the directory, so a read in between doesn't mistake
+    their change for an out-of-band one.
+
+    Every change is also appended to a change feed ("add", "delete" or
+    "readme" with an increasing sequence number) in the same transaction, so
+    clients can catch up with ``changes_since()`` instead of relisting.
+    """
+
+    def __init__(self, db_path: Path, project_path: Path):
+        self._db_path = db_path
+        self._project_path = project_path
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with connect(self._db_path, SCHEMA) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                with transaction(conn):
+                    self._migrate(conn)
+            yield conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+        if 'ext' not in columns:
+            # Indexes from before configurable output formats only had JPEGs
+            conn.execute("ALTER TABLE images ADD COLUMN ext TEXT NOT NULL DEFAULT 'jpg'")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(image_hashes)")}
+        if 'dhash' not in columns:
+            # Perceptual hashes came later; set_dhash() backfills them
+            conn.execute("ALTER TABLE image_hashes ADD COLUMN dhash INTEGER")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection holding the database write lock."""
+        with self._connect() as conn, transaction(conn):
+            yield conn
+
+    def _dir_mtime(self) -> int:
+        try:
+            return self._project_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _get_meta(conn: sqlite3.Connection, key: str, default: int = 0) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value: int) -> None:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    @staticmethod
+    def _record(conn: sqlite3.Connection, kind: str, number: Optional[int] = None,
+                ext: Optional[str] = None) -> None:
+        """Append to the change feed, dropping entries beyond CHANGES_RETAINED.
+
+        An image change repeating the image's latest one (a rebuild and the
+        commit it raced both reporting an add) is left out.
+        """
+        if number is not None:
+            latest = conn.execute(
+                "SELECT kind, ext FROM changes WHERE number = ? ORDER BY seq DESC LIMIT 1", (number,)
+            ).fetchone()
+            if latest == (kind, ext):
+                return
+        seq = conn.execute(
+            "INSERT INTO changes (kind, number, ext) VALUES (?, ?, ?)", (kind, number, ext)
+        ).lastrowid
+        conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGES_RETAINED,))
+
+    @staticmethod
+    def _dhash_to_db(dhash: Optional[int]) -> Optional[int]:
+        """Unsigned 64-bit hash as the signed integer SQLite can store."""
+        if dhash is None or dhash < 1 << 63:
+            return dhash
+        return dhash - (1 << 64)
+
+    @staticmethod
+    def _dhash_from_db(value: Optional[int]) -> Optional[int]:
+        return None if value is None else value & 0xFFFFFFFFFFFFFFFF
+
+    def _is_stale(self, conn: sqlite3.Connection) -> bool:
+        if self._get_meta(conn, 'dir_mtime', -1) == self._dir_mtime():
+            return False
+        # A writer between changing the directory and recording it
+        in_flight = conn.execute(
+            "SELECT 1 FROM pending WHERE started > ? LIMIT 1", (time.time() - PENDING_TIMEOUT,)
+        ).fetchone()
+        return in_flight is None
+
+    def _rebuild(self, conn: sqlite3.Connection) -> None:
+        """Re-read the project directory into the index (write lock held).
+
+        Files whose size and mtime match their record keep its dimensions;
+        only new or changed files are opened.
+        """
+        dir_mtime = self._dir_mtime()
+        known = {
+            number: (size, mtime, ext, width, height)
+            for number, size, mtime, ext, width, height in conn.execute(
+                "SELECT number, size, mtime, ext, width, height FROM images"
+            )
+        }
+        records = []
+        try:
+            entries = list(os.scandir(self._project_path))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            match = match_image_filename(entry.name)
+            if not match or not entry.is_file():
+                continue
+            number, ext = int(match.group(1)), match.group(2)
+            stat = entry.stat()
+            record = known.get(number)
+            if record is not None and record[:3] == (stat.st_size, stat.st_mtime, ext):
+                width, height = record[3:]
+            else:
+                try:
+                    with Image.open(entry.path) as image:
+                        width, height = image.size
+                except Exception:
+                    width, height = 0, 0
+            records.append((number, stat.st_size, width, height, stat.st_mtime, ext))
+
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS scanned "
+            "(number INTEGER PRIMARY KEY, size INTEGER, width INTEGER, height INTEGER, "
+            "mtime REAL, ext TEXT)"
+        )
+        conn.execute("DELETE FROM scanned")
+        # OR IGNORE: should N.jpg and N.png both exist, the first one wins
+        conn.executemany(
+            "INSERT OR IGNORE INTO scanned (number, size, width, height, mtime, ext) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            records,
+        )
+        if self._get_meta(conn, 'dir_mtime', -1) != -1:
+            # Report what changed behind our back; a first build has no
+            # earlier state to compare with
+            deleted = conn.execute(
+                "SELECT number, ext FROM images WHERE number NOT IN (SELECT number FROM scanned) "
+                "ORDER BY number"
+            ).fetchall()
+            added = conn.execute(
+                "SELECT s.number, s.ext FROM scanned s LEFT JOIN images i ON i.number = s.number "
+                "WHERE i.number IS NULL OR i.size != s.size OR i.mtime != s.mtime OR i.ext != s.ext "
+                "ORDER BY s.number"
+            ).fetchall()
+            for number, ext in deleted:
+                self._record(conn, 'delete', number, ext)
+            for number, ext in added:
+                self._record(conn, 'add', number, ext)
+        # Hashes only stay valid for files that are still there, unchanged
+        conn.execute(
+            "DELETE FROM image_hashes WHERE number NOT IN ("
+            "SELECT s.number FROM scanned s JOIN images i "
+            "ON i.number = s.number AND i.size = s.size AND i.mtime = s.mtime)"
+        )
+        conn.execute("DELETE FROM images")
+        conn.execute(
+            "INSERT INTO images (number, size, width, height, mtime, ext) "
+            "SELECT number, size, width, height, mtime, ext FROM scanned"
+        )
+        conn.execute("DROP TABLE scanned")
+        # Numbers are never reused, so keep the high-water mark even if the
+        # newest images were deleted.
+        max_num = max((record[0] for record in records), default=0)
+        next_number = max(self._get_meta(conn, 'next_number', 1), max_num + 1)
+        self._set_meta(conn, 'next_number', next_number)
+        self._set_meta(conn, 'dir_mtime', dir_mtime)
+        # Announcements whose writer gave up are accounted for by now
+        conn.execute("DELETE FROM pending WHERE started <= ?", (time.time() - PENDING_TIMEOUT,))
+
+    def _ensure_fresh(self, conn: sqlite3.Connection) -> None:
+        if self._is_stale(conn):
+            self._rebuild(conn)
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection on an up-to-date index."""
+        with self._connect() as conn:
+            if self._is_stale(conn):
+                with transaction(conn):
+                    self._ensure_fresh(conn)
+            yield conn
+
+    def rebuild(self) -> None:
+        """Rebuild the index from the project directory."""
+        with self._write() as conn:
+            self._rebuild(conn)
+
+    def refresh(self) -> None:
+        """Rebuild the index if the project directory changed behind its back."""
+        with self._read():
+            pass
+
+    def next_number(self) -> int:
+        """Return the next image number without reserving it."""
+        with self._read() as conn:
+            return self._get_meta(conn, 'next_number', 1)
+
+    def reserve_numbers(self, count: int = 1) -> int:
+        """Reserve a contiguous block of image numbers and return the first.
+
+        The numbers are pending until ``add()`` records them or
+        ``release()`` gives them up.
+        """
+        with self._write() as conn:
+            self._ensure_fresh(conn)
+            first = self._get_meta(conn, 'next_number', 1)
+            self._set_meta(conn, 'next_number', first + count)
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO pending (number, started) VALUES (?, ?)",
+                [(number, now) for number in range(first, first + count)],
+            )
+            return first
+
+    def expect_removal(self, number: int) -> None:
+        """Announce that an image file is about to be unlinked; ``remove()`` follows."""
+        with self._write() as conn:
+            self._ensure_fresh(conn)
+            conn.execute("INSERT OR REPLACE INTO pending (number, started) VALUES (?, ?)", (number, time.time()))
+
+    def release(self, numbers: List[int]) -> None:
+        """Drop the pending state of numbers whose file change didn't happen."""
+        with self._write() as conn:
+            conn.executemany("DELETE FROM pending WHERE number = ?", [(number,) for number in numbers])
+
+    def add(
+        self,
+        number: int,
+        size: int,
+        width: int,
+        height: int,
+        mtime: float,
+        ext: str = 'jpg',
+        raw_hash: Optional[str] = None,
+        pixel_hash: Optional[str] = None,
+        dhash: Optional[int] = None,
+    ) -> None:
+        """Record an image that has just been written to the project directory."""
+        self.add_many([{
+            'number': number, 'size': size, 'width': width, 'height': height, 'mtime': mtime,
+            'ext': ext, 'raw_hash': raw_hash, 'pixel_hash': pixel_hash, 'dhash': dhash,
+        }])
+
+    def add_many(self, images: List[Dict[str, Any]]) -> None:
+        """Record several new images in one transaction.
+
+        Each dict has ``add()``'s arguments as keys; the hashes may be left out.
+        """
+        if not images:
+            return
+        with self._write() as conn:
+            next_number = self._get_meta(conn, 'next_number', 1)
+            for image in images:
+                number, ext = image['number'], image.get('ext', 'jpg')
+                conn.execute(
+                    "INSERT OR REPLACE INTO images (number, size, width, height, mtime, ext) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (number, image['size'], image['width'], image['height'], image['mtime'], ext),
+                )
+                raw_hash, pixel_hash, dhash = image.get('raw_hash'), image.get('pixel_hash'), image.get('dhash')
+                if raw_hash or pixel_hash or dhash is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO image_hashes (number, raw_hash, pixel_hash, dhash) "
+                        "VALUES (?, ?, ?, ?)",
+                        (number, raw_hash, pixel_hash, self._dhash_to_db(dhash)),
+                    )
+                next_number = max(next_number, number + 1)
+                self._record(conn, 'add', number, ext)
+                conn.execute("DELETE FROM pending WHERE number = ?", (number,))
+            self._set_meta(conn, 'next_number', next_number)
+            self._set_meta(conn, 'dir_mtime', self._dir_mtime())
+
+    def remove(self, number: int) -> None:
+        """Forget an image that has just been removed from the project directory."""
+        with self._write() as conn:
+            row = conn.execute("SELECT ext FROM images WHERE number = ?", (number,)).fetchone()
+            conn.execute("DELETE FROM images WHERE number = ?", (number,))
+            conn.execute("DELETE FROM image_hashes WHERE number = ?", (number,))
+            if row:
+                self._record(conn, 'delete', number, row[0])
+            conn.execute("DELETE FROM pending WHERE number = ?", (number,))
+            self._set_meta(conn, 'dir_mtime', self._dir_mtime())
+
+    def mark_synced(self, change: Optional[str] = None) -> None:
+        """Accept the current directory mtime after a non-image change.
+
+        ``change`` (e.g. "readme") is recorded in the change feed.
+        """
+        with self._write() as conn:
+            if change:
+                self._record(conn, change)
+            self._set_meta(conn, 'dir_mtime', self._dir_mtime())
+
+    def change_seq(self) -> int:
+        """Sequence number of the latest change (0 before the first one)."""
+        with self._read() as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, since: int, limit: int) -> Dict[str, Any]:
+        """Return up to ``limit`` changes after sequence number ``since``.
+
+        ``seq`` is the number to pass as ``since`` next time. ``reset`` is
+        set when the changes after ``since`` are no longer all retained (or
+        ``since`` is from before the index was recreated); the caller then
+        has to reload everything and continue from ``seq``.
+        """
+        with self._read() as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            latest = row[0] if row else 0
+            oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if since > latest or (oldest is not None and since < oldest - 1):
+                return {'seq': latest, 'reset': True, 'more': False, 'changes': []}
+            rows = conn.execute(
+                "SELECT seq, kind, number, ext FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (since, limit + 1),
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = [
+            {'seq': seq, 'kind': kind, 'number': number, 'ext': ext}
+            for seq, kind, number, ext in rows
+        ]
+        return {
+            'seq': rows[-1][0] if rows else latest,
+            'reset': False,
+            'more': more,
+            'changes': changes,
+        }
+
+    def get_many(self, numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Return the records of several images by number (missing ones are left out)."""
+        rows = []
+        with self._read() as conn:
+            # Stay under SQLite's limit on bound parameters
+            for start in range(0, len(numbers), 500):
+                chunk = numbers[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(conn.execute(
+                    f"SELECT number, size, width, height, mtime, ext FROM images WHERE number IN ({placeholders})",
+                    chunk,
+                ).fetchall())
+        return {row[0]: self._to_record(row) for row in rows}
+
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        """Return the record of a single image."""
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT number, size, width, height, mtime, ext FROM images WHERE number = ?",
+                (number,),
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    def find_by_hash(
+        self,
+        raw_hash: Optional[str] = None,
+        pixel_hash: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return the record and hashes of an image with a matching content hash."""
+        if raw_hash:
+            column, value = "raw_hash", raw_hash
+        elif pixel_hash:
+            column, value = "pixel_hash", pixel_hash
+        else:
+            return None
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT i.number, i.size, i.width, i.height, i.mtime, i.ext, h.raw_hash, h.pixel_hash, h.dhash "
+                "FROM image_hashes h JOIN images i ON i.number = h.number "
+                f"WHERE h.{column} = ? ORDER BY i.number LIMIT 1",
+                (value,),
+            ).fetchone()
+        if not row:
+            return None
+        record = self._to_record(row[:6])
+        record['raw_hash'], record['pixel_hash'] = row[6], row[7]
+        record['dhash'] = self._dhash_from_db(row[8])
+        return record
+
+    def get_dhash(self, number: int) -> Optional[int]:
+        """Perceptual hash of an image, None if not computed (yet)."""
+        with self._read() as conn:
+            row = conn.execute("SELECT dhash FROM image_hashes WHERE number = ?", (number,)).fetchone()
+        return self._dhash_from_db(row[0]) if row else None
+
+    def set_dhash(self, number: int, dhash: int) -> None:
+        """Store the perceptual hash of an image indexed without one."""
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM images WHERE number = ?", (number,)).fetchone() is None:
+                return  # deleted meanwhile
+            conn.execute(
+                "INSERT INTO image_hashes (number, dhash) VALUES (?, ?) "
+                "ON CONFLICT(number) DO UPDATE SET dhash = excluded.dhash",
+                (number, self._dhash_to_db(dhash)),
+            )
+
+    def dhashes(self) -> List[Tuple[int, str, int]]:
+        """(number, ext, perceptual hash) of every image that has one."""
+        with self._read() as conn:
+            rows = conn.execute(
+                "SELECT i.number, i.ext, h.dhash FROM images i JOIN image_hashes h ON h.number = i.number "
+                "WHERE h.dhash IS NOT NULL ORDER BY i.number"
+            ).fetchall()
+        return [(number, ext, self._dhash_from_db(dhash)) for number, ext, dhash in rows]
+
+    def missing_dhashes(self) -> List[Dict[str, Any]]:
+        """Records of the images without a perceptual hash."""
+        with self._read() as conn:
+            rows = conn.execute(
+                "SELECT i.number, i.size, i.width, i.height, i.mtime, i.ext FROM images i "
+                "LEFT JOIN image_hashes h ON h.number = i.number WHERE h.dhash IS NULL ORDER BY i.number"
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return all indexed images ordered by number."""
+        with self._read() as conn:
+            rows = conn.execute(
+                "SELECT number, size, width, height, mtime, ext FROM images ORDER BY number"
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def page(self, limit: int, cursor: Optional[int] = None, descending: bool = False) -> Dict[str, Any]:
+        """Return up to ``limit`` images after ``cursor`` plus the total count.
+
+        The cursor is the last image number of the previous page; ``next_cursor``
+        is None once the listing is exhausted.
+        """
+        order = "DESC" if descending else "ASC"
+        where = ""
+        params: List[Any] = []
+        if cursor is not None:
+            where = "WHERE number < ?" if descending else "WHERE number > ?"
+            params.append(cursor)
+        with self._read() as conn:
+            # Fetch one extra row to learn whether another page follows
+            rows = conn.execute(
+                f"SELECT number, size, width, height, mtime, ext FROM images {where} "
+                f"ORDER BY number {order} LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+            total = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        records = [self._to_record(row) for row in rows[:limit]]
+        next_cursor = records[-1]['number'] if len(rows) > limit else None
+        return {'records': records, 'total': total, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def _to_record(row) -> Dict[str, Any]:
+        number, size, width, height, mtime, ext = row
+        return {
+            'number': number,
+            'size': size,
+            'width': width,
+            'height': height,
+            'mtime': mtime,
+            'ext': ext,
+            'filename': f"{number}.{ext}",
+        }
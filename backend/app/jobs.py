@@ -0,0 +1,246 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_SECONDS,
+    JOB_RETENTION_SECONDS,
+    JOB_RETRY_DELAY,
+)
+from .db import connect, write
+from .metrics import JOB_DURATION, JOBS_PROCESSED
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("pending", "running", "done", "failed")
+# Finished jobs are pruned at most this often
+PRUNE_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    project TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    lease_until REAL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, run_after);
+"""
+
+# Called with (project name, payload)
+Handler = Callable[[str, Dict[str, Any]], None]
+
+
+class JobQueue:
+    """Durable queue of background work on stored images, kept in SQLite.
+
+    ProjectStorage enqueues derived work (thumbnails so far) once an image is
+    stored, so uploads don't wait for it. Worker threads started by
+    ``start()`` claim jobs oldest first and run the handler registered for
+    their kind.
+
+    A claimed job holds a lease. If its process dies, the lease runs out and
+    the job is claimed again, after a restart or by another worker process
+    sharing the storage directory; pending jobs simply wait in the database.
+    Failing jobs are retried with exponential backoff and kept as "failed"
+    after ``max_attempts``. Finished jobs, done or failed, stay queryable
+    for ``retention`` seconds.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_delay: float = JOB_RETRY_DELAY,
+        lease: float = JOB_LEASE_SECONDS,
+        retention: float = JOB_RETENTION_SECONDS,
+    ):
+        self._db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.retention = retention
+        self._handlers: Dict[str, Handler] = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_prune = 0.0
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def register(self, kind: str, handler: Handler) -> None:
+        """Run ``handler`` for jobs of this kind; it must be safe to run twice."""
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, project_name: str, payload: Optional[Dict[str, Any]] = None) -> int:
+        """Add a job; returns its id."""
+        return self.enqueue_many(kind, project_name, [payload or {}])[0]
+
+    def enqueue_many(self, kind: str, project_name: str, payloads: Iterable[Dict[str, Any]]) -> List[int]:
+        """Add several jobs of one kind in a single transaction."""
+        now = time.time()
+        with write(self._db_path, SCHEMA) as conn:
+            ids = [
+                conn.execute(
+                    "INSERT INTO jobs (kind, project, payload, run_after, created, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, project_name, json.dumps(payload), now, now, now),
+                ).lastrowid
+                for payload in payloads
+            ]
+        self._wakeup.set()
+        return ids
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with connect(self._db_path, SCHEMA) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list(self, state: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently updated jobs, optionally in one state."""
+        query = "SELECT * FROM jobs"
+        params: list = []
+        if state is not None:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY updated DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with connect(self._db_path, SCHEMA) as conn:
+            conn.row_factory = sqlite3.Row
+            return [self._job(row) for row in conn.execute(query, params)]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        with connect(self._db_path, SCHEMA) as conn:
+            counts.update(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return counts
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest runnable job, or one whose worker's lease ran out."""
+        while True:
+            now = time.time()
+            with write(self._db_path, SCHEMA) as conn:
+                conn.row_factory = sqlite3.Row
+                row = conn.execute(
+                    "SELECT * FROM jobs "
+                    "WHERE (state = 'pending' AND run_after <= ?) OR (state = 'running' AND lease_until < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row['attempts'] >= self.max_attempts:
+                    # Its worker keeps dying on it; don't take the next one down too
+                    conn.execute(
+                        "UPDATE jobs SET state = 'failed', error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                        ("Interrupted too many times", now, row['id']),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_until = ?, updated = ? "
+                    "WHERE id = ?",
+                    (now + self.lease, now, row['id']),
+                )
+            job = self._job(row)
+            job.update(state='running', attempts=row['attempts'] + 1)
+            return job
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        handler = self._handlers.get(job['kind'])
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job['kind']}")
+            handler(job['project'], job['payload'])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            retry = job['attempts'] < self.max_attempts
+            logger.warning("Job %s (%s) failed: %s", job['id'], job['kind'], error)
+            JOBS_PROCESSED.labels(job['kind'], "retried" if retry else "failed").inc()
+            now = time.time()
+            with write(self._db_path, SCHEMA) as conn:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, run_after = ?, lease_until = NULL, updated = ? "
+                    "WHERE id = ?",
+                    (
+                        "pending" if retry else "failed", error,
+                        now + self.retry_delay * 2 ** (job['attempts'] - 1), now, job['id'],
+                    ),
+                )
+            return
+        finally:
+            JOB_DURATION.labels(job['kind']).observe(time.perf_counter() - start)
+
+        JOBS_PROCESSED.labels(job['kind'], "done").inc()
+        with write(self._db_path, SCHEMA) as conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'done', error = NULL, lease_until = NULL, updated = ? WHERE id = ?",
+                (time.time(), job['id']),
+            )
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        with write(self._db_path, SCHEMA) as conn:
+            conn.execute("DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated < ?", (now - self.retention,))
+
+    def run_pending(self) -> int:
+        """Run every runnable job in the calling thread; returns how many ran.
+
+        For tools and tests working without the worker threads.
+        """
+        ran = 0
+        while (job := self._claim()) is not None:
+            self._run(job)
+            ran += 1
+        return ran
+
+    def start(self, workers: int = 1) -> None:
+        """Start worker threads; jobs left from earlier runs are picked up too."""
+        self._stop.clear()
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"jobs-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the workers after their current job; unfinished jobs stay queued."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=30)
+        self._threads = []
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._prune()
+                job = self._claim()
+                if job is not None:
+                    self._run(job)
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            # Jobs enqueued by other processes are found by polling
+            self._wakeup.wait(JOB_POLL_SECONDS)
+            self._wakeup.clear()
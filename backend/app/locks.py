@@ -0,0 +1,78 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+class _Entry:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refs = 0
+
+
+class KeyedLocks:
+    """Registry of per-key locks that only exist while in use.
+
+    Each entry is reference counted by the threads holding or waiting for it
+    and dropped when the last one leaves, so the registry stays as small as
+    the number of keys being worked on right now, however many keys have
+    ever been used.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._acquisitions = 0
+        self._contended = 0
+        self._wait_seconds = 0.0
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[bool]:
+        """Hold the lock of ``key``; yields whether another thread had it first."""
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.refs += 1
+
+        start = time.perf_counter()
+        try:
+            contended = not entry.lock.acquire(blocking=False)
+            if contended:
+                entry.lock.acquire()
+        except BaseException:
+            self._release_ref(key, entry)
+            raise
+        waited = time.perf_counter() - start
+
+        with self._mutex:
+            self._acquisitions += 1
+            if contended:
+                self._contended += 1
+                self._wait_seconds += waited
+        try:
+            yield contended
+        finally:
+            entry.lock.release()
+            self._release_ref(key, entry)
+
+    def _release_ref(self, key: str, entry: _Entry) -> None:
+        with self._mutex:
+            entry.refs -= 1
+            if entry.refs == 0:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of live locks and contention counters since startup."""
+        with self._mutex:
+            return {
+                "locks": len(self._entries),
+                "acquisitions": self._acquisitions,
+                "contended": self._contended,
+                "wait_seconds": self._wait_seconds,
+            }
@@ -1,22 +1,48 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Form, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from contextlib import asynccontextmanager
+import asyncio
+import json
+import threading
+import zipfile
 import uvicorn
 
-from .config import CORS_ORIGINS, MAX_FILE_SIZE, ALLOWED_EXTENSIONS, ensure_base_dir
-from .storage import storage
+from .config import CORS_ORIGINS, ALLOWED_EXTENSIONS, MAX_BATCH_FILES, RETRY_AFTER_SECONDS, CATALOG_RESCAN_SECONDS, MAX_CONCURRENT_IMPORTS, MAX_IMPORT_SIZE, TEMP_FILE_MAX_AGE, CHANGES_POLL_SECONDS, SSE_HEARTBEAT_SECONDS, JOB_WORKERS, ensure_base_dir
+from .encoders import media_type_for
+from .executor import ExecutorBusy, image_pool, io_pool
+from .http_cache import cached_file_response, cached_json_response
+from .metrics import CONTENT_TYPE, EXECUTOR_REJECTED, REGISTRY, UPLOADS_IN_FLIGHT, MetricsMiddleware, stage_timer
+from .importer import import_path
+from .jobs import JOB_STATES
+from .similarity import MAX_DISTANCE
+from .uploads import UploadError, receive_files, receive_to_file
+from .storage import ImageTooLarge, storage
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     ensure_base_dir()
+    # Temp files of writes a crash interrupted
+    await asyncio.to_thread(storage.cleanup_temp_files, TEMP_FILE_MAX_AGE)
+    # Load the project list once; it is kept current from then on
+    await asyncio.to_thread(storage.catalog.start, CATALOG_RESCAN_SECONDS)
+    # Background jobs, including any left queued by a previous run
+    storage.jobs.start(JOB_WORKERS)
+    # Loading every project's perceptual hashes takes a while with many
+    # images; similarity searches wait for it, nothing else does
+    asyncio.get_running_loop().run_in_executor(None, storage.load_similarity_index)
+    # Catch the README search index up with edits made while we were down
+    asyncio.get_running_loop().run_in_executor(None, storage.sync_readme_index)
     yield
     # Shutdown
-    pass
+    await asyncio.to_thread(storage.jobs.stop)
+    await asyncio.to_thread(storage.catalog.stop)
+    image_pool.shutdown()
+    io_pool.shutdown()
 
 app = FastAPI(title="Screenshot Manager API", lifespan=lifespan)
 
@@ -26,7 +52,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    EXECUTOR_REJECTED.labels(exc.name).inc()
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+# Uploads are parsed by receive_files() rather than UploadFile, so describe
+# the multipart body for the OpenAPI docs by hand.
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                }
+            }
+        },
+    }
+}
+IMPORT_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/zip": {"schema": {"type": "string", "format": "binary"}}},
+    }
+}
 
 class ProjectCreate(BaseModel):
     name: str
@@ -35,26 +111,124 @@ class ProjectResponse(BaseModel):
     name: str
     created: bool
 
+class ProjectSummary(BaseModel):
+    name: str
+    image_count: int
+    last_modified: float
+
 class ProjectDetail(BaseModel):
     name: str
-    images: List[Dict[str, str]]
+    images: List[Dict[str, Any]]
     readme: str
+    seq: int = 0
+
+class ImagePage(BaseModel):
+    images: List[Dict[str, Any]]
+    total: int
+    next_cursor: Optional[int]
+    seq: int = 0
+
+class ImageChange(BaseModel):
+    seq: int
+    type: Literal["added", "deleted"]
+    filename: str
+    image: Optional[Dict[str, Any]] = None
+
+class ChangeFeed(BaseModel):
+    seq: int
+    reset: bool
+    more: bool
+    changes: List[ImageChange]
+    readme: Optional[str] = None
 
 class ImageResponse(BaseModel):
     filename: str
     url: str
 
+class BatchImageResult(BaseModel):
+    index: int
+    original_filename: str
+    filename: Optional[str] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    results: List[BatchImageResult]
+
 class ReadmeContent(BaseModel):
     content: str
 
 class DeleteResponse(BaseModel):
     deleted: bool
 
+class SimilarImage(BaseModel):
+    project: str
+    filename: str
+    distance: int
+    url: str
+    thumbnail_url: str
+
+class SimilarImages(BaseModel):
+    project: str
+    filename: str
+    results: List[SimilarImage]
+
+class ReadmeMatch(BaseModel):
+    project: str
+    snippet: str
+    score: float
+
+class ReadmeSearchResults(BaseModel):
+    query: str
+    total: int
+    results: List[ReadmeMatch]
+
+class JobInfo(BaseModel):
+    id: int
+    kind: str
+    project: str
+    payload: Dict[str, Any]
+    state: str
+    attempts: int
+    error: Optional[str] = None
+    created: float
+    updated: float
+
+class JobList(BaseModel):
+    counts: Dict[str, int]
+    jobs: List[JobInfo]
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/projects")
-async def list_projects():
-    """List all projects."""
-    projects = storage.list_projects()
-    return {"projects": projects}
+async def list_projects(
+    response: Response,
+    q: str = "",
+    match: Literal["prefix", "substring"] = "prefix",
+    sort: Literal["name", "recent", "images"] = "name",
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    details: bool = False,
+):
+    """List projects, optionally filtered by name and paged.
+    
+    q matches case-insensitively at the start of the name (match=prefix)
+    or anywhere in it (match=substring). The total number of matches is
+    returned in the X-Total-Count header; details=true adds each project's
+    image count and last change time.
+    """
+    infos, total = await io_pool.run(storage.search_projects, q, match, sort, limit, offset)
+    response.headers["X-Total-Count"] = str(total)
+    result: Dict[str, Any] = {"projects": [info.name for info in infos]}
+    if details:
+        result["items"] = [
+            ProjectSummary(name=info.name, image_count=info.image_count, last_modified=info.last_modified)
+            for info in infos
+        ]
+    return result
 
 @app.post("/api/projects", response_model=ProjectResponse)
 async def create_project(project: ProjectCreate):
@@ -62,57 +236,278 @@ async def create_project(project: ProjectCreate):
     if not storage.validate_project_name(project.name):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
-    created = storage.create_project(project.name)
+    created = await io_pool.run(storage.create_project, project.name)
     return ProjectResponse(name=project.name, created=created)
 
 @app.get("/api/projects/{project_name}", response_model=ProjectDetail)
-async def get_project_detail(project_name: str):
-    """Get project details including images and README."""
+async def get_project_detail(project_name: str, request: Request, include_images: bool = True):
+    """Get project details including images and README.
+    
+    Large projects should pass include_images=false and page through
+    GET /api/projects/{project_name}/images instead.
+    """
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    if not await io_pool.run(storage.project_exists, project_name):
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    seq = await io_pool.run(storage.get_change_seq, project_name)
+    images = await io_pool.run(storage.list_images, project_name) if include_images else []
+    readme = await io_pool.run(storage.read_readme, project_name)
+    
+    detail = ProjectDetail(name=project_name, images=images, readme=readme, seq=seq)
+    return cached_json_response(request, detail)
+
+@app.get("/api/projects/{project_name}/images", response_model=ImagePage)
+async def list_images(
+    project_name: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, ge=0),
+    order: Literal["asc", "desc"] = "asc",
+):
+    """List one page of a project's images ordered by number.
+    
+    Pass the returned next_cursor as cursor to get the following page.
+    """
     if not storage.validate_project_name(project_name):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
-    project_path = storage.get_project_path(project_name)
-    if not project_path.exists():
+    if not await io_pool.run(storage.project_exists, project_name):
         raise HTTPException(status_code=404, detail="Project not found")
     
-    images = storage.list_images(project_name)
-    readme = storage.read_readme(project_name)
+    page = await io_pool.run(
+        storage.list_images_page, project_name, limit, cursor, order == "desc"
+    )
+    return cached_json_response(request, ImagePage(**page))
+
+@app.get("/api/projects/{project_name}/changes", response_model=ChangeFeed)
+async def get_changes(
+    project_name: str,
+    since: int = Query(..., ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+):
+    """Changes to a project after sequence number ``since``.
     
-    return ProjectDetail(name=project_name, images=images, readme=readme)
+    Start from the seq of a project detail or image page and pass the
+    returned seq next time. When reset is true the changes since then are
+    no longer known and the project has to be reloaded.
+    """
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    if not await io_pool.run(storage.project_exists, project_name):
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return ChangeFeed(**await io_pool.run(storage.get_changes, project_name, since, limit))
 
-@app.post("/api/projects/{project_name}/images", response_model=ImageResponse)
-async def upload_image(project_name: str, file: UploadFile = File(...)):
+@app.get("/api/projects/{project_name}/events")
+async def project_events(project_name: str, request: Request, since: Optional[int] = Query(None, ge=0)):
+    """Server-Sent Events stream of a project's changes.
+    
+    Each "changes" event carries a ChangeFeed and has its seq as event id, so
+    a reconnecting EventSource resumes via Last-Event-ID. Without since (or
+    Last-Event-ID) only changes from now on are sent.
+    """
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    if not await io_pool.run(storage.project_exists, project_name):
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    if since is None:
+        since = await io_pool.run(storage.get_change_seq, project_name)
+    
+    return StreamingResponse(
+        change_events(project_name, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def change_events(project_name: str, since: int):
+    """Yield SSE messages for a project's changes after ``since``, forever."""
+    idle = 0.0
+    backoff = RETRY_AFTER_SECONDS
+    check = True
+    with storage.changes.subscribe(project_name) as subscription:
+        while True:
+            if check:
+                subscription.clear()
+                marker = storage.change_marker(project_name)
+                try:
+                    feed = await io_pool.run(storage.get_changes, project_name, since)
+                except ExecutorBusy:
+                    # Keep the stream open and look again once the pool drains
+                    await asyncio.sleep(backoff)
+                    idle += backoff
+                    backoff = min(backoff * 2, SSE_HEARTBEAT_SECONDS)
+                    if idle >= SSE_HEARTBEAT_SECONDS:
+                        idle = 0.0
+                        yield ": ping\n\n"
+                    continue
+                backoff = RETRY_AFTER_SECONDS
+                if feed['seq'] != since or feed['reset']:
+                    since = feed['seq']
+                    data = ChangeFeed(**feed).model_dump_json()
+                    yield f"id: {since}\nevent: changes\ndata: {data}\n\n"
+                    idle = 0.0
+                    if feed['more']:
+                        continue
+            # Woken by changes made in this process; polling catches the
+            # ones made by other worker processes, and only reads the feed
+            # when the project's index or directory was touched
+            check = await subscription.wait(CHANGES_POLL_SECONDS)
+            if not check:
+                check = marker is None or storage.change_marker(project_name) != marker
+                idle += CHANGES_POLL_SECONDS
+                if idle >= SSE_HEARTBEAT_SECONDS:
+                    idle = 0.0
+                    yield ": ping\n\n"
+
+@app.post("/api/projects/{project_name}/images", response_model=ImageResponse, openapi_extra=UPLOAD_OPENAPI)
+async def upload_image(project_name: str, request: Request):
     """Upload an image to a project."""
     if not storage.validate_project_name(project_name):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
-    # Check file size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="File too large")
+    with UPLOADS_IN_FLIGHT.track_inprogress():
+        return await _upload_image(project_name, request)
+
+async def _upload_image(project_name: str, request: Request) -> ImageResponse:
+    # Stream the body to a spooled temp file, stopping once it is too large
+    try:
+        with stage_timer('read_body'):
+            files = await receive_files(request)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if not files:
+        raise HTTPException(status_code=422, detail="Field required: file")
+    upload = files[0]
+    
+    try:
+        # Check file type
+        if upload.content_type and not upload.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+        
+        try:
+            filename = await image_pool.run(storage.save_image, project_name, upload.file)
+            url = f"/api/projects/{project_name}/images/{filename}"
+            return ImageResponse(filename=filename, url=url)
+        except ExecutorBusy:
+            raise
+        except ImageTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+    finally:
+        upload.close()
+
+@app.post(
+    "/api/projects/{project_name}/images:batch",
+    response_model=BatchUploadResponse,
+    openapi_extra=BATCH_UPLOAD_OPENAPI,
+)
+async def upload_images_batch(project_name: str, request: Request):
+    """Upload several images at once; numbers are assigned in input order."""
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    with UPLOADS_IN_FLIGHT.track_inprogress():
+        return await _upload_images_batch(project_name, request)
+
+async def _upload_images_batch(project_name: str, request: Request) -> BatchUploadResponse:
+    try:
+        with stage_timer('read_body'):
+            files = await receive_files(request, max_files=MAX_BATCH_FILES)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if not files:
+        raise HTTPException(status_code=422, detail="Field required: file")
+    
+    results = [
+        BatchImageResult(index=i, original_filename=upload.filename)
+        for i, upload in enumerate(files)
+    ]
+    # Keep one batch from taking more than its share of the image pool queue
+    slots = asyncio.Semaphore(image_pool.max_workers)
     
-    # Check file type
-    if file.content_type and not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    async def prepare(upload):
+        if upload.content_type and not upload.content_type.startswith('image/'):
+            raise ValueError("File must be an image")
+        async with slots:
+            return await image_pool.run(storage.prepare_image, project_name, upload.file)
     
+    outcomes: List[Any] = []
     try:
-        filename = storage.save_image(project_name, content)
-        url = f"/api/projects/{project_name}/images/{filename}"
-        return ImageResponse(filename=filename, url=url)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        await io_pool.run(storage.create_project, project_name)
+        outcomes = await asyncio.gather(*[prepare(upload) for upload in files], return_exceptions=True)
+        
+        prepared = []
+        for result, outcome in zip(results, outcomes):
+            if isinstance(outcome, ExecutorBusy):
+                result.error = "Server busy, please retry"
+            elif isinstance(outcome, BaseException):
+                result.error = f"Failed to save image: {str(outcome)}"
+            else:
+                prepared.append((result, outcome))
+        
+        if prepared:
+            try:
+                filenames = await io_pool.run(
+                    storage.commit_images, project_name, [item for _, item in prepared]
+                )
+            except ExecutorBusy:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Failed to save images: {str(e)}")
+            for (result, _), filename in zip(prepared, filenames):
+                result.filename = filename
+                result.url = f"/api/projects/{project_name}/images/{filename}"
+    finally:
+        # Temp files of images that were not committed
+        for outcome in outcomes:
+            if not isinstance(outcome, BaseException):
+                storage.discard_prepared(outcome)
+        for upload in files:
+            upload.close()
+    
+    return BatchUploadResponse(results=results)
+
+async def serve_file(request: Request, path, media_type: str, not_found: str):
+    """Stat a stored file off the event loop and serve it with cache validators."""
+    try:
+        stat_result = await io_pool.run(path.stat)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=not_found)
+    return cached_file_response(request, path, stat_result, media_type)
 
-@app.get("/api/projects/{project_name}/images/{filename}")
-async def get_image(project_name: str, filename: str):
+@app.api_route("/api/projects/{project_name}/images/{filename}", methods=["GET", "HEAD"])
+async def get_image(project_name: str, filename: str, request: Request):
     """Get an image file."""
     if not storage.validate_project_name(project_name):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
-    image_path = storage.get_image_path(project_name, filename)
+    image_path = await io_pool.run(storage.get_image_path, project_name, filename)
     if not image_path:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    return FileResponse(image_path, media_type="image/jpeg")
+    return await serve_file(request, image_path, media_type_for(filename), "Image not found")
+
+@app.api_route("/api/projects/{project_name}/thumbs/{size}/{filename}", methods=["GET", "HEAD"])
+async def get_thumbnail(project_name: str, size: int, filename: str, request: Request):
+    """Get a thumbnail of an image, generating it on first request if needed."""
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    thumb_path = await image_pool.run(storage.get_thumbnail_path, project_name, size, filename)
+    if not thumb_path:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    
+    return await serve_file(request, thumb_path, "image/jpeg", "Thumbnail not found")
 
 @app.delete("/api/projects/{project_name}/images/{filename}", response_model=DeleteResponse)
 async def delete_image(project_name: str, filename: str):
@@ -120,24 +515,23 @@ async def delete_image(project_name: str, filename: str):
     if not storage.validate_project_name(project_name):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
-    deleted = storage.delete_image(project_name, filename)
+    deleted = await io_pool.run(storage.delete_image, project_name, filename)
     if not deleted:
         raise HTTPException(status_code=404, detail="Image not found")
     
     return DeleteResponse(deleted=True)
 
 @app.get("/api/projects/{project_name}/readme")
-async def get_readme(project_name: str):
+async def get_readme(project_name: str, request: Request):
     """Get the README content for a project."""
     if not storage.validate_project_name(project_name):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
-    project_path = storage.get_project_path(project_name)
-    if not project_path.exists():
+    if not await io_pool.run(storage.project_exists, project_name):
         raise HTTPException(status_code=404, detail="Project not found")
     
-    content = storage.read_readme(project_name)
-    return ReadmeContent(content=content)
+    content = await io_pool.run(storage.read_readme, project_name)
+    return cached_json_response(request, ReadmeContent(content=content))
 
 @app.put("/api/projects/{project_name}/readme")
 async def update_readme(project_name: str, readme: ReadmeContent):
@@ -146,10 +540,169 @@ async def update_readme(project_name: str, readme: ReadmeContent):
         raise HTTPException(status_code=400, detail="Invalid project name")
     
     try:
-        storage.write_readme(project_name, readme.content)
+        await io_pool.run(storage.write_readme, project_name, readme.content)
         return ReadmeContent(content=readme.content)
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save README: {str(e)}")
 
+@app.get("/api/projects/{project_name}/export.zip")
+async def export_project(project_name: str):
+    """Download a project's images and README as a ZIP, streamed as it is built."""
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    archive = await io_pool.run(storage.export_zip, project_name)
+    if archive is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{project_name}.zip"'},
+    )
+
+# Each import keeps IMPORT_WORKERS processes busy; more at once only compete
+import_slots = threading.BoundedSemaphore(MAX_CONCURRENT_IMPORTS)
+
+@app.post("/api/projects/{project_name}/import", openapi_extra=IMPORT_OPENAPI)
+async def import_project(project_name: str, request: Request, readme: bool = False):
+    """Import the images of a ZIP archive sent as the request body.
+    
+    Responds with newline-delimited JSON: a "progress" event per image while
+    they are converted, then a "done" event listing the stored filenames and
+    the images that failed. With readme=true the archive's README.md replaces
+    the project's.
+    """
+    if not storage.validate_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    if not import_slots.acquire(blocking=False):
+        raise ExecutorBusy("import")
+    
+    # The slot is handed to the import once it starts, and released here
+    # if it never does
+    try:
+        # Received outside the project, which is only created for a valid archive
+        temp_dir = await io_pool.run(storage.get_temp_dir)
+        try:
+            archive_path = await receive_to_file(request, temp_dir, MAX_IMPORT_SIZE)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        try:
+            if not await io_pool.run(zipfile.is_zipfile, archive_path):
+                raise HTTPException(status_code=400, detail="Body must be a ZIP archive")
+            await io_pool.run(storage.create_project, project_name)
+        except BaseException:
+            archive_path.unlink(missing_ok=True)
+            raise
+        events, task = _start_import(project_name, archive_path, readme)
+    except BaseException:
+        import_slots.release()
+        raise
+    
+    return StreamingResponse(_import_events(events, task), media_type="application/x-ndjson")
+
+def _start_import(project_name: str, archive_path, include_readme: bool):
+    """Run an import in the background, reporting progress to a queue.
+    
+    It runs to the end (and frees its slot) even if the client goes away.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def progress(done: int, total: int, name: str, error: Optional[str]):
+        event = {"event": "progress", "done": done, "total": total, "source": name, "error": error}
+        loop.call_soon_threadsafe(events.put_nowait, event)
+    
+    def run():
+        try:
+            return import_path(storage, project_name, archive_path, include_readme, progress=progress)
+        finally:
+            archive_path.unlink(missing_ok=True)
+            import_slots.release()
+    
+    # Waits on worker processes for minutes; keep it out of the bounded pools
+    task = loop.run_in_executor(None, run)
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    return events, task
+
+async def _import_events(events: asyncio.Queue, task: asyncio.Future):
+    while True:
+        event = await events.get()
+        if event is None:
+            break
+        yield json.dumps(event, ensure_ascii=False) + "\n"
+    
+    try:
+        result = await task
+    except Exception as e:
+        event = {"event": "error", "detail": f"Import failed: {str(e)}"}
+    else:
+        event = {
+            "event": "done",
+            "imported": [{"source": source, "filename": filename} for source, filename in result.imported],
+            "errors": [{"source": source, "error": error} for source, error in result.errors],
+            "readme": result.readme,
+        }
+    yield json.dumps(event, ensure_ascii=False) + "\n"
+
+@app.get("/api/search/similar", response_model=SimilarImages)
+async def search_similar(
+    project: str,
+    filename: str,
+    max_distance: int = Query(10, ge=0, le=MAX_DISTANCE),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Find images that look like the given one, in any project.
+    
+    Similarity is the number of differing bits between perceptual hashes
+    (64 bits); up to about 10 usually means the same screen.
+    """
+    if not storage.validate_project_name(project):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    
+    results = await image_pool.run(storage.find_similar, project, filename, max_distance, limit)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return SimilarImages(project=project, filename=filename, results=results)
+
+@app.get("/api/search", response_model=ReadmeSearchResults)
+async def search_readmes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Full-text search over all project READMEs.
+    
+    Every whitespace-separated term must appear, case-insensitively, as
+    the start of a word (anywhere in Chinese text). Results are ranked by
+    relevance; snippets are HTML with the matches in <mark>.
+    """
+    if not q.split():
+        raise HTTPException(status_code=422, detail="Empty search query")
+    
+    found = await io_pool.run(storage.search_readmes, q, limit, offset)
+    return ReadmeSearchResults(query=q, **found)
+
+@app.get("/api/jobs", response_model=JobList)
+async def list_jobs(
+    state: Optional[Literal[JOB_STATES]] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Background job counts by state and the most recently updated jobs."""
+    def read():
+        return JobList(counts=storage.jobs.counts(), jobs=storage.jobs.list(state, limit))
+    
+    return await io_pool.run(read)
+
+@app.get("/api/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: int):
+    """Status of one background job."""
+    job = await io_pool.run(storage.jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,335 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Label value that absorbs new series once a metric hits its max_series
+OVERFLOW_LABEL = "__other__"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """A named metric with one child per combination of label values.
+
+    Unlabelled metrics forward ``inc``/``set``/``observe`` to their single
+    child. ``max_series`` caps the number of children so that labels such as
+    project names cannot grow the output without bound; further label values
+    are folded into ``OVERFLOW_LABEL``.
+    """
+
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        max_series: Optional[int] = None,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Child"] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> "_Child":
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        # Lock-free fast path: dict reads are atomic
+        child = self._children.get(key)
+        if child is not None:
+            return child
+        with self._lock:
+            if key not in self._children and self.max_series is not None \
+                    and len(self._children) >= self.max_series:
+                key = (OVERFLOW_LABEL,) * len(key)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _unlabelled(self) -> "_Child":
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels; use .labels() first")
+        return self._children[()]
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in sorted(children):
+            yield from child.samples(self.name, self.labelnames, values)
+
+
+class _Child:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def get(self) -> float:
+        return self._value
+
+    def samples(self, name: str, labelnames, values) -> Iterator[str]:
+        yield f"{name}{_format_labels(labelnames, values)} {_format_value(self._value)}"
+
+
+class _CounterChild(_Child):
+    def inc(self, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+
+class _GaugeChild(_Child):
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self, name: str, labelnames, values) -> Iterator[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip((*self._buckets, float("inf")), counts):
+            cumulative += count
+            labels = _format_labels((*labelnames, "le"), (*values, _format_value(bound)))
+            yield f"{name}_bucket{labels} {cumulative}"
+        labels = _format_labels(labelnames, values)
+        yield f"{name}_sum{labels} {_format_value(total)}"
+        yield f"{name}_count{labels} {cumulative}"
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._unlabelled().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+    def track_inprogress(self):
+        return self._unlabelled().track_inprogress()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, **kwargs)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status and body bytes.
+
+    Routes are labelled by their path template (``/api/projects/{project_name}``)
+    so that label sets stay bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        received = 0
+        sent = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        content_length = 0
+
+        async def counting_send(message):
+            nonlocal sent, status, content_length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key.lower() == b"content-length":
+                        content_length = int(value)
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] == "http.response.zerocopysend":
+                sent += message.get("count", content_length)
+            elif message["type"] == "http.response.pathsend":
+                sent += content_length
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            if received:
+                HTTP_REQUEST_BYTES.labels(route).inc(received)
+            if sent:
+                HTTP_RESPONSE_BYTES.labels(route).inc(sent)
+
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route"],
+)
+HTTP_REQUEST_BYTES = Counter("http_request_bytes_total", "Request body bytes received", ["route"])
+HTTP_RESPONSE_BYTES = Counter("http_response_bytes_total", "Response body bytes sent", ["route"])
+UPLOADS_IN_FLIGHT = Gauge("uploads_in_flight", "Upload requests currently being processed")
+UPLOAD_STAGE_DURATION = Histogram(
+    "upload_stage_duration_seconds", "Time spent in each stage of storing an upload", ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PROJECT_LOCK_WAIT = Histogram(
+    "project_lock_wait_seconds", "Time spent waiting for a project lock", ["project"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0), max_series=200,
+)
+PROJECT_LOCKS = Gauge("project_locks", "Project locks currently held or waited for")
+PROJECT_LOCK_CONTENDED = Counter(
+    "project_lock_contended_total", "Project lock acquisitions that had to wait for another thread",
+)
+JOBS_PROCESSED = Counter(
+    "background_jobs_total", "Background job runs by kind and outcome (done, retried, failed)", ["kind", "outcome"],
+)
+JOB_DURATION = Histogram("background_job_duration_seconds", "Time spent running background jobs", ["kind"])
+EXECUTOR_REJECTED = Counter(
+    "executor_rejected_total", "Calls rejected because a worker pool queue was full", ["pool"],
+)
+
+
+def stage_timer(stage: str):
+    """Time one stage of the upload pipeline (read_body, decode, encode, ...)."""
+    return UPLOAD_STAGE_DURATION.labels(stage).time()
@@ -0,0 +1,221 @@
+import html
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import README_SEARCH_MAX_RANKED
+from .db import connect, write
+
+# Characters of context on each side of the first match in a snippet
+SNIPPET_CONTEXT = 60
+# READMEs sync() writes per transaction
+SYNC_BATCH = 200
+# Runs of CJK characters, which have no spaces between words
+CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+# Highlight markers put into the text before it is HTML-escaped
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS readmes USING fts5(terms, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+
+def _cjk_bigrams(run: str, final: bool) -> str:
+    bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+    if final or len(run) == 1:
+        bigrams.append(run[-1])
+    return " " + " ".join(bigrams) + " "
+
+
+def index_terms(text: str, query: bool = False) -> str:
+    """Text as FTS5 indexes it: CJK runs become overlapping bigrams.
+
+    unicode61 splits other text into words. A document run also gets its
+    last character on its own, so that a one-character query, searched as
+    a prefix, finds it wherever it is in the run; queries leave it out.
+    """
+    return CJK_RE.sub(lambda match: _cjk_bigrams(match.group(), not query), text)
+
+
+def _match_expression(terms: List[str]) -> Optional[str]:
+    """FTS5 query for documents containing every term, each as a prefix.
+
+    Terms go in as quoted phrases, so query syntax in them is matched
+    literally. None if no term has anything searchable in it.
+    """
+    phrases = []
+    for term in terms:
+        phrase = " ".join(index_terms(term, query=True).split())
+        if any(char.isalnum() for char in phrase):
+            phrases.append('"' + phrase.replace('"', '""') + '"*')
+    return " AND ".join(phrases) or None
+
+
+def make_snippet(content: str, terms: List[str], context: int = SNIPPET_CONTEXT) -> str:
+    """HTML excerpt around the first term found, with the terms in <mark>."""
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    first = min(positions, default=0)
+    start = max(0, first - context)
+    end = min(len(content), first + context)
+    excerpt = content[start:end]
+    # Mark every occurrence in the excerpt, longest terms first
+    lowered_excerpt = excerpt.lower()
+    marked = [False] * len(excerpt)
+    for term in sorted(terms, key=len, reverse=True):
+        term = term.lower()
+        position = lowered_excerpt.find(term)
+        while term and position >= 0:
+            if not any(marked[position:position + len(term)]):
+                for i in range(position, position + len(term)):
+                    marked[i] = True
+            position = lowered_excerpt.find(term, position + len(term))
+    pieces = []
+    for i, char in enumerate(excerpt):
+        if marked[i] and (i == 0 or not marked[i - 1]):
+            pieces.append(_MARK_START)
+        pieces.append(char)
+        if marked[i] and (i == len(excerpt) - 1 or not marked[i + 1]):
+            pieces.append(_MARK_END)
+    text = html.escape(" ".join("".join(pieces).split()))
+    text = text.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+    return ("…" if start > 0 else "") + text + ("…" if end < len(content) else "")
+
+
+class ReadmeIndex:
+    """Full-text index of the project READMEs in SQLite FTS5.
+
+    ProjectStorage updates a project's entry whenever it writes its README;
+    ``sync()`` at startup catches up with READMEs edited or projects removed
+    behind its back by comparing each README's mtime and size with the ones
+    recorded. Searches rank by BM25 and return an excerpt around the match.
+    """
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+
+    @staticmethod
+    def _put(conn: sqlite3.Connection, project_name: str, content: str, mtime_ns: int, size: int) -> None:
+        # A rewritten README gets a new id: ids follow the order of writes
+        ReadmeIndex._delete(conn, project_name)
+        doc_id = conn.execute(
+            "INSERT INTO documents (project, mtime_ns, size, content) VALUES (?, ?, ?, ?)",
+            (project_name, mtime_ns, size, content),
+        ).lastrowid
+        if content.strip():
+            conn.execute("INSERT INTO readmes (rowid, terms) VALUES (?, ?)", (doc_id, index_terms(content)))
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, project_name: str) -> None:
+        row = conn.execute("SELECT id FROM documents WHERE project = ?", (project_name,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM readmes WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+
+    def update(self, project_name: str, content: str, mtime_ns: int, size: int) -> None:
+        """Index a project's README as just written (``mtime_ns``/``size`` of the file)."""
+        with write(self._db_path, SCHEMA) as conn:
+            self._put(conn, project_name, content, mtime_ns, size)
+
+    def remove(self, project_name: str) -> None:
+        with write(self._db_path, SCHEMA) as conn:
+            self._delete(conn, project_name)
+
+    def _state(self, conn: sqlite3.Connection, project_name: str) -> Optional[Tuple[int, int]]:
+        row = conn.execute("SELECT mtime_ns, size FROM documents WHERE project = ?", (project_name,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def sync(self, readmes: Dict[str, Optional[Path]]) -> int:
+        """Bring the index in line with the READMEs on disk.
+
+        ``readmes`` maps every project to its README path (None without
+        one). Only files whose mtime or size changed are read, outside the
+        write lock, and written SYNC_BATCH at a time so ``update()`` isn't
+        held up behind a big catch-up. An entry updated meanwhile is left
+        alone. Returns the number of projects reindexed or removed.
+        """
+        with connect(self._db_path, SCHEMA) as conn:
+            indexed = {
+                project: (mtime_ns, size)
+                for project, mtime_ns, size in conn.execute("SELECT project, mtime_ns, size FROM documents")
+            }
+
+        changed: List[Tuple[str, Optional[Path], Optional[Tuple[int, int]]]] = [
+            (project, None, None) for project in indexed if project not in readmes
+        ]
+        for project_name, path in readmes.items():
+            try:
+                stat = path.stat() if path is not None else None
+            except FileNotFoundError:
+                stat = None
+            state = (stat.st_mtime_ns, stat.st_size) if stat else None
+            if state != indexed.get(project_name):
+                changed.append((project_name, path, state))
+
+        for start in range(0, len(changed), SYNC_BATCH):
+            batch = []
+            for project_name, path, state in changed[start:start + SYNC_BATCH]:
+                content = None
+                if state is not None:
+                    try:
+                        content = path.read_text(encoding='utf-8', errors='replace')
+                    except FileNotFoundError:
+                        pass
+                batch.append((project_name, content, state))
+            with write(self._db_path, SCHEMA) as conn:
+                for project_name, content, state in batch:
+                    if self._state(conn, project_name) != indexed.get(project_name):
+                        continue  # written by update() since we looked
+                    if content is None:
+                        self._delete(conn, project_name)
+                    else:
+                        self._put(conn, project_name, content, *state)
+        return len(changed)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Projects whose README contains every term of ``query``, best match first.
+
+        Terms match case-insensitively at the start of a word ("crash"
+        finds "crashes"), and anywhere in Chinese, Japanese or Korean text.
+        Returns the total number of matches and one page of {project,
+        snippet, score}; snippets are HTML with matches in <mark>. With
+        README_SEARCH_MAX_RANKED set, only that many of the most recently
+        written matches are ranked.
+        """
+        terms = query.split()
+        expression = _match_expression(terms)
+        if expression is None:
+            return {'total': 0, 'results': []}
+
+        with connect(self._db_path, SCHEMA) as conn:
+            total = conn.execute("SELECT COUNT(*) FROM readmes WHERE readmes MATCH ?", (expression,)).fetchone()[0]
+            candidates = "SELECT rowid, bm25(readmes) AS rank FROM readmes WHERE readmes MATCH ?"
+            params: List[Any] = [expression]
+            if README_SEARCH_MAX_RANKED > 0:
+                candidates = f"SELECT * FROM ({candidates} ORDER BY rowid DESC LIMIT ?)"
+                params.append(max(README_SEARCH_MAX_RANKED, offset + limit))
+            # Rank the candidates, then read only the page's documents
+            rows = conn.execute(
+                "SELECT d.project, d.content, page.rank FROM ("
+                f"    SELECT rowid, rank FROM ({candidates}) ORDER BY rank, rowid DESC LIMIT ? OFFSET ?"
+                ") page JOIN documents d ON d.id = page.rowid "
+                "ORDER BY page.rank, page.rowid DESC",
+                (*params, limit, offset),
+            ).fetchall()
+        return {
+            'total': total,
+            'results': [
+                # bm25() is lower for better matches; report higher-is-better
+                {'project': project, 'snippet': make_snippet(content, terms), 'score': -rank}
+                for project, content, rank in rows
+            ],
+        }
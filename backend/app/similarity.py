@@ -0,0 +1,255 @@
+import sys
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import accumulate, combinations
+from typing import Dict, Iterable, List, Tuple
+
+from PIL import Image
+
+HASH_BITS = 64
+# Multi-index hashing: each hash is split into CHUNKS substrings of
+# CHUNK_BITS, and every substring gets a table of the images having it
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+BUCKETS = 1 << CHUNK_BITS
+# Largest Hamming distance searches accept: up to here a search probes
+# chunk values at most 3 bits away (697 per chunk), beyond it 2517
+MAX_DISTANCE = 15
+# Entries added or removed since the tables were sorted are kept aside
+# until there are this many, or an eighth of the index
+MIN_REBUILD = 4096
+REMOVED = 0xFFFFFFFF
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash of an image.
+
+    Each bit says whether a pixel of a 9x8 grayscale version is brighter
+    than its right neighbour, so re-encoded or rescaled copies of a screen
+    and ones with small changes (a clock, a build number) hash alike.
+    """
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA')
+    small = image.resize((9, 8), Image.Resampling.BOX)
+    if small.mode in ('RGBA', 'LA'):
+        # Transparent areas count as white, as when stored as JPEG
+        small = Image.alpha_composite(Image.new('RGBA', small.size, 'white'), small.convert('RGBA'))
+    pixels = small.convert('L').tobytes()
+    value = 0
+    for row in range(0, 72, 9):
+        for col in range(row, row + 8):
+            value = value << 1 | (pixels[col] > pixels[col + 1])
+    return value
+
+
+def _chunks(value: int) -> List[int]:
+    return [(value >> (CHUNK_BITS * i)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+@lru_cache(maxsize=None)
+def _masks(radius: int) -> Tuple[int, ...]:
+    """Every CHUNK_BITS-bit value with at most ``radius`` bits set."""
+    return tuple(
+        sum(1 << bit for bit in bits)
+        for count in range(radius + 1)
+        for bits in combinations(range(CHUNK_BITS), count)
+    )
+
+
+class SimilarityIndex:
+    """Hamming-distance search over the perceptual hashes of all images.
+
+    Entries (project, number, extension, hash) live in parallel arrays,
+    about 17 bytes each. For each of the CHUNKS substrings of the hash,
+    the entry positions are kept sorted by substring value with an offset
+    table per value, so the entries with a given substring are one slice.
+    Two hashes within distance d share a substring within distance
+    d // CHUNKS, so a search only probes the values that close to the
+    query's substrings and checks the entries found there.
+
+    Additions go to small per-substring dicts and removals leave a
+    tombstone until enough accumulate for a rebuild, which keeps
+    ``add()`` and ``remove()`` cheap for ProjectStorage to call as images
+    are saved and deleted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._project_ids: Dict[str, int] = {}
+        self._project_names: List[str] = []
+        self._ext_ids: Dict[str, int] = {}
+        self._ext_names: List[str] = []
+        self._hashes = array('Q')
+        self._projects = array('I')
+        self._numbers = array('I')
+        self._exts = array('B')
+        self._removed = 0
+        # Entries before this position are in the sorted tables
+        self._built = 0
+        self._order = [array('I') for _ in range(CHUNKS)]
+        self._starts = [array('I', bytes(4 * (BUCKETS + 1))) for _ in range(CHUNKS)]
+        self._recent: List[Dict[int, List[int]]] = [{} for _ in range(CHUNKS)]
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._hashes) - self._removed
+
+    def _project_id(self, project_name: str) -> int:
+        project_id = self._project_ids.get(project_name)
+        if project_id is None:
+            project_id = self._project_ids[project_name] = len(self._project_names)
+            self._project_names.append(project_name)
+        return project_id
+
+    def _ext_id(self, ext: str) -> int:
+        ext_id = self._ext_ids.get(ext)
+        if ext_id is None:
+            ext_id = self._ext_ids[ext] = len(self._ext_names)
+            self._ext_names.append(ext)
+        return ext_id
+
+    def _candidates(self, chunk: int, value: int) -> Iterable[int]:
+        starts = self._starts[chunk]
+        yield from self._order[chunk][starts[value]:starts[value + 1]]
+        yield from self._recent[chunk].get(value, ())
+
+    def _find(self, project_id: int, number: int, value: int) -> int:
+        """Position of an entry, or -1."""
+        for position in self._candidates(0, value & CHUNK_MASK):
+            if (self._projects[position] == project_id and self._numbers[position] == number
+                    and self._hashes[position] == value):
+                return position
+        return -1
+
+    def _append(self, project_id: int, number: int, ext: str, value: int) -> None:
+        position = len(self._hashes)
+        self._hashes.append(value)
+        self._projects.append(project_id)
+        self._numbers.append(number)
+        self._exts.append(self._ext_id(ext))
+        for chunk, chunk_value in enumerate(_chunks(value)):
+            self._recent[chunk].setdefault(chunk_value, []).append(position)
+
+    def add(self, project_name: str, number: int, ext: str, value: int) -> None:
+        """Add an image; adding one that is already there does nothing."""
+        with self._lock:
+            project_id = self._project_id(project_name)
+            if self._find(project_id, number, value) < 0:
+                self._append(project_id, number, ext, value)
+                self._maybe_rebuild()
+
+    def remove(self, project_name: str, number: int, value: int) -> None:
+        with self._lock:
+            project_id = self._project_ids.get(project_name)
+            if project_id is None:
+                return
+            position = self._find(project_id, number, value)
+            if position >= 0:
+                self._projects[position] = REMOVED
+                self._removed += 1
+                self._maybe_rebuild()
+
+    def discard(self, project_name: str, number: int) -> None:
+        """Remove an image whose hash is no longer known (deleted by another process)."""
+        with self._lock:
+            project_id = self._project_ids.get(project_name)
+            if project_id is None:
+                return
+            position = -1
+            while True:
+                try:
+                    position = self._numbers.index(number, position + 1)
+                except ValueError:
+                    return
+                if self._projects[position] == project_id:
+                    self._projects[position] = REMOVED
+                    self._removed += 1
+                    self._maybe_rebuild()
+                    return
+
+    def load(self, entries: Iterable[Tuple[str, int, str, int]]) -> None:
+        """Bulk-add (project, number, ext, hash) entries, skipping known ones.
+
+        ``entries`` is consumed before taking the lock, so adds and removes
+        don't wait for whatever produces them (e.g. reading every project).
+        """
+        project_names: List[str] = []
+        numbers = array('I')
+        exts: List[str] = []
+        hashes = array('Q')
+        for project_name, number, ext, value in entries:
+            project_names.append(project_name)
+            numbers.append(number)
+            exts.append(ext)
+            hashes.append(value)
+        with self._lock:
+            known = {
+                (project_id, number)
+                for project_id, number in zip(self._projects, self._numbers)
+                if project_id != REMOVED
+            }
+            for project_name, number, ext, value in zip(project_names, numbers, exts, hashes):
+                project_id = self._project_id(project_name)
+                if (project_id, number) not in known:
+                    # Straight into the arrays; the rebuild indexes them
+                    self._hashes.append(value)
+                    self._projects.append(project_id)
+                    self._numbers.append(number)
+                    self._exts.append(self._ext_id(ext))
+            self._rebuild()
+            self.loaded = True
+
+    def _maybe_rebuild(self) -> None:
+        pending = len(self._hashes) - self._built + self._removed
+        if pending > max(MIN_REBUILD, len(self._hashes) // 8):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Drop removed entries and sort everything into the tables (lock held)."""
+        if self._removed:
+            keep = [i for i, project_id in enumerate(self._projects) if project_id != REMOVED]
+            self._hashes = array('Q', (self._hashes[i] for i in keep))
+            self._projects = array('I', (self._projects[i] for i in keep))
+            self._numbers = array('I', (self._numbers[i] for i in keep))
+            self._exts = array('B', (self._exts[i] for i in keep))
+            self._removed = 0
+        # The hashes' memory as 16-bit words holds every chunk in place
+        words = array('H', self._hashes.tobytes())
+        for chunk in range(CHUNKS):
+            offset = chunk if sys.byteorder == 'little' else CHUNKS - 1 - chunk
+            values = words[offset::CHUNKS]
+            counts = [0] * BUCKETS
+            for value, count in Counter(values).items():
+                counts[value] = count
+            self._order[chunk] = array('I', sorted(range(len(values)), key=values.__getitem__))
+            self._starts[chunk] = array('I', accumulate(counts, initial=0))
+            self._recent[chunk] = {}
+        self._built = len(self._hashes)
+
+    def search(self, value: int, max_distance: int, limit: int) -> List[Tuple[str, int, str, int]]:
+        """Up to ``limit`` (project, number, ext, distance) within ``max_distance``, closest first."""
+        if not 0 <= max_distance <= MAX_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {MAX_DISTANCE}")
+        masks = _masks(max_distance // CHUNKS)
+        found = []
+        with self._lock:
+            hashes, projects = self._hashes, self._projects
+            seen = set()
+            for chunk, chunk_value in enumerate(_chunks(value)):
+                for mask in masks:
+                    for position in self._candidates(chunk, chunk_value ^ mask):
+                        if position in seen:
+                            continue
+                        seen.add(position)
+                        distance = (hashes[position] ^ value).bit_count()
+                        if distance <= max_distance and projects[position] != REMOVED:
+                            found.append((distance, position))
+            found.sort()
+            return [
+                (self._project_names[projects[position]], self._numbers[position],
+                 self._ext_names[self._exts[position]], distance)
+                for distance, position in found[:limit]
+            ]
@@ -1,24 +1,273 @@
+import hashlib
+import logging
 import os
 import re
+import tempfile
 import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import BinaryIO, Iterator, List, Optional, Dict, Any, Tuple, Union
 from PIL import Image
 import io
+import shutil
+import sqlite3
 
-from .config import BASE_DIR
+try:
+    import fcntl
+except ImportError:  # Windows: locking is per process only
+    fcntl = None
+
+from .config import (
+    BASE_DIR,
+    DEDUP_MODE,
+    DURABILITY,
+    MAX_IMAGE_DIMENSION,
+    MAX_IMAGE_PIXELS,
+    MAX_STORED_DIMENSION,
+    PASSTHROUGH,
+    SIMILARITY_SYNC_SECONDS,
+    THUMBNAIL_SIZES,
+    THUMBNAIL_QUALITY,
+)
+from .catalog import ProjectCatalog, ProjectInfo
+from .changes import ChangeNotifier
+from .encoders import Encoder, get_encoder, match_image_filename, media_type_for
+from .index import ImageIndex
+from .jobs import JobQueue
+from .readme_search import ReadmeIndex
+from .similarity import SimilarityIndex, dhash
+from .locks import KeyedLocks
+from .metrics import PROJECT_LOCK_CONTENDED, PROJECT_LOCK_WAIT, PROJECT_LOCKS, UPLOAD_STAGE_DURATION, stage_timer
+from .zipstream import stream_zip
+
+logger = logging.getLogger(__name__)
+
+# Thumbnails are always JPEG and named after the image number
+THUMB_FILENAME_RE = re.compile(r'^(\d+)\.jpg$')
+
+TEMP_DIR_NAME = ".tmp"
+THUMBS_DIR_NAME = ".thumbs"
+JOBS_DIR_NAME = ".jobs"
+SEARCH_DIR_NAME = ".search"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+PIXEL_HASH_STRIP_ROWS = 256
+
+# Pillow's own bomb check (in every Image.open) agrees with ours
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+class ImageTooLarge(ValueError):
+    """An upload whose dimensions exceed MAX_IMAGE_PIXELS or MAX_IMAGE_DIMENSION."""
+
+@dataclass
+class PreparedImage:
+    """An upload converted to its stored format, waiting for a number.
+    
+    ``existing`` is set instead of ``path`` when the upload duplicates an
+    image that is reused as-is.
+    """
+    path: Optional[Path]
+    width: int
+    height: int
+    ext: str = 'jpg'
+    thumbnails: Dict[int, Path] = field(default_factory=dict)
+    raw_hash: Optional[str] = None
+    pixel_hash: Optional[str] = None
+    dhash: Optional[int] = None
+    existing: Optional[str] = None
+
+def hash_stream(source: BinaryIO) -> str:
+    """SHA-256 of a seekable stream's contents; the stream is rewound afterwards."""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+def hash_pixels(image: Image.Image) -> str:
+    """SHA-256 of decoded pixels, so one picture matches across file formats."""
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    # Hash in strips to avoid a second full-size copy of the pixel data
+    for top in range(0, image.height, PIXEL_HASH_STRIP_ROWS):
+        bottom = min(top + PIXEL_HASH_STRIP_ROWS, image.height)
+        digest.update(image.crop((0, top, image.width, bottom)).tobytes())
+    return digest.hexdigest()
+
+def fit_size(size: Tuple[int, int], limit: int) -> Tuple[int, int]:
+    """Dimensions scaled down to fit in a limit x limit box, keeping the aspect ratio."""
+    width, height = size
+    if width <= limit and height <= limit:
+        return size
+    scale = limit / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def make_thumbnail(image: Image.Image, size: int) -> Image.Image:
+    """Scale an image down to fit in a size x size box, as a new image."""
+    target = fit_size(image.size, size)
+    if target == image.size:
+        return image.copy()
+    return image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+def open_image(source: BinaryIO) -> Image.Image:
+    """Open an image without decoding it, rejecting oversized ones.
+    
+    Only the header has been read at this point, so a decompression bomb
+    is refused before any pixel memory is allocated.
+    """
+    try:
+        image = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    width, height = image.size
+    if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+        image.close()
+        raise ImageTooLarge(f"Image is {width}x{height}, over {MAX_IMAGE_DIMENSION} pixels on a side")
+    if width * height > MAX_IMAGE_PIXELS:
+        image.close()
+        raise ImageTooLarge(f"Image has {width * height} pixels, over {MAX_IMAGE_PIXELS}")
+    return image
+
+def decode_image(image: Image.Image, max_dimension: int = 0) -> Image.Image:
+    """Decode an opened image, scaled down to fit in max_dimension if set.
+    
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale when that still covers the
+    target size, so neither the decode nor any later copy is full-size.
+    Other formats are decoded in full and reduced right away.
+    """
+    if not max_dimension:
+        image.load()
+        return image
+    target = fit_size(image.size, max_dimension)
+    if target == image.size:
+        image.load()
+        return image
+    image.draft(None, target)  # no-op except for JPEG
+    image.load()
+    if image.size == target:
+        return image
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        # Palette and bilevel images only get nearest-neighbour resampling
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    return image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+def write_temp(directory: Path, suffix: str, write, durable: bool = False, prefix: str = "upload-") -> Path:
+    """Create a temp file in a directory and fill it with ``write(f)``.
+    
+    With ``durable`` the contents are fsynced before returning, so a file
+    renamed or linked into place afterwards is never seen truncated.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            if durable:
+                f.flush()
+                with stage_timer('fsync'):
+                    os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return Path(temp_path)
+
+def save_jpeg_temp(image: Image.Image, directory: Path, quality: int, durable: bool = False) -> Path:
+    """Encode an image as JPEG into a new temp file in a directory."""
+    return write_temp(directory, ".jpg", lambda f: image.save(f, 'JPEG', quality=quality), durable)
+
+def fsync_dir(path: Path) -> None:
+    """Persist the entries of a directory, e.g. names just linked or renamed into it."""
+    if os.name != 'posix':
+        return  # directories can't be opened (or fsynced) on Windows
+    with stage_timer('fsync'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def flatten_alpha(image: Image.Image) -> Image.Image:
+    """Composite transparent images onto white and convert to RGB."""
+    if image.mode in ('RGBA', 'P', 'LA'):
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.split()[-1])
+        return rgb_image
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
 
 class ProjectStorage:
-    def __init__(self, base_dir=None):
-        self._locks: Dict[str, threading.Lock] = {}
-        self._lock = threading.Lock()
+    def __init__(self, base_dir=None, encoder: Optional[Encoder] = None, durable: Optional[bool] = None):
+        self._locks = KeyedLocks()
         self._base_dir = Path(base_dir) if base_dir else BASE_DIR
+        self._encoder = encoder or get_encoder()
+        self._durable = DURABILITY == 'durable' if durable is None else durable
+        self.catalog = ProjectCatalog(self._base_dir, self.validate_project_name)
+        self.changes = ChangeNotifier()
+        self.jobs = JobQueue(self._base_dir / JOBS_DIR_NAME / "jobs.sqlite")
+        self.jobs.register("thumbnails", self._make_thumbnails)
+        self.jobs.register("dhashes", self._backfill_dhashes)
+        self.jobs.register("readme", self._reindex_readme)
+        self.similar = SimilarityIndex()
+        self._similar_load_lock = threading.Lock()
+        # Per project: change marker and feed position ``similar`` is up to date with
+        self._similar_seen: Dict[str, Tuple[Tuple[int, int], int]] = {}
+        self._similar_synced = 0.0
+        self.readme_index = ReadmeIndex(self._base_dir / SEARCH_DIR_NAME / "readme.sqlite")
+    
+    @property
+    def base_dir(self) -> Path:
+        return self._base_dir
     
-    def _get_project_lock(self, project_name: str) -> threading.Lock:
-        with self._lock:
-            if project_name not in self._locks:
-                self._locks[project_name] = threading.Lock()
-            return self._locks[project_name]
+    @property
+    def encoder(self) -> Encoder:
+        return self._encoder
+    
+    @property
+    def durable(self) -> bool:
+        """Whether writes are fsynced before they are acknowledged."""
+        return self._durable
+    
+    @contextmanager
+    def _project_lock(self, project_name: str) -> Iterator[None]:
+        """Hold a project's lock, recording how long it took to get it.
+        
+        The thread lock serializes this process; a flock() on the project
+        directory itself serializes worker processes sharing the storage
+        directory. A project that doesn't exist yet has nothing to protect
+        across processes and is only locked per process.
+        """
+        start = time.perf_counter()
+        try:
+            with self._locks.hold(project_name) as contended:
+                if contended:
+                    PROJECT_LOCK_CONTENDED.inc()
+                PROJECT_LOCKS.set(len(self._locks))
+                fd = None
+                try:
+                    if fcntl is not None:
+                        try:
+                            fd = os.open(self.get_project_path(project_name), os.O_RDONLY)
+                        except FileNotFoundError:
+                            pass
+                        else:
+                            fcntl.flock(fd, fcntl.LOCK_EX)
+                    waited = time.perf_counter() - start
+                    PROJECT_LOCK_WAIT.labels(project_name).observe(waited)
+                    UPLOAD_STAGE_DURATION.labels('lock_wait').observe(waited)
+                    yield
+                finally:
+                    if fd is not None:
+                        os.close(fd)  # releases the flock
+        finally:
+            PROJECT_LOCKS.set(len(self._locks))
+    
+    def lock_stats(self) -> Dict[str, Any]:
+        """Live project lock count and contention counters."""
+        return self._locks.stats()
     
     def validate_project_name(self, name: str) -> bool:
         """Validate project name to prevent directory traversal."""
@@ -34,105 +283,448 @@ class ProjectStorage:
             raise ValueError(f"Invalid project name: {project_name}")
         return self._base_dir / project_name
     
+    def project_exists(self, project_name: str) -> bool:
+        """Check whether a project directory exists."""
+        return self.get_project_path(project_name).exists()
+    
     def list_projects(self) -> List[str]:
         """List all existing projects."""
-        if not self._base_dir.exists():
-            return []
-        
-        projects = []
-        for item in self._base_dir.iterdir():
-            if item.is_dir() and self.validate_project_name(item.name):
-                projects.append(item.name)
-        return sorted(projects)
+        return self.catalog.names()
+    
+    def list_project_infos(self) -> List[ProjectInfo]:
+        """List all existing projects with their image count and last change."""
+        return self.catalog.infos()
+    
+    def search_projects(
+        self,
+        query: str = "",
+        match: str = "prefix",
+        sort: str = "name",
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[List[ProjectInfo], int]:
+        """Search projects by name; returns one page and the total match count."""
+        return self.catalog.search(query, match, sort, limit, offset)
     
     def create_project(self, project_name: str) -> bool:
         """Create a project directory if it doesn't exist."""
         project_path = self.get_project_path(project_name)
         created = not project_path.exists()
         project_path.mkdir(parents=True, exist_ok=True)
+        self.catalog.add(project_name)
         return created
     
+    def get_temp_dir(self, project_name: Optional[str] = None) -> Path:
+        """Get (and create) a project's directory for files not yet in place.
+        
+        Without a project, the storage directory's own: for files received
+        before their project may be created, such as import archives.
+        """
+        base = self.get_project_path(project_name) if project_name is not None else self._base_dir
+        temp_dir = base / TEMP_DIR_NAME
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return temp_dir
+    
+    def _get_index(self, project_name: str) -> ImageIndex:
+        """Get the image index of a project."""
+        project_path = self.get_project_path(project_name)
+        return ImageIndex(self._base_dir / ".index" / f"{project_name}.sqlite", project_path)
+    
     def get_next_image_number(self, project_name: str) -> int:
         """Get the next available image number for a project."""
         project_path = self.get_project_path(project_name)
         if not project_path.exists():
             return 1
         
-        max_num = 0
-        for file_path in project_path.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() == '.jpg':
-                match = re.match(r'^(\d+)\.jpg$', file_path.name)
-                if match:
-                    num = int(match.group(1))
-                    max_num = max(max_num, num)
+        return self._get_index(project_name).next_number()
+    
+    def prepare_image(self, project_name: str, image_data: Union[bytes, BinaryIO]) -> PreparedImage:
+        """Decode an upload and encode it into a temp file in the project.
+        
+        This is the expensive part of saving and runs without any lock held.
+        Duplicates of stored images are detected by raw-byte hash before
+        decoding and by pixel hash before encoding, and skip the encode.
+        Inputs already in the output format are copied without re-encoding.
+        Inputs over the size limits raise ImageTooLarge before decoding.
+        Thumbnails are left to a background job queued by ``commit_images``.
+        """
+        temp_dir = self.get_project_path(project_name) / TEMP_DIR_NAME
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        index = self._get_index(project_name)
         
-        return max_num + 1
+        source = io.BytesIO(image_data) if isinstance(image_data, bytes) else image_data
+        with stage_timer('hash'):
+            raw_hash = hash_stream(source)
+        if DEDUP_MODE != 'off':
+            duplicate = self._prepare_duplicate(
+                project_name, index.find_by_hash(raw_hash=raw_hash), raw_hash, None
+            )
+            if duplicate:
+                return duplicate
+        
+        encoder = self._encoder
+        with stage_timer('decode'):
+            original = open_image(source)
+            size = original.size
+            passthrough = PASSTHROUGH and encoder.can_passthrough(original)
+            original = decode_image(original, MAX_STORED_DIMENSION)
+        # Scaled-down images are encoded, whatever their format
+        passthrough = passthrough and original.size == size
+        
+        # Formats without alpha (JPEG) get transparency flattened onto white
+        with stage_timer('composite'):
+            if encoder.supports_alpha and original.mode in ('RGBA', 'P', 'LA'):
+                image = original.convert('RGBA')
+            else:
+                image = flatten_alpha(original)
+        
+        with stage_timer('hash'):
+            pixel_hash = hash_pixels(image)
+            perceptual_hash = dhash(image)
+        if DEDUP_MODE != 'off':
+            duplicate = self._prepare_duplicate(
+                project_name, index.find_by_hash(pixel_hash=pixel_hash), raw_hash, pixel_hash
+            )
+            if duplicate:
+                return duplicate
+        
+        suffix = f".{encoder.extension}"
+        if passthrough:
+            source.seek(0)
+            with stage_timer('passthrough'):
+                path = write_temp(temp_dir, suffix, lambda f: shutil.copyfileobj(source, f), self._durable)
+        else:
+            with stage_timer('encode'):
+                path = write_temp(temp_dir, suffix, lambda f: encoder.encode(image, f), self._durable)
+        return PreparedImage(
+            path=path,
+            width=image.width,
+            height=image.height,
+            ext=encoder.extension,
+            raw_hash=raw_hash,
+            pixel_hash=pixel_hash,
+            dhash=perceptual_hash,
+        )
     
-    def save_image(self, project_name: str, image_data: bytes) -> str:
-        """Save an image to a project with automatic numbering."""
-        project_lock = self._get_project_lock(project_name)
+    def _prepare_duplicate(
+        self,
+        project_name: str,
+        match: Optional[Dict[str, Any]],
+        raw_hash: str,
+        pixel_hash: Optional[str],
+    ) -> Optional[PreparedImage]:
+        """Prepare an upload that duplicates a stored image without re-encoding it.
         
-        with project_lock:
-            # Ensure project exists
-            self.create_project(project_name)
-            
-            # Get next number
-            next_num = self.get_next_image_number(project_name)
-            filename = f"{next_num}.jpg"
-            
-            # Convert and save as JPEG
-            image = Image.open(io.BytesIO(image_data))
-            if image.mode in ('RGBA', 'P'):
-                # Convert to RGB for JPEG
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = rgb_image
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            file_path = self.get_project_path(project_name) / filename
-            image.save(file_path, 'JPEG', quality=90)
-            
-            return filename
+        Returns None when there is no usable match, e.g. the matching file
+        was deleted in the meantime.
+        """
+        if match is None:
+            return None
+        
+        filename = match['filename']
+        existing_path = self.get_project_path(project_name) / filename
+        duplicate = PreparedImage(
+            path=None,
+            width=match['width'],
+            height=match['height'],
+            ext=match['ext'],
+            raw_hash=raw_hash,
+            pixel_hash=pixel_hash or match['pixel_hash'],
+            dhash=match['dhash'],
+        )
+        
+        if DEDUP_MODE == 'reuse':
+            if not existing_path.is_file():
+                return None
+            duplicate.existing = filename
+            return duplicate
+        
+        # "link": stage hard links to the stored files; commit then treats
+        # them like freshly encoded temp files.
+        temp_dir = self.get_project_path(project_name) / TEMP_DIR_NAME
+        try:
+            duplicate.path = self._link_temp(existing_path, temp_dir)
+        except FileNotFoundError:
+            return None
+        for size in THUMBNAIL_SIZES:
+            try:
+                thumb_path = self._get_thumbs_dir(project_name, size) / f"{match['number']}.jpg"
+                duplicate.thumbnails[size] = self._link_temp(thumb_path, temp_dir)
+            except FileNotFoundError:
+                pass  # backfilled on first request
+        return duplicate
+    
+    def _link_temp(self, source: Path, temp_dir: Path) -> Path:
+        """Hard-link a file to a fresh name in the temp directory."""
+        while True:
+            temp_path = temp_dir / f"dedup-{os.urandom(8).hex()}{source.suffix}"
+            try:
+                os.link(source, temp_path)
+                return temp_path
+            except FileExistsError:
+                continue
+    
+    def commit_images(self, project_name: str, prepared: List[PreparedImage]) -> List[str]:
+        """Give prepared images consecutive numbers and move them into place.
+        
+        Only the number reservation and the links to ``N.<ext>`` happen under
+        the project lock. Numbers come from the index counter, which is safe
+        across processes; should ``N.<ext>`` exist anyway (written behind the
+        index's back), the link fails rather than overwriting it and a fresh
+        number is reserved. Numbers are consecutive unless that happens.
+        Temp files are consumed on success. Reused duplicates keep their
+        existing filename and take no number.
+        
+        Temp files hold complete (and, when durable, fsynced) images, so a
+        name only ever appears with its full contents; in durable mode the
+        new names are fsynced before the index records them. Thumbnails not
+        linked from a duplicate are queued as a background job.
+        """
+        project_path = self.get_project_path(project_name)
+        to_store = [item for item in prepared if item.existing is None]
+        stored: Dict[int, int] = {}
+        
+        with self._project_lock(project_name), stage_timer('commit'):
+            index = self._get_index(project_name)
+            # Reserved numbers stay pending in the index until added, so
+            # readers don't take the links below for out-of-band changes
+            first = index.reserve_numbers(len(to_store)) if to_store else 0
+            unused = list(range(first, first + len(to_store)))
+            try:
+                for offset, item in enumerate(to_store):
+                    number = first + offset
+                    while True:
+                        file_path = project_path / f"{number}.{item.ext}"
+                        try:
+                            # link() never replaces an existing file, unlike rename()
+                            os.link(item.path, file_path)
+                            break
+                        except FileExistsError:
+                            number = index.reserve_numbers(1)
+                            unused.append(number)
+                    stored[id(item)] = number
+                if to_store and self._durable:
+                    fsync_dir(project_path)
+                records = []
+                for item in to_store:
+                    number = stored[id(item)]
+                    stat = (project_path / f"{number}.{item.ext}").stat()
+                    records.append({
+                        'number': number, 'size': stat.st_size, 'width': item.width, 'height': item.height,
+                        'mtime': stat.st_mtime, 'ext': item.ext, 'raw_hash': item.raw_hash,
+                        'pixel_hash': item.pixel_hash, 'dhash': item.dhash,
+                    })
+                # One index transaction for the whole batch
+                index.add_many(records)
+                added = set(stored.values())
+                unused = [number for number in unused if number not in added]
+            finally:
+                if unused:
+                    index.release(unused)
+        
+        for item in to_store:
+            if item.dhash is not None:
+                self.similar.add(project_name, stored[id(item)], item.ext, item.dhash)
+        if any(item.dhash is None for item in to_store):
+            # Linked to a stored image that predates perceptual hashes
+            self.jobs.enqueue("dhashes", project_name)
+        if to_store:
+            self.catalog.record_images(project_name, len(to_store))
+            self.changes.notify(project_name)
+        missing_thumbnails = []
+        for item in to_store:
+            for size, thumb_path in item.thumbnails.items():
+                thumbs_dir = self._get_thumbs_dir(project_name, size)
+                thumbs_dir.mkdir(parents=True, exist_ok=True)
+                os.replace(thumb_path, thumbs_dir / f"{stored[id(item)]}.jpg")
+            if len(item.thumbnails) < len(THUMBNAIL_SIZES):
+                missing_thumbnails.append({"number": stored[id(item)]})
+        if missing_thumbnails:
+            self.jobs.enqueue_many("thumbnails", project_name, missing_thumbnails)
+        
+        for item in prepared:
+            self.discard_prepared(item)
+        return [item.existing or f"{stored[id(item)]}.{item.ext}" for item in prepared]
     
-    def list_images(self, project_name: str) -> List[Dict[str, str]]:
+    def discard_prepared(self, prepared: PreparedImage) -> None:
+        """Remove the temp files of a prepared image."""
+        for path in [prepared.path, *prepared.thumbnails.values()]:
+            if path is None:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+    
+    def save_image(self, project_name: str, image_data: Union[bytes, BinaryIO]) -> str:
+        """Save an image (raw bytes or a readable file) to a project with automatic numbering."""
+        # Ensure project exists
+        self.create_project(project_name)
+        
+        prepared = self.prepare_image(project_name, image_data)
+        try:
+            return self.commit_images(project_name, [prepared])[0]
+        finally:
+            self.discard_prepared(prepared)
+    
+    def _image_info(self, project_name: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        filename = record['filename']
+        thumbnails = {
+            str(size): f"/api/projects/{project_name}/thumbs/{size}/{record['number']}.jpg"
+            for size in THUMBNAIL_SIZES
+        }
+        return {
+            'filename': filename,
+            'url': f'/api/projects/{project_name}/images/{filename}',
+            'media_type': media_type_for(filename),
+            'thumbnail_url': thumbnails[str(THUMBNAIL_SIZES[0])],
+            'thumbnails': thumbnails,
+            'size': record['size'],
+            'width': record['width'],
+            'height': record['height'],
+            'mtime': record['mtime'],
+        }
+    
+    def list_images(self, project_name: str) -> List[Dict[str, Any]]:
         """List all images in a project."""
         project_path = self.get_project_path(project_name)
         if not project_path.exists():
             return []
         
-        images = []
-        for file_path in project_path.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() == '.jpg':
-                match = re.match(r'^(\d+)\.jpg$', file_path.name)
-                if match:
-                    images.append({
-                        'filename': file_path.name,
-                        'url': f'/api/projects/{project_name}/images/{file_path.name}'
-                    })
+        return [self._image_info(project_name, record) for record in self._get_index(project_name).list()]
+    
+    def list_images_page(
+        self,
+        project_name: str,
+        limit: int,
+        cursor: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> Dict[str, Any]:
+        """List one page of images, continuing after the image number ``cursor``.
+        
+        ``seq`` is the project's change sequence number as of the listing,
+        to follow further changes from with ``get_changes()``.
+        """
+        project_path = self.get_project_path(project_name)
+        if not project_path.exists():
+            return {'images': [], 'total': 0, 'next_cursor': None, 'seq': 0}
+        
+        index = self._get_index(project_name)
+        # Taken first: replaying changes from here can't miss any made
+        # while the page was read
+        seq = index.change_seq()
+        page = index.page(limit, cursor, newest_first)
+        return {
+            'images': [self._image_info(project_name, record) for record in page['records']],
+            'total': page['total'],
+            'next_cursor': page['next_cursor'],
+            'seq': seq,
+        }
+    
+    def get_change_seq(self, project_name: str) -> int:
+        """Sequence number of a project's latest change (0 if it has none)."""
+        if not self.project_exists(project_name):
+            return 0
+        return self._get_index(project_name).change_seq()
+    
+    def change_marker(self, project_name: str) -> Optional[Tuple[int, int]]:
+        """Modification times of a project's index and directory.
+        
+        Every change, recorded or out-of-band, moves one of them, so an
+        unchanged marker means there is no need to read the change feed.
+        None if either changed in the last second: a change in the same
+        clock tick wouldn't move it. Two stat() calls: cheap enough to make
+        from the event loop.
+        """
+        marker = []
+        for path in (self._base_dir / ".index" / f"{project_name}.sqlite", self.get_project_path(project_name)):
+            try:
+                marker.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                marker.append(0)
+        if max(marker) > time.time_ns() - 10 ** 9:
+            return None
+        return marker[0], marker[1]
+    
+    def get_changes(self, project_name: str, since: int, limit: int = 500) -> Dict[str, Any]:
+        """Changes to a project after sequence number ``since``, ready to apply.
         
-        # Sort by number
-        images.sort(key=lambda x: int(x['filename'].split('.')[0]))
-        return images
+        Returns the next ``seq`` to ask from, the changed images in order
+        (``added`` with the image info, ``deleted`` with just the filename)
+        and the README text if it changed. With ``reset`` set the changes
+        are incomplete and the client has to reload the project.
+        """
+        feed = self._get_index(project_name).changes_since(since, limit)
+        added = [change['number'] for change in feed['changes'] if change['kind'] == 'add']
+        records = self._get_index(project_name).get_many(added) if added else {}
+        
+        changes = []
+        readme_changed = False
+        for change in feed['changes']:
+            if change['kind'] == 'readme':
+                readme_changed = True
+                continue
+            filename = f"{change['number']}.{change['ext']}"
+            if change['kind'] == 'delete':
+                changes.append({'seq': change['seq'], 'type': 'deleted', 'filename': filename, 'image': None})
+                continue
+            record = records.get(change['number'])
+            # An image deleted again since is reported by its later delete
+            if record is not None and record['filename'] == filename:
+                changes.append({
+                    'seq': change['seq'], 'type': 'added', 'filename': filename,
+                    'image': self._image_info(project_name, record),
+                })
+        return {
+            'seq': feed['seq'],
+            'reset': feed['reset'],
+            'more': feed['more'],
+            'changes': changes,
+            'readme': self.read_readme(project_name) if readme_changed else None,
+        }
     
     def delete_image(self, project_name: str, filename: str) -> bool:
         """Delete an image from a project."""
-        if not re.match(r'^\d+\.jpg$', filename):
+        match = match_image_filename(filename)
+        if not match:
             return False
         
         project_path = self.get_project_path(project_name)
         file_path = project_path / filename
         
-        if file_path.exists() and file_path.is_file():
-            file_path.unlink()
-            return True
-        return False
+        with self._project_lock(project_name):
+            if file_path.exists() and file_path.is_file():
+                number = int(match.group(1))
+                index = self._get_index(project_name)
+                index.expect_removal(number)
+                perceptual_hash = index.get_dhash(number)
+                try:
+                    file_path.unlink()
+                except BaseException:
+                    index.release([number])
+                    raise
+                index.remove(number)
+                if perceptual_hash is not None:
+                    self.similar.remove(project_name, number, perceptual_hash)
+                self._delete_thumbnails(project_name, number)
+                self.catalog.record_images(project_name, -1)
+                self.changes.notify(project_name)
+                return True
+            return False
+    
+    def _get_thumbs_dir(self, project_name: str, size: int) -> Path:
+        return self.get_project_path(project_name) / THUMBS_DIR_NAME / str(size)
+    
+    def _delete_thumbnails(self, project_name: str, number: int) -> None:
+        for size in THUMBNAIL_SIZES:
+            try:
+                (self._get_thumbs_dir(project_name, size) / f"{number}.jpg").unlink()
+            except FileNotFoundError:
+                pass
     
     def get_image_path(self, project_name: str, filename: str) -> Optional[Path]:
         """Get the path to an image file."""
-        if not re.match(r'^\d+\.jpg$', filename):
+        if not match_image_filename(filename):
             return None
         
         project_path = self.get_project_path(project_name)
@@ -142,6 +734,171 @@ class ProjectStorage:
             return file_path
         return None
     
+    def get_thumbnail_path(self, project_name: str, size: int, filename: str) -> Optional[Path]:
+        """Get the path to a thumbnail (``N.jpg``), generating it if it is missing."""
+        match = THUMB_FILENAME_RE.match(filename)
+        if size not in THUMBNAIL_SIZES or not match:
+            return None
+        
+        thumb_path = self._get_thumbs_dir(project_name, size) / filename
+        if thumb_path.is_file():
+            return thumb_path
+        
+        # Not generated yet: its job is still queued, or the image predates thumbnails
+        if not self.project_exists(project_name):
+            return None
+        record = self._get_index(project_name).get(int(match.group(1)))
+        image_path = self.get_image_path(project_name, record['filename']) if record else None
+        if not image_path:
+            return None
+        
+        temp_dir = self.get_project_path(project_name) / TEMP_DIR_NAME
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        with Image.open(image_path) as image:
+            image.draft('RGB', (size, size))
+            thumb = make_thumbnail(flatten_alpha(image), size)
+        temp_path = save_jpeg_temp(thumb, temp_dir, THUMBNAIL_QUALITY, self._durable)
+        
+        # Don't resurrect a thumbnail for an image deleted meanwhile
+        with self._project_lock(project_name):
+            if not image_path.exists():
+                temp_path.unlink()
+                return None
+            os.replace(temp_path, thumb_path)
+        return thumb_path
+    
+    def _make_thumbnails(self, project_name: str, payload: Dict[str, Any]) -> None:
+        """Job handler generating the thumbnails of a newly stored image."""
+        if not self.project_exists(project_name):
+            return
+        for size in THUMBNAIL_SIZES:
+            with stage_timer('thumbnails'):
+                self.get_thumbnail_path(project_name, size, f"{payload['number']}.jpg")
+    
+    def _backfill_dhashes(self, project_name: str, payload: Dict[str, Any]) -> None:
+        """Job handler hashing the images of a project stored without a perceptual hash."""
+        if not self.project_exists(project_name):
+            return
+        index = self._get_index(project_name)
+        for record in index.missing_dhashes():
+            image_path = self.get_project_path(project_name) / record['filename']
+            try:
+                with Image.open(image_path) as image:
+                    image.draft('RGB', (64, 64))
+                    value = dhash(image)
+            except (OSError, ValueError):
+                continue  # deleted meanwhile, or not an image
+            index.set_dhash(record['number'], value)
+            self.similar.add(project_name, record['number'], record['ext'], value)
+    
+    def load_similarity_index(self) -> None:
+        """Load the perceptual hashes of all projects into ``similar``.
+        
+        Projects with images that have no hash yet get a job computing them.
+        """
+        with self._similar_load_lock:
+            if self.similar.loaded:
+                return
+            
+            def entries():
+                for project_name in self.list_projects():
+                    index = self._get_index(project_name)
+                    self._similar_seen[project_name] = (self.change_marker(project_name), index.change_seq())
+                    for number, ext, value in index.dhashes():
+                        yield project_name, number, ext, value
+                    if index.missing_dhashes():
+                        self.jobs.enqueue("dhashes", project_name)
+            
+            self.similar.load(entries())
+            self._similar_synced = time.monotonic()
+    
+    def sync_similarity_index(self, force: bool = False) -> None:
+        """Fold images saved or deleted by other processes into ``similar``.
+        
+        Runs at most every SIMILARITY_SYNC_SECONDS unless ``force``d. Only
+        the catalog's projects whose change marker moved are read, from the
+        change feed position reached last time.
+        """
+        with self._similar_load_lock:
+            if not force and time.monotonic() - self._similar_synced < SIMILARITY_SYNC_SECONDS:
+                return
+            self._similar_synced = time.monotonic()
+            for project_name in self.list_projects():
+                marker = self.change_marker(project_name)
+                seen = self._similar_seen.get(project_name)
+                if seen is not None and seen[0] is not None and seen[0] == marker:
+                    continue
+                index = self._get_index(project_name)
+                since = seen[1] if seen is not None else 0
+                added = set()
+                while True:
+                    feed = index.changes_since(since, 500)
+                    since = feed['seq']
+                    if feed['reset']:
+                        # History is gone: fold in every hash; deleted images
+                        # left behind are filtered out by find_similar
+                        added = None
+                        break
+                    for change in feed['changes']:
+                        if change['kind'] == 'add':
+                            added.add(change['number'])
+                        elif change['kind'] == 'delete':
+                            added.discard(change['number'])
+                            self.similar.discard(project_name, change['number'])
+                    if not feed['more']:
+                        break
+                if added is None or added:
+                    for number, ext, value in index.dhashes():
+                        if added is None or number in added:
+                            self.similar.add(project_name, number, ext, value)
+                self._similar_seen[project_name] = (marker, since)
+    
+    def find_similar(
+        self, project_name: str, filename: str, max_distance: int, limit: int = 50
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Images in any project whose perceptual hash is within ``max_distance`` bits.
+        
+        Returns None if the image doesn't exist; results are closest first
+        and leave out the image itself.
+        """
+        match = match_image_filename(filename)
+        if not match or not self.project_exists(project_name):
+            return None
+        number = int(match.group(1))
+        index = self._get_index(project_name)
+        record = index.get(number)
+        if record is None or record['filename'] != filename:
+            return None
+        value = index.get_dhash(number)
+        if value is None:
+            # Not hashed yet; a queued job would get to it eventually
+            with Image.open(self.get_project_path(project_name) / filename) as image:
+                image.draft('RGB', (64, 64))
+                value = dhash(image)
+            index.set_dhash(number, value)
+            self.similar.add(project_name, number, record['ext'], value)
+        self.load_similarity_index()
+        self.sync_similarity_index()
+        
+        results = []
+        # A few extra for the image itself and entries of files deleted
+        # behind the index's back
+        for other_project, other_number, ext, distance in self.similar.search(value, max_distance, limit + 8):
+            if (other_project, other_number) == (project_name, number):
+                continue
+            other_filename = f"{other_number}.{ext}"
+            if not (self._base_dir / other_project / other_filename).is_file():
+                continue
+            results.append({
+                'project': other_project,
+                'filename': other_filename,
+                'distance': distance,
+                'url': f'/api/projects/{other_project}/images/{other_filename}',
+                'thumbnail_url': f'/api/projects/{other_project}/thumbs/{THUMBNAIL_SIZES[0]}/{other_number}.jpg',
+            })
+        return results[:limit]
+    
     def read_readme(self, project_name: str) -> str:
         """Read the README.md file for a project."""
         project_path = self.get_project_path(project_name)
@@ -153,11 +910,157 @@ class ProjectStorage:
     
     def write_readme(self, project_name: str, content: str) -> None:
         """Write the README.md file for a project."""
-        # Ensure project exists
+        # Ensure project exists (and can be locked across processes)
         self.create_project(project_name)
         
+        # Written aside and renamed over the README, so readers (and a crash)
+        # see the old or the new text, never a partial one
         project_path = self.get_project_path(project_name)
-        readme_path = project_path / "README.md"
-        readme_path.write_text(content, encoding='utf-8')
+        temp_path = write_temp(
+            self.get_temp_dir(project_name), ".md", lambda f: f.write(content.encode('utf-8')),
+            self._durable, prefix="readme-",
+        )
+        try:
+            with self._project_lock(project_name):
+                # Creating the README changes the directory mtime; keep the index
+                # from mistaking that for an out-of-band image change.
+                index = self._get_index(project_name)
+                index.refresh()
+                
+                os.replace(temp_path, project_path / "README.md")
+                if self._durable:
+                    fsync_dir(project_path)
+                index.mark_synced('readme')
+                stat = (project_path / "README.md").stat()
+                # The README is written; failing to index it only delays search
+                try:
+                    self.readme_index.update(project_name, content, stat.st_mtime_ns, stat.st_size)
+                except sqlite3.Error:
+                    logger.exception("Indexing the README of %s failed; retrying in the background", project_name)
+                    try:
+                        self.jobs.enqueue("readme", project_name)
+                    except sqlite3.Error:
+                        logger.exception("Queueing the README reindex of %s failed", project_name)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        self.catalog.touch(project_name)
+        self.changes.notify(project_name)
+    
+    def _reindex_readme(self, project_name: str, payload: Dict[str, Any]) -> None:
+        """Job handler indexing a project's README as it is on disk."""
+        readme_path = self.get_project_path(project_name) / "README.md"
+        with self._project_lock(project_name):
+            try:
+                stat = readme_path.stat()
+                content = readme_path.read_text(encoding='utf-8', errors='replace')
+            except FileNotFoundError:
+                self.readme_index.remove(project_name)
+                return
+            self.readme_index.update(project_name, content, stat.st_mtime_ns, stat.st_size)
+
+    def sync_readme_index(self) -> int:
+        """Reindex READMEs edited, and drop projects removed, outside this API.
+        
+        Returns the number of projects whose entry changed.
+        """
+        return self.readme_index.sync({
+            project_name: self.get_project_path(project_name) / "README.md"
+            for project_name in self.list_projects()
+        })
+    
+    def search_readmes(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Full-text search over the project READMEs; see ``ReadmeIndex.search``."""
+        return self.readme_index.search(query, limit, offset)
+    
+    def cleanup_temp_files(self, max_age: float) -> int:
+        """Remove leftovers older than ``max_age`` seconds from the temp directories.
+        
+        Uploads, imports and exports interrupted by a crash leave their files
+        in ``.tmp``. Younger files may still be in use by another worker
+        process and are kept. Returns the number of entries removed.
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        try:
+            projects = [entry.name for entry in os.scandir(self._base_dir)
+                        if self.validate_project_name(entry.name) and entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        for temp_dir in [self._base_dir / TEMP_DIR_NAME] + [
+            self.get_project_path(project_name) / TEMP_DIR_NAME for project_name in projects
+        ]:
+            try:
+                entries = list(os.scandir(temp_dir))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+    
+    def snapshot_project(self, project_name: str) -> Optional[Path]:
+        """Freeze a project's images and README into a new temp directory.
+        
+        Images are never modified once stored and the README is only ever
+        replaced by a rename, so hard links capture them without copying.
+        Taken under the project lock, the snapshot holds exactly the images
+        committed at that moment. Returns None if the project doesn't exist.
+        """
+        project_path = self.get_project_path(project_name)
+        if not project_path.is_dir():
+            return None
+        snapshot_dir = Path(tempfile.mkdtemp(dir=self.get_temp_dir(project_name), prefix="export-"))
+        try:
+            with self._project_lock(project_name):
+                index = self._get_index(project_name)
+                index.refresh()
+                for record in index.list():
+                    try:
+                        os.link(project_path / record['filename'], snapshot_dir / record['filename'])
+                    except FileNotFoundError:
+                        pass
+                try:
+                    os.link(project_path / "README.md", snapshot_dir / "README.md")
+                except FileNotFoundError:
+                    pass
+        except BaseException:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            raise
+        return snapshot_dir
+    
+    def export_zip(self, project_name: str) -> Optional[Iterator[bytes]]:
+        """Snapshot a project now and return a generator of its ZIP archive.
+        
+        Images are stored uncompressed (they already are compressed), the
+        README is deflated. The snapshot is removed once the generator is
+        exhausted or closed.
+        """
+        snapshot_dir = self.snapshot_project(project_name)
+        if snapshot_dir is None:
+            return None
+        
+        def generate() -> Iterator[bytes]:
+            try:
+                # Images by number, then the README
+                entries = sorted(
+                    snapshot_dir.iterdir(),
+                    key=lambda path: (path.name == "README.md", int(path.stem) if path.stem.isdigit() else 0),
+                )
+                yield from stream_zip(
+                    (path, path.name, path.name == "README.md") for path in entries
+                )
+            finally:
+                shutil.rmtree(snapshot_dir, ignore_errors=True)
+        
+        return generate()
 
 storage = ProjectStorage()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+from fastapi import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from .config import MAX_FILE_SIZE, UPLOAD_SPOOL_SIZE
+from .executor import io_pool
+
+# Allowance for multipart boundaries and part headers on top of the file bytes
+MULTIPART_OVERHEAD = 64 * 1024
+# receive_to_file() collects this much of the body per write in io_pool
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """Raised when a multipart upload cannot be accepted."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class ReceivedFile:
+    """A file part spooled to memory (small) or a temp file (large)."""
+    filename: str
+    content_type: str
+    file: BinaryIO
+    size: int = 0
+
+    def close(self) -> None:
+        self.file.close()
+
+
+@dataclass
+class _PartState:
+    headers: List[Tuple[bytes, bytes]] = field(default_factory=list)
+    header_field: bytes = b""
+    header_value: bytes = b""
+    current: Optional[ReceivedFile] = None
+
+
+def check_content_length(request: Request, max_files: int = 1) -> None:
+    """Reject a request whose declared length can't fit the allowed files."""
+    content_length = request.headers.get("content-length")
+    if content_length is None:
+        return
+    try:
+        length = int(content_length)
+    except ValueError:
+        raise UploadError(400, "Invalid Content-Length")
+    if length > MAX_FILE_SIZE * max_files + MULTIPART_OVERHEAD * max_files:
+        raise UploadError(413, "File too large")
+
+
+async def receive_files(
+    request: Request,
+    field_name: str = "file",
+    max_files: int = 1,
+    max_file_size: int = MAX_FILE_SIZE,
+) -> List[ReceivedFile]:
+    """Stream multipart file parts of ``field_name`` into spooled temp files.
+
+    The body is consumed chunk by chunk and reading stops as soon as any file
+    exceeds ``max_file_size``, so oversized uploads are never buffered whole.
+    Other form fields are ignored. The caller owns (and must close) the files.
+    """
+    check_content_length(request, max_files)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError(400, "Expected multipart/form-data")
+
+    files: List[ReceivedFile] = []
+    state = _PartState()
+    errors: List[UploadError] = []
+
+    def on_part_begin() -> None:
+        state.headers = []
+        state.current = None
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state.header_field += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        state.header_value += data[start:end]
+
+    def on_header_end() -> None:
+        state.headers.append((state.header_field.lower(), state.header_value))
+        state.header_field = b""
+        state.header_value = b""
+
+    def on_headers_finished() -> None:
+        headers = dict(state.headers)
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("latin-1") != field_name or b"filename" not in options:
+            return
+        if len(files) >= max_files:
+            errors.append(UploadError(400, f"Too many files (max {max_files})"))
+            return
+        state.current = ReceivedFile(
+            filename=options[b"filename"].decode("utf-8", errors="replace"),
+            content_type=headers.get(b"content-type", b"").decode("latin-1"),
+            file=tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE),
+        )
+        files.append(state.current)
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        current = state.current
+        if current is None:
+            return
+        current.size += end - start
+        if current.size > max_file_size:
+            errors.append(UploadError(413, "File too large"))
+            state.current = None
+            return
+        current.file.write(data[start:end])
+
+    def on_part_end() -> None:
+        if state.current is not None:
+            state.current.file.seek(0)
+        state.current = None
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if errors:
+                raise errors[0]
+        parser.finalize()
+    except UploadError:
+        for received in files:
+            received.close()
+        raise
+    except Exception:
+        for received in files:
+            received.close()
+        raise UploadError(400, "Malformed multipart body")
+    return files
+
+
+async def receive_to_file(request: Request, directory: Path, max_size: int) -> Path:
+    """Stream a raw request body into a new temp file in ``directory``.
+
+    Used for bodies that other processes must open by path, such as ZIP
+    imports. Stops with 413 once the body grows past ``max_size``. The
+    writes happen in io_pool, WRITE_BUFFER_SIZE at a time.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_size:
+        raise UploadError(413, "File too large")
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix="import-", suffix=".zip")
+    size = 0
+    buffer = bytearray()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError(413, "File too large")
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER_SIZE:
+                    await io_pool.run(f.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await io_pool.run(f.write, bytes(buffer))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return Path(temp_path)
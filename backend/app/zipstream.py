@@ -0,0 +1,51 @@
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+# Read size per file; also bounds the size of each yielded chunk
+CHUNK_SIZE = 256 * 1024
+
+
+class _Sink:
+    """Write-only, unseekable file that collects output until drained.
+
+    Handing zipfile an unseekable file makes it write sizes and CRCs in data
+    descriptors after each entry instead of seeking back to the header, so
+    the archive can be sent as it is written.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b"".join(chunks)
+
+
+def stream_zip(files: Iterable[Tuple[Path, str, bool]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``(path, arcname, compress)`` entries piece by piece.
+
+    Files are read in CHUNK_SIZE pieces and each piece is yielded as soon as
+    it is written, so memory use doesn't depend on the size of the files or
+    their number (beyond zipfile's central directory, a few dozen bytes per
+    entry). Entries that aren't compressed are stored as-is.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for path, arcname, compress in files:
+            info = zipfile.ZipInfo.from_file(path, arcname, strict_timestamps=False)
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            with open(path, "rb") as source, archive.open(info, "w") as entry:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    entry.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
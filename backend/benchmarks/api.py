@@ -0,0 +1,123 @@
+"""End-to-end upload and download throughput through the HTTP API.
+
+Drives the ASGI app in-process with httpx by default (storage goes to a temp
+directory), or a running server with --url. Each concurrency level runs
+uploads of distinct screenshots followed by downloads of the stored images.
+
+    cd backend
+    python -m benchmarks.api [--quick] [--url http://localhost:8000] [--output api.json]
+"""
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import make_image_bytes, print_table, summarize, write_results
+
+CONCURRENCY = [1, 8, 32]
+IMAGE_SIZE = (1920, 1080)
+
+
+async def _drive(concurrency: int, requests: List, send) -> Dict[str, Any]:
+    """Issue ``requests`` from ``concurrency`` workers and collect latencies."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            item = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                await send(item)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    row = summarize(latencies) if latencies else {"runs": 0}
+    row.update({
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": len(latencies) / elapsed,
+    })
+    return row
+
+
+async def bench(client: httpx.AsyncClient, requests_per_level: int, levels: List[int]) -> Dict[str, Any]:
+    results = {}
+    width, height = IMAGE_SIZE
+    for concurrency in levels:
+        project = f"bench-{uuid.uuid4().hex[:8]}"
+        (await client.post("/api/projects", json={"name": project})).raise_for_status()
+        payloads = [make_image_bytes(width, height, "RGB", variant) for variant in range(requests_per_level)]
+        filenames: List[str] = []
+
+        async def upload(data: bytes):
+            response = await client.post(
+                f"/api/projects/{project}/images", files={"file": ("shot.png", data, "image/png")}
+            )
+            response.raise_for_status()
+            filenames.append(response.json()["filename"])
+
+        async def download(filename: str):
+            response = await client.get(f"/api/projects/{project}/images/{filename}")
+            response.raise_for_status()
+
+        row = await _drive(concurrency, payloads, upload)
+        row["mb_per_s"] = row["requests_per_s"] * sum(map(len, payloads)) / len(payloads) / 2**20
+        results[f"upload/c{concurrency}"] = row
+        results[f"download/c{concurrency}"] = await _drive(concurrency, filenames * 4, download)
+    return results
+
+
+async def run(quick: bool = False, url: Optional[str] = None) -> Dict[str, Any]:
+    requests_per_level = 8 if quick else 64
+    levels = [1, 8] if quick else CONCURRENCY
+    limits = httpx.Limits(max_connections=max(levels))
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            return await bench(client, requests_per_level, levels)
+
+    from app import main
+    from app.storage import ProjectStorage
+
+    base_dir = Path(tempfile.mkdtemp(prefix="bench-api-"))
+    original = main.storage
+    main.storage = ProjectStorage(base_dir=base_dir)
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await bench(client, requests_per_level, levels)
+    finally:
+        main.storage = original
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer requests for a fast smoke run")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.quick, args.url))
+    print_table(results, ["runs", "errors", "requests_per_s", "median_ms", "p95_ms"])
+    if args.output:
+        write_results(args.output, "api", results)
+
+
+if __name__ == "__main__":
+    main()
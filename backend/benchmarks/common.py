@@ -0,0 +1,103 @@
+"""Shared helpers for the benchmark scripts."""
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from PIL import Image
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Reduce a list of durations (seconds) to millisecond statistics."""
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Time ``func`` ``repeat`` times after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def make_image_bytes(width: int, height: int, mode: str, variant: int = 0, fmt: str = "PNG") -> bytes:
+    """Encode a test image with some structure (gradient plus noise).
+
+    ``variant`` is written into the first pixels as black/white bits, so
+    different variants never deduplicate against each other.
+    """
+    base = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 30)
+    rgb = Image.merge("RGB", (base, noise, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    for bit in range(min(32, width)):
+        rgb.putpixel((bit, 0), (255, 255, 255) if variant >> bit & 1 else (0, 0, 0))
+    if mode == "RGBA":
+        image = rgb.convert("RGBA")
+        image.putalpha(base)
+    elif mode == "P":
+        image = rgb.quantize(256)
+    else:
+        image = rgb.convert(mode)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Describe where the numbers came from, for comparing runs across releases."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pillow": Image.__version__,
+    }
+
+
+def write_results(path: Path, benchmark: str, results: Dict[str, Any]) -> None:
+    path.write_text(json.dumps(
+        {"benchmark": benchmark, "environment": environment(), "results": results},
+        indent=2,
+    ))
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: List[str]) -> None:
+    width = max(len(name) for name in results) + 2
+    print(f"{'case':<{width}}" + "".join(f"{column:>16}" for column in columns))
+    for name, row in results.items():
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"{value:>16.2f}" if isinstance(value, float) else f"{value!s:>16}")
+        print(f"{name:<{width}}" + "".join(cells))
@@ -0,0 +1,153 @@
+"""Download throughput of large images with many concurrent clients.
+
+Starts uvicorn on a temp storage directory holding one large image (or
+targets a running server with --url and --path) and fetches it from many
+concurrent connections, whole and in byte ranges. The ``disk`` row reads
+the same file straight from the page cache in this process, as the ceiling
+the server is measured against.
+
+    cd backend
+    python -m benchmarks.downloads [--quick] [--url http://localhost:8000 --path /api/...] [--output downloads.json]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, print_table, summarize, write_results
+
+CONCURRENCY = [1, 8, 32, 128]
+FILE_SIZE = 16 * 2**20
+RANGE_SIZE = 2**20
+PROJECT = "bench-downloads"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(storage_dir: Path, port: int) -> subprocess.Popen:
+    env = {**os.environ, "STORAGE_DIR": str(storage_dir), "CATALOG_RESCAN_SECONDS": "0"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/projects").raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def _disk_baseline(path: Path, repeat: int) -> Dict[str, Any]:
+    """Read the file in 256KB chunks, the cost of the bytes themselves."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(path, "rb") as file:
+            while file.read(256 * 1024):
+                pass
+        samples.append(time.perf_counter() - start)
+    row = summarize(samples)
+    row["mb_per_s"] = path.stat().st_size * len(samples) / sum(samples) / 2**20
+    return row
+
+
+async def _drive(client: httpx.AsyncClient, path: str, concurrency: int, total: int,
+                 headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    remaining = total
+    latencies: List[float] = []
+    received = 0
+    errors = 0
+
+    async def worker():
+        nonlocal remaining, received, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                async with client.stream("GET", path, headers=headers) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    row = summarize(latencies) if latencies else {"runs": 0}
+    row.update({"concurrency": concurrency, "errors": errors, "mb_per_s": received / elapsed / 2**20})
+    return row
+
+
+async def bench(base_url: str, path: str, quick: bool) -> Dict[str, Any]:
+    levels = [1, 8] if quick else CONCURRENCY
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for concurrency in levels:
+            total = max(concurrency, 4 if quick else 16) * 2
+            results[f"full/c{concurrency}"] = await _drive(client, path, concurrency, total)
+            results[f"range/c{concurrency}"] = await _drive(
+                client, path, concurrency, total * 4, {"Range": f"bytes={RANGE_SIZE}-{2 * RANGE_SIZE - 1}"}
+            )
+    return results
+
+
+def run(quick: bool = False, url: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    if url:
+        if not path:
+            raise SystemExit("--path is required with --url")
+        return asyncio.run(bench(url, path, quick))
+
+    storage_dir = Path(tempfile.mkdtemp(prefix="bench-downloads-"))
+    # Random bytes: the server never decodes what it serves
+    image = storage_dir / PROJECT / "1.jpg"
+    image.parent.mkdir()
+    image.write_bytes(os.urandom(FILE_SIZE // 4 if quick else FILE_SIZE))
+    port = _free_port()
+    server = _start_server(storage_dir, port)
+    try:
+        results = {"disk": _disk_baseline(image, 4 if quick else 16)}
+        results.update(asyncio.run(bench(f"http://127.0.0.1:{port}", f"/api/projects/{PROJECT}/images/1.jpg", quick)))
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller file and fewer requests")
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--path", help="image path to fetch from --url, e.g. /api/projects/p/images/1.jpg")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.quick, args.url, args.path)
+    print_table(results, ["runs", "errors", "mb_per_s", "median_ms", "p95_ms"])
+    if args.output:
+        write_results(args.output, "downloads", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Compare stored-image encoders on a corpus of screenshots.
+
+Measures encode time and bytes on disk for each encoder configuration in
+app/encoders.py, using either the images in --corpus or a generated set of
+synthetic UI screenshots.
+
+    cd backend
+    python -m benchmarks.encoders [--corpus DIR] [--repeat 3] [--output results.json]
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image, ImageDraw
+
+from app.encoders import Encoder, JpegEncoder, PngEncoder, WebpEncoder
+from app.storage import flatten_alpha
+from benchmarks.common import write_results
+
+CONFIGURATIONS: List[Tuple[str, Callable[[], Encoder]]] = [
+    ("jpeg-q90", lambda: JpegEncoder(quality=90)),
+    ("jpeg-q90-optimize-progressive", lambda: JpegEncoder(quality=90, optimize=True, progressive=True)),
+    ("webp-q85", lambda: WebpEncoder(quality=85, lossless=False)),
+    ("webp-lossless", lambda: WebpEncoder(lossless=True, method=4)),
+    ("png", lambda: PngEncoder(compress_level=6)),
+]
+
+SYNTHETIC_SIZES = [(1280, 800), (1920, 1080), (2560, 1440)]
+
+
+def synthetic_screenshot(width: int, height: int, seed: int) -> Image.Image:
+    """Draw a UI-like screenshot: flat panels, text lines and one photo area."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (245, 246, 248))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, 56), fill=(33, 37, 41))
+    draw.rectangle((0, 56, 240, height), fill=(255, 255, 255))
+    for row in range(60, height - 20, 22):
+        x = rng.randint(260, 300)
+        text = " ".join("lorem"[: rng.randint(2, 5)] * rng.randint(1, 3) for _ in range(rng.randint(4, 14)))
+        draw.text((x, row), text, fill=(rng.randint(0, 90),) * 3)
+    for _ in range(8):
+        x0, y0 = rng.randint(260, width - 200), rng.randint(80, height - 120)
+        draw.rounded_rectangle((x0, y0, x0 + 160, y0 + 36), radius=6,
+                               fill=(rng.randint(0, 255), rng.randint(80, 200), 220))
+    # A noisy "photo" region, the part lossless codecs handle worst
+    photo_w, photo_h = width // 4, height // 4
+    photo = Image.effect_noise((photo_w, photo_h), 40).convert("RGB")
+    image.paste(photo, (width - photo_w - 40, height - photo_h - 40))
+    return image
+
+
+def load_corpus(corpus: Path) -> List[Tuple[str, Image.Image]]:
+    images = []
+    for path in sorted(corpus.iterdir()):
+        if path.suffix.lower() in {".png", ".jpg", ".jpeg", ".webp"}:
+            with Image.open(path) as image:
+                images.append((path.name, flatten_alpha(image)))
+    return images
+
+
+def run(images: List[Tuple[str, Image.Image]], repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for label, factory in CONFIGURATIONS:
+        encoder = factory()
+        timings = []
+        total_bytes = 0
+        for _, image in images:
+            runs = []
+            for _ in range(repeat):
+                buffer = io.BytesIO()
+                start = time.perf_counter()
+                encoder.encode(image, buffer)
+                runs.append(time.perf_counter() - start)
+            timings.append(min(runs))
+            total_bytes += buffer.tell()
+        results[label] = {
+            "images": len(images),
+            "total_bytes": total_bytes,
+            "mean_bytes": total_bytes / len(images),
+            "mean_encode_ms": statistics.mean(timings) * 1000,
+            "max_encode_ms": max(timings) * 1000,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="directory of sample screenshots")
+    parser.add_argument("--repeat", type=int, default=3, help="encodes per image (best is kept)")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.corpus:
+        images = load_corpus(args.corpus)
+    else:
+        images = [
+            (f"synthetic-{w}x{h}-{seed}.png", synthetic_screenshot(w, h, seed))
+            for w, h in SYNTHETIC_SIZES
+            for seed in range(3)
+        ]
+    if not images:
+        raise SystemExit("No images in corpus")
+
+    results = run(images, args.repeat)
+    baseline = results["jpeg-q90"]["total_bytes"]
+    print(f"{'encoder':<32} {'mean ms':>9} {'max ms':>9} {'mean KB':>9} {'vs jpeg':>8}")
+    for label, row in results.items():
+        print(f"{label:<32} {row['mean_encode_ms']:>9.1f} {row['max_encode_ms']:>9.1f} "
+              f"{row['mean_bytes'] / 1024:>9.1f} {row['total_bytes'] / baseline:>7.2f}x")
+
+    if args.output:
+        write_results(args.output, "encoders", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Bulk import throughput by number of conversion processes.
+
+Builds a folder of distinct screenshots and imports it into a fresh temp
+storage directory once per worker count.
+
+    cd backend
+    python -m benchmarks.imports [--quick] [--output imports.json]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from app.importer import import_path
+from app.storage import ProjectStorage
+from benchmarks.common import make_image_bytes, print_table, write_results
+
+IMAGE_SIZE = (1920, 1080)
+
+
+def run(quick: bool = False) -> Dict[str, Any]:
+    count = 16 if quick else 128
+    cpus = os.cpu_count() or 1
+    levels = sorted({1, 2, min(4, cpus), cpus})
+    root = Path(tempfile.mkdtemp(prefix="bench-imports-"))
+    try:
+        source = root / "source"
+        source.mkdir()
+        width, height = IMAGE_SIZE
+        for i in range(count):
+            (source / f"shot{i}.png").write_bytes(make_image_bytes(width, height, "RGB", i))
+
+        results = {}
+        for workers in levels:
+            storage = ProjectStorage(base_dir=root / f"data-{workers}")
+            start = time.perf_counter()
+            result = import_path(storage, "imported", source, workers=workers)
+            elapsed = time.perf_counter() - start
+            results[f"workers={workers}"] = {
+                "images": len(result.imported),
+                "errors": len(result.errors),
+                "seconds": elapsed,
+                "images_per_s": len(result.imported) / elapsed,
+            }
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer images for a fast smoke run")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    print_table(results, ["images", "errors", "seconds", "images_per_s"])
+    if args.output:
+        write_results(args.output, "imports", results)
+
+
+if __name__ == "__main__":
+    main()
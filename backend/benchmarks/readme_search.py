@@ -0,0 +1,92 @@
+"""README full-text search latency with tens of thousands of projects.
+
+READMEs are release notes assembled from a shared vocabulary (English and
+Chinese), so common terms match thousands of projects and rare ones a few.
+
+    cd backend
+    python -m benchmarks.readme_search [--quick] [--output readme_search.json]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from app.readme_search import ReadmeIndex
+from benchmarks.common import measure, print_table, write_results
+
+WORDS = (
+    "login settings crash layout button dialog screen release build android ios "
+    "regression fixed broken overlap font color icon scroll loading timeout "
+    "登录 设置 崩溃 布局 按钮 弹窗 页面 版本 修复 错位 字体 图标 加载 超时"
+).split()
+QUERIES = {
+    "common word": "crash",
+    "two words": "login crash",
+    "chinese": "崩溃",
+    "rare word": "build-4242",
+    "short word": "ui",
+    "chinese character": "崩",
+}
+
+
+def _readme(rng: random.Random, number: int) -> str:
+    lines = [f"# build-{number}", ""]
+    for _ in range(rng.randrange(5, 40)):
+        words = rng.choices(WORDS, k=rng.randrange(4, 16))
+        if rng.random() < 0.05:
+            words.append("UI")
+        lines.append("- " + " ".join(words))
+    return "\n".join(lines)
+
+
+def run(quick: bool = False) -> Dict[str, Any]:
+    count = 5_000 if quick else 50_000
+    rng = random.Random(42)
+    base_dir = Path(tempfile.mkdtemp(prefix="readme-bench-"))
+    try:
+        readmes = {}
+        for number in range(count):
+            path = base_dir / f"build-{number}" / "README.md"
+            path.parent.mkdir()
+            path.write_text(_readme(rng, number), encoding="utf-8")
+            readmes[f"build-{number}"] = path
+        index = ReadmeIndex(base_dir / ".search" / "readme.sqlite")
+
+        start = time.perf_counter()
+        index.sync(readmes)
+        results: Dict[str, Any] = {"initial sync": {"projects": count, "seconds": time.perf_counter() - start}}
+        start = time.perf_counter()
+        index.sync(readmes)
+        results["restart sync"] = {"projects": count, "seconds": time.perf_counter() - start}
+
+        for name, query in QUERIES.items():
+            stats = measure(lambda: index.search(query, 20), repeat=30)
+            stats["matches"] = index.search(query, 1)["total"]
+            results[f"search {name}"] = stats
+
+        stats = measure(lambda: index.update("build-0", _readme(rng, 0), time.time_ns(), 1), repeat=50)
+        results["update"] = stats
+        results["index size"] = {"mb": os.path.getsize(base_dir / ".search" / "readme.sqlite") / 2**20}
+        return results
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="5k instead of 50k projects")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    print_table(results, ["projects", "seconds", "median_ms", "p95_ms", "max_ms", "matches", "mb"])
+    if args.output:
+        write_results(args.output, "readme_search", results)
+
+
+if __name__ == "__main__":
+    main()
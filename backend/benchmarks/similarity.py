@@ -0,0 +1,73 @@
+"""Similarity search latency on a large in-memory perceptual hash index.
+
+Hashes are clustered like real screenshots (many near-copies of a few
+thousand screens) rather than uniformly random.
+
+    cd backend
+    python -m benchmarks.similarity [--quick] [--output similarity.json]
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from app.similarity import SimilarityIndex
+from benchmarks.common import measure, print_table, write_results
+
+SCREENS = 5000
+
+
+def _near(rng: random.Random, value: int, max_bits: int) -> int:
+    for bit in rng.sample(range(64), rng.randrange(max_bits + 1)):
+        value ^= 1 << bit
+    return value
+
+
+def run(quick: bool = False) -> Dict[str, Any]:
+    count = 100_000 if quick else 1_000_000
+    rng = random.Random(42)
+    screens = [rng.getrandbits(64) for _ in range(SCREENS)]
+    index = SimilarityIndex()
+
+    start = time.perf_counter()
+    index.load(
+        (f"build-{i % 1000}", i, "jpg", _near(rng, screens[i % SCREENS], 6))
+        for i in range(count)
+    )
+    results: Dict[str, Any] = {"load": {"images": count, "seconds": time.perf_counter() - start}}
+
+    queries = [_near(rng, rng.choice(screens), 4) for _ in range(20)]
+    for max_distance in (0, 5, 10, 15):
+        found = [len(index.search(query, max_distance, 50)) for query in queries]
+        cycle = iter(queries * 10)
+        stats = measure(lambda: index.search(next(cycle), max_distance, 50), repeat=100, warmup=0)
+        stats["avg_results"] = sum(found) / len(found)
+        results[f"search d<={max_distance}"] = stats
+
+    values = [rng.getrandbits(64) for _ in range(1000)]
+    start = time.perf_counter()
+    for number, value in enumerate(values):
+        index.add("new", number, "png", value)
+    results["add"] = {"images": len(values), "seconds": time.perf_counter() - start}
+    start = time.perf_counter()
+    for number, value in enumerate(values):
+        index.remove("new", number, value)
+    results["remove"] = {"images": len(values), "seconds": time.perf_counter() - start}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="100k instead of 1M images")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    print_table(results, ["images", "seconds", "median_ms", "p95_ms", "max_ms", "avg_results"])
+    if args.output:
+        write_results(args.output, "similarity", results)
+
+
+if __name__ == "__main__":
+    main()
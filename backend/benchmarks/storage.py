@@ -0,0 +1,131 @@
+"""Benchmark ProjectStorage on its hot paths.
+
+- save_image across image sizes and modes (RGB, RGBA, P, L)
+- save_image and write_readme with fsync (durable) and without (fast)
+- list_images / get_next_image_number at several project sizes, both on a
+  warm index and right after the index was dropped (cold rebuild)
+- list_projects with many project folders
+
+    cd backend
+    python -m benchmarks.storage [--quick] [--output storage.json]
+"""
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+from PIL import Image
+
+from app.storage import ProjectStorage
+from benchmarks.common import make_image_bytes, measure, print_table, write_results
+
+IMAGE_SIZES = {"small": (640, 400), "fhd": (1920, 1080), "4k": (3840, 2160)}
+MODES = ["RGB", "RGBA", "P", "L"]
+PROJECT_FILE_COUNTS = [10, 1_000, 50_000]
+PROJECT_COUNTS = [100, 5_000]
+
+
+def bench_save_image(base_dir: Path, repeat: int, sizes: Dict[str, tuple]) -> Dict[str, Any]:
+    storage = ProjectStorage(base_dir=base_dir)
+    results = {}
+    for size_name, (width, height) in sizes.items():
+        for mode in MODES:
+            project = f"save-{size_name}-{mode}"
+            # Distinct pixels per call, so deduplication never short-circuits the encode
+            payloads = iter([make_image_bytes(width, height, mode, variant) for variant in range(repeat + 1)])
+
+            row = measure(lambda: storage.save_image(project, next(payloads)), repeat)
+            row["input_bytes"] = len(make_image_bytes(width, height, mode))
+            results[f"save_image/{size_name}/{mode}"] = row
+    return results
+
+
+def bench_durability(base_dir: Path, repeat: int) -> Dict[str, Any]:
+    """save_image and write_readme with and without fsync (DURABILITY=durable/fast)."""
+    results = {}
+    width, height = IMAGE_SIZES["small"]
+    for mode, durable in [("durable", True), ("fast", False)]:
+        storage = ProjectStorage(base_dir=base_dir / mode, durable=durable)
+        payloads = iter([make_image_bytes(width, height, "RGB", variant) for variant in range(repeat + 1)])
+        results[f"save_image/{mode}"] = measure(lambda: storage.save_image("durability", next(payloads)), repeat)
+        results[f"write_readme/{mode}"] = measure(lambda: storage.write_readme("durability", "# Notes\n" * 100), repeat)
+    return results
+
+
+def populate_project(project_path: Path, count: int) -> None:
+    """Fill a project with ``count`` copies of a tiny JPEG without going through save_image."""
+    project_path.mkdir(parents=True, exist_ok=True)
+    sample = project_path / "1.jpg"
+    Image.new("RGB", (64, 40), (120, 30, 200)).save(sample, "JPEG")
+    for number in range(2, count + 1):
+        shutil.copyfile(sample, project_path / f"{number}.jpg")
+
+
+def bench_listing(base_dir: Path, repeat: int, counts) -> Dict[str, Any]:
+    storage = ProjectStorage(base_dir=base_dir)
+    results = {}
+    for count in counts:
+        project = f"list-{count}"
+        populate_project(storage.get_project_path(project), count)
+        index_path = base_dir / ".index" / f"{project}.sqlite"
+
+        def cold_list():
+            index_path.unlink(missing_ok=True)
+            storage.list_images(project)
+
+        results[f"list_images/{count}/cold"] = measure(cold_list, max(1, repeat // 5), warmup=0)
+        results[f"list_images/{count}/warm"] = measure(lambda: storage.list_images(project), repeat)
+        results[f"list_images_page/{count}/warm"] = measure(
+            lambda: storage.list_images_page(project, 100, count // 2), repeat
+        )
+        results[f"get_next_image_number/{count}/warm"] = measure(
+            lambda: storage.get_next_image_number(project), repeat
+        )
+    return results
+
+
+def bench_list_projects(base_dir: Path, repeat: int, counts) -> Dict[str, Any]:
+    results = {}
+    for count in counts:
+        root = base_dir / f"projects-{count}"
+        root.mkdir()
+        for i in range(count):
+            (root / f"project-{i:06d}").mkdir()
+        storage = ProjectStorage(base_dir=root)
+        results[f"list_projects/{count}"] = measure(storage.list_projects, repeat)
+    return results
+
+
+def run(quick: bool = False) -> Dict[str, Any]:
+    repeat = 3 if quick else 20
+    sizes = {"small": IMAGE_SIZES["small"]} if quick else IMAGE_SIZES
+    file_counts = [10, 1_000] if quick else PROJECT_FILE_COUNTS
+    project_counts = [100] if quick else PROJECT_COUNTS
+
+    base_dir = Path(tempfile.mkdtemp(prefix="bench-storage-"))
+    try:
+        results = {}
+        results.update(bench_save_image(base_dir / "save", repeat, sizes))
+        results.update(bench_durability(base_dir / "durability", repeat))
+        results.update(bench_listing(base_dir / "list", repeat, file_counts))
+        results.update(bench_list_projects(base_dir, repeat, project_counts))
+        return results
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    print_table(results, ["runs", "median_ms", "p95_ms", "max_ms"])
+    if args.output:
+        write_results(args.output, "storage", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,29 @@ def client(test_storage, monkeypatch):
     monkeypatch.setattr(main, 'storage', test_storage)
     return TestClient(app)
 
+@pytest.fixture
+def jobs_db(temp_dir):
+    """Path of a job queue database in the temporary directory."""
+    return temp_dir / ".jobs" / "jobs.sqlite"
+
+@pytest.fixture
+def job_queue(jobs_db):
+    """A job queue with the default settings; tests adjust its attributes."""
+    from app.jobs import JobQueue
+    return JobQueue(jobs_db)
+
+@pytest.fixture
+def readme_index(temp_dir):
+    """An empty README search index in the temporary directory."""
+    from app.readme_search import ReadmeIndex
+    return ReadmeIndex(temp_dir / ".search" / "readme.sqlite")
+
+@pytest.fixture
+def project_catalog(temp_dir, test_storage):
+    """A separate catalog of the temporary directory; it loads on first use."""
+    from app.catalog import ProjectCatalog
+    return ProjectCatalog(temp_dir, test_storage.validate_project_name)
+
 @pytest.fixture
 def sample_image_data():
     """Create sample image data for testing."""
@@ -40,4 +63,17 @@ def sample_image_data():
     img_bytes = io.BytesIO()
     img.save(img_bytes, format='PNG')
     img_bytes.seek(0)
-    return img_bytes.getvalue()
\ No newline at end of file
+    return img_bytes.getvalue()
+
+@pytest.fixture
+def bomb_png_data():
+    """A tiny PNG claiming to be 100000x100000 pixels (40GB as RGBA)."""
+    import struct
+    import zlib
+    
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    
+    header = struct.pack('>IIBBBBB', 100000, 100000, 8, 6, 0, 0, 0)
+    rows = zlib.compress(b'\0' * 100000 * 4 * 16)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', rows) + chunk(b'IEND', b'')
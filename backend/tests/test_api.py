@@ -1,6 +1,52 @@
 import pytest
+import asyncio
 import io
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+import httpx
+from pathlib import Path
 from PIL import Image
+from app.main import app
+from app.executor import BoundedExecutor
+from app.config import MAX_FILE_SIZE
+
+def make_async_client():
+    """Create an async client that drives the app concurrently on one event loop."""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+def _peak_rss() -> int:
+    """Peak resident memory of this process in bytes (Linux only)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmHWM not found")
+
+def _concurrent_upload_worker(base_dir: str, path: str, uploads: int, workers: int):
+    """Upload one image ``uploads`` times at once in a fresh process.
+    
+    Returns the peak RSS growth in bytes and the response status codes.
+    """
+    from app import main
+    from app.storage import ProjectStorage
+    
+    main.storage = ProjectStorage(base_dir=base_dir)
+    main.image_pool = BoundedExecutor("image", workers, uploads)
+    data = Path(path).read_bytes()
+    
+    async def run():
+        async with make_async_client() as ac:
+            return await asyncio.gather(*[
+                ac.post("/api/projects/memory_test/images", files={"file": ("big.png", data, "image/png")})
+                for _ in range(uploads)
+            ])
+    
+    before = _peak_rss()
+    responses = asyncio.run(run())
+    return _peak_rss() - before, [r.status_code for r in responses]
 
 class TestProjectAPI:
     def test_list_projects_empty(self, client):
@@ -63,6 +109,32 @@ class TestProjectAPI:
         assert data["images"] == []
         assert data["readme"] == ""
 
+class TestProjectSearchAPI:
+    def test_search_and_paging(self, client, sample_image_data):
+        """Projects can be filtered, sorted and paged server-side."""
+        for name in ["web-home", "web-login", "app-login", "docs"]:
+            client.post("/api/projects", json={"name": name})
+        client.post(
+            "/api/projects/app-login/images",
+            files={"file": ("test.png", sample_image_data, "image/png")},
+        )
+        
+        response = client.get("/api/projects", params={"q": "web"})
+        assert response.json() == {"projects": ["web-home", "web-login"]}
+        assert response.headers["X-Total-Count"] == "2"
+        
+        response = client.get("/api/projects", params={"q": "login", "match": "substring", "sort": "images", "details": "true"})
+        data = response.json()
+        assert data["projects"] == ["app-login", "web-login"]
+        assert data["items"][0]["image_count"] == 1
+        assert data["items"][0]["last_modified"] > 0
+        
+        response = client.get("/api/projects", params={"limit": 2, "offset": 1})
+        assert response.json() == {"projects": ["docs", "web-home"]}
+        assert response.headers["X-Total-Count"] == "4"
+        
+        assert client.get("/api/projects", params={"sort": "size"}).status_code == 422
+
 class TestImageAPI:
     def test_upload_image(self, client, sample_image_data):
         """Test uploading an image."""
@@ -119,6 +191,15 @@ class TestImageAPI:
         assert response.status_code == 413
         assert "File too large" in response.json()["detail"]
 
+    def test_upload_decompression_bomb(self, client, bomb_png_data):
+        """Test images with huge dimensions are refused without decoding them."""
+        client.post("/api/projects", json={"name": "bomb_test"})
+        
+        files = {"file": ("bomb.png", io.BytesIO(bomb_png_data), "image/png")}
+        response = client.post("/api/projects/bomb_test/images", files=files)
+        assert response.status_code == 413
+        assert "pixels" in response.json()["detail"]
+
     def test_get_image(self, client, sample_image_data):
         """Test retrieving an image."""
         # Create project and upload image
@@ -131,6 +212,19 @@ class TestImageAPI:
         assert response.status_code == 200
         assert response.headers["content-type"] == "image/jpeg"
 
+    def test_get_thumbnail(self, client, sample_image_data):
+        """Test retrieving a thumbnail."""
+        client.post("/api/projects", json={"name": "thumb_test"})
+        files = {"file": ("test.png", io.BytesIO(sample_image_data), "image/png")}
+        client.post("/api/projects/thumb_test/images", files=files)
+        
+        response = client.get("/api/projects/thumb_test/thumbs/320/1.jpg")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        
+        response = client.get("/api/projects/thumb_test/thumbs/999/1.jpg")
+        assert response.status_code == 404
+
     def test_get_nonexistent_image(self, client):
         """Test retrieving non-existent image."""
         client.post("/api/projects", json={"name": "get_test"})
@@ -180,6 +274,487 @@ class TestImageAPI:
         assert data["images"][0]["filename"] == "1.jpg"
         assert data["images"][1]["filename"] == "2.jpg"
 
+class TestImagePagination:
+    def upload(self, client, project_name, data, count):
+        files = [("file", (f"{i}.png", io.BytesIO(data), "image/png")) for i in range(count)]
+        client.post(f"/api/projects/{project_name}/images:batch", files=files)
+
+    def test_pages_oldest_first(self, client, sample_image_data):
+        """Test walking all images with limit/cursor."""
+        self.upload(client, "page_test", sample_image_data, 7)
+        
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 3}
+            if cursor is not None:
+                params["cursor"] = cursor
+            data = client.get("/api/projects/page_test/images", params=params).json()
+            assert data["total"] == 7
+            seen.extend(img["filename"] for img in data["images"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert seen == [f"{i}.jpg" for i in range(1, 8)]
+
+    def test_pages_newest_first(self, client, sample_image_data):
+        """Test newest-first ordering."""
+        self.upload(client, "page_desc", sample_image_data, 5)
+        
+        data = client.get("/api/projects/page_desc/images", params={"limit": 2, "order": "desc"}).json()
+        assert [img["filename"] for img in data["images"]] == ["5.jpg", "4.jpg"]
+        assert data["next_cursor"] == 4
+        
+        data = client.get("/api/projects/page_desc/images", params={"limit": 10, "order": "desc", "cursor": 4}).json()
+        assert [img["filename"] for img in data["images"]] == ["3.jpg", "2.jpg", "1.jpg"]
+        assert data["next_cursor"] is None
+
+    def test_pagination_errors(self, client):
+        """Test pagination on missing projects and with bad parameters."""
+        assert client.get("/api/projects/nonexistent/images").status_code == 404
+        client.post("/api/projects", json={"name": "page_empty"})
+        assert client.get("/api/projects/page_empty/images", params={"limit": 0}).status_code == 422
+        data = client.get("/api/projects/page_empty/images").json()
+        assert data == {"images": [], "total": 0, "next_cursor": None, "seq": 0}
+
+    def test_project_detail_without_images(self, client, sample_image_data):
+        """Test that the detail endpoint can skip the image list."""
+        self.upload(client, "detail_skip", sample_image_data, 2)
+        data = client.get("/api/projects/detail_skip", params={"include_images": "false"}).json()
+        assert data["images"] == []
+
+class TestBatchUpload:
+    def test_batch_upload(self, client, sample_image_data):
+        """Test uploading several images in one request."""
+        files = [
+            ("file", (f"test{i}.png", io.BytesIO(sample_image_data), "image/png"))
+            for i in range(5)
+        ]
+        response = client.post("/api/projects/batch_test/images:batch", files=files)
+        assert response.status_code == 200
+        
+        results = response.json()["results"]
+        assert [r["filename"] for r in results] == [f"{i}.jpg" for i in range(1, 6)]
+        assert [r["original_filename"] for r in results] == [f"test{i}.png" for i in range(5)]
+        assert all(r["error"] is None for r in results)
+        
+        detail = client.get("/api/projects/batch_test").json()
+        assert len(detail["images"]) == 5
+
+    def test_batch_upload_partial_failure(self, client, test_storage, sample_image_data):
+        """Test that bad items fail individually and the rest stay contiguous and in order."""
+        files = [
+            ("file", ("a.png", io.BytesIO(sample_image_data), "image/png")),
+            ("file", ("broken.png", io.BytesIO(b"not really a png"), "image/png")),
+            ("file", ("notes.txt", io.BytesIO(b"text"), "text/plain")),
+            ("file", ("b.png", io.BytesIO(sample_image_data), "image/png")),
+        ]
+        response = client.post("/api/projects/batch_fail/images:batch", files=files)
+        assert response.status_code == 200
+        
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2, 3]
+        assert results[0]["filename"] == "1.jpg"
+        assert results[1]["filename"] is None and results[1]["error"]
+        assert "must be an image" in results[2]["error"]
+        assert results[3]["filename"] == "2.jpg"
+        
+        # No temp files are left behind
+        temp_dir = test_storage.get_project_path("batch_fail") / ".tmp"
+        assert list(temp_dir.iterdir()) == []
+
+    def test_batch_upload_requires_files(self, client):
+        """Test that a batch without files is rejected."""
+        response = client.post("/api/projects/batch_empty/images:batch", files={"other": ("x.txt", b"x", "text/plain")})
+        assert response.status_code == 422
+
+class TestCaching:
+    def test_image_cache_headers_and_304(self, client, sample_image_data):
+        """Test images are served immutable with validators and answer 304."""
+        client.post("/api/projects", json={"name": "cache_test"})
+        files = {"file": ("test.png", io.BytesIO(sample_image_data), "image/png")}
+        client.post("/api/projects/cache_test/images", files=files)
+        
+        response = client.get("/api/projects/cache_test/images/1.jpg")
+        assert response.status_code == 200
+        assert "immutable" in response.headers["cache-control"]
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        assert not etag.startswith("W/")
+        
+        response = client.get("/api/projects/cache_test/images/1.jpg", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        
+        response = client.get("/api/projects/cache_test/images/1.jpg", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+        
+        response = client.get("/api/projects/cache_test/images/1.jpg", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+        
+        response = client.get("/api/projects/cache_test/thumbs/320/1.jpg")
+        thumb_etag = response.headers["etag"]
+        response = client.get("/api/projects/cache_test/thumbs/320/1.jpg", headers={"If-None-Match": thumb_etag})
+        assert response.status_code == 304
+
+    def test_project_detail_conditional_get(self, client, sample_image_data):
+        """Test project detail revalidates and changes ETag when images change."""
+        client.post("/api/projects", json={"name": "detail_cache"})
+        
+        response = client.get("/api/projects/detail_cache")
+        assert response.headers["cache-control"] == "no-cache"
+        etag = response.headers["etag"]
+        
+        response = client.get("/api/projects/detail_cache", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        
+        files = {"file": ("test.png", io.BytesIO(sample_image_data), "image/png")}
+        client.post("/api/projects/detail_cache/images", files=files)
+        
+        response = client.get("/api/projects/detail_cache", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()["images"]) == 1
+
+    def test_readme_conditional_get(self, client):
+        """Test README revalidation."""
+        client.put("/api/projects/readme_cache/readme", json={"content": "v1"})
+        
+        response = client.get("/api/projects/readme_cache/readme")
+        etag = response.headers["etag"]
+        assert client.get("/api/projects/readme_cache/readme", headers={"If-None-Match": etag}).status_code == 304
+        
+        client.put("/api/projects/readme_cache/readme", json={"content": "v2"})
+        response = client.get("/api/projects/readme_cache/readme", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["content"] == "v2"
+
+class TestMetricsEndpoint:
+    def test_metrics_after_upload(self, client, sample_image_data):
+        """Uploads show up in route latency, byte and stage metrics."""
+        client.post("/api/projects", json={"name": "metrics_project"})
+        response = client.post(
+            "/api/projects/metrics_project/images",
+            files={"file": ("test.png", sample_image_data, "image/png")},
+        )
+        assert response.status_code == 200
+        client.get(f"/api/projects/metrics_project/images/{response.json()['filename']}")
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        # Routes are labelled by template, not by concrete path
+        assert 'route="/api/projects/{project_name}/images"' in body
+        assert 'route="/api/projects/{project_name}/images/{filename}"' in body
+        assert "/api/projects/metrics_project/images" not in body
+        assert 'http_requests_total{method="POST",route="/api/projects/{project_name}/images",status="200"}' in body
+        assert 'http_request_bytes_total{route="/api/projects/{project_name}/images"}' in body
+        for stage in ("read_body", "hash", "decode", "composite", "encode", "lock_wait", "commit"):
+            assert f'upload_stage_duration_seconds_count{{stage="{stage}"}}' in body
+        assert 'project_lock_wait_seconds_count{project="metrics_project"}' in body
+        assert "uploads_in_flight 0" in body
+
+class TestRangeRequests:
+    @pytest.fixture
+    def stored(self, client):
+        """Upload a JPEG stored byte-for-byte and return its URL and bytes."""
+        img = Image.new('RGB', (400, 300), color='purple')
+        data = io.BytesIO()
+        img.save(data, format='JPEG')
+        client.post("/api/projects", json={"name": "range_project"})
+        response = client.post(
+            "/api/projects/range_project/images",
+            files={"file": ("test.jpg", data.getvalue(), "image/jpeg")},
+        )
+        return f"/api/projects/range_project/images/{response.json()['filename']}", data.getvalue()
+
+    def test_full_download_advertises_ranges(self, client, stored):
+        url, data = stored
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(data))
+        assert response.content == data
+
+    def test_byte_ranges(self, client, stored):
+        """Closed, open-ended and suffix ranges return 206 with the right bytes."""
+        url, data = stored
+        size = len(data)
+        for header, expected, content_range in [
+            ("bytes=0-99", data[:100], f"bytes 0-99/{size}"),
+            ("bytes=100-", data[100:], f"bytes 100-{size - 1}/{size}"),
+            ("bytes=-10", data[-10:], f"bytes {size - 10}-{size - 1}/{size}"),
+            (f"bytes=10-{size * 2}", data[10:], f"bytes 10-{size - 1}/{size}"),
+        ]:
+            response = client.get(url, headers={"Range": header})
+            assert response.status_code == 206, header
+            assert response.headers["content-range"] == content_range
+            assert response.headers["content-length"] == str(len(expected))
+            assert response.content == expected
+
+    def test_unsatisfiable_and_ignored_ranges(self, client, stored):
+        url, data = stored
+        response = client.get(url, headers={"Range": f"bytes={len(data)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(data)}"
+        
+        # Multiple ranges, other units and garbage fall back to the whole file
+        for header in ["bytes=0-1,5-9", "items=0-1", "bytes=abc", "bytes=9-1"]:
+            response = client.get(url, headers={"Range": header})
+            assert response.status_code == 200, header
+            assert response.content == data
+
+    def test_if_range(self, client, stored):
+        """A stale If-Range validator gets the whole (current) file."""
+        url, data = stored
+        etag = client.get(url).headers["etag"]
+        response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206
+        response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == data
+
+    def test_head(self, client, stored):
+        url, data = stored
+        response = client.head(url)
+        assert response.status_code == 200
+        assert response.headers["content-length"] == str(len(data))
+        assert response.content == b""
+
+    @pytest.mark.asyncio
+    async def test_zero_copy_extensions(self, temp_dir):
+        """Servers offering zero-copy or path sends get the file handed over."""
+        from app.file_response import RangeFileResponse
+        
+        path = temp_dir / "blob.bin"
+        path.write_bytes(bytes(range(256)) * 1000)
+        
+        async def run(extensions, headers=()):
+            messages = []
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+            async def send(message):
+                if message["type"] == "http.response.zerocopysend":
+                    message = {**message, "data": os.pread(message["file"].fileno(), message["count"], message["offset"])}
+                messages.append(message)
+            scope = {"type": "http", "method": "GET", "headers": list(headers), "extensions": extensions}
+            await RangeFileResponse(path, path.stat(), "application/octet-stream")(scope, receive, send)
+            return messages
+        
+        messages = await run({"http.response.zerocopysend": {}}, [(b"range", b"bytes=1000-1999")])
+        assert messages[0]["status"] == 206
+        assert [m["type"] for m in messages[1:]] == ["http.response.zerocopysend"]
+        assert messages[1]["data"] == path.read_bytes()[1000:2000]
+        
+        messages = await run({"http.response.pathsend": {}})
+        assert messages[1] == {"type": "http.response.pathsend", "path": str(path)}
+        
+        # Without extensions the file is streamed in bounded chunks
+        messages = await run({})
+        bodies = [m["body"] for m in messages[1:]]
+        assert b"".join(bodies) == path.read_bytes()
+        assert max(map(len, bodies)) <= 256 * 1024
+
+class TestExportAPI:
+    def test_export_zip(self, client, sample_image_data):
+        import zipfile
+        
+        client.post("/api/projects", json={"name": "export_project"})
+        client.post(
+            "/api/projects/export_project/images",
+            files={"file": ("test.png", sample_image_data, "image/png")},
+        )
+        client.put("/api/projects/export_project/readme", json={"content": "# Export"})
+        
+        response = client.get("/api/projects/export_project/export.zip")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        assert response.headers["content-disposition"] == 'attachment; filename="export_project.zip"'
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert archive.namelist() == ["1.jpg", "README.md"]
+            assert archive.getinfo("1.jpg").compress_type == zipfile.ZIP_STORED
+            assert archive.read("README.md") == b"# Export"
+            assert archive.testzip() is None
+
+    def test_export_missing_project(self, client):
+        assert client.get("/api/projects/nope/export.zip").status_code == 404
+        assert client.get("/api/projects/.hidden/export.zip").status_code == 400
+
+class TestImportAPI:
+    def test_import_zip_streams_progress(self, client, sample_image_data):
+        import json
+        import zipfile
+        
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("shots/2.png", sample_image_data)
+            img = io.BytesIO()
+            Image.new('RGB', (20, 20), color='blue').save(img, format='PNG')
+            zf.writestr("shots/1.png", img.getvalue())
+            zf.writestr("shots/bad.png", b"garbage")
+            zf.writestr("README.md", "# Imported")
+        
+        response = client.post(
+            "/api/projects/import_project/import?readme=true",
+            content=archive.getvalue(),
+            headers={"Content-Type": "application/zip"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [event["event"] for event in events] == ["progress"] * 3 + ["done"]
+        assert events[-2]["done"] == events[-2]["total"] == 3
+        done = events[-1]
+        assert done["imported"] == [
+            {"source": "shots/1.png", "filename": "1.jpg"},
+            {"source": "shots/2.png", "filename": "2.jpg"},
+        ]
+        assert [error["source"] for error in done["errors"]] == ["shots/bad.png"]
+        assert done["readme"] is True
+        
+        assert client.get("/api/projects/import_project/readme").json()["content"] == "# Imported"
+        assert client.get("/api/projects/import_project/images").json()["total"] == 2
+
+    def test_import_rejects_non_zip(self, client):
+        """Test a rejected body leaves neither a project nor its temp file behind."""
+        from app import main
+        
+        response = client.post(
+            "/api/projects/import_project/import",
+            content=b"not a zip" * 300000,  # several buffered writes
+            headers={"Content-Type": "application/zip"},
+        )
+        assert response.status_code == 400
+        assert client.get("/api/projects/import_project").status_code == 404
+        assert list((main.storage.base_dir / ".tmp").iterdir()) == []
+        assert client.post("/api/projects/.bad/import", content=b"").status_code == 400
+    
+    def test_concurrent_imports_refused(self, client, sample_image_data, monkeypatch):
+        """Test imports beyond MAX_CONCURRENT_IMPORTS get 503 and failed ones free their slot."""
+        import threading
+        import zipfile
+        from app import main
+        
+        slots = threading.BoundedSemaphore(1)
+        monkeypatch.setattr(main, "import_slots", slots)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("1.png", sample_image_data)
+        
+        def post(content):
+            return client.post(
+                "/api/projects/busy_import/import", content=content, headers={"Content-Type": "application/zip"}
+            )
+        
+        slots.acquire()  # an import in progress
+        response = post(archive.getvalue())
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        slots.release()
+        
+        assert post(b"not a zip").status_code == 400
+        assert post(archive.getvalue()).status_code == 200
+        assert client.get("/api/projects/busy_import/images").json()["total"] == 1
+        # Both released their slot
+        assert slots.acquire(blocking=False)
+
+class TestChangeFeedAPI:
+    def test_changes_since(self, client, sample_image_data):
+        client.post("/api/projects", json={"name": "feed_project"})
+        seq = client.get("/api/projects/feed_project/images").json()["seq"]
+        client.post(
+            "/api/projects/feed_project/images",
+            files={"file": ("test.png", sample_image_data, "image/png")},
+        )
+        client.put("/api/projects/feed_project/readme", json={"content": "# Feed"})
+        
+        data = client.get("/api/projects/feed_project/changes", params={"since": seq}).json()
+        assert [(c["type"], c["filename"]) for c in data["changes"]] == [("added", "1.jpg")]
+        assert data["changes"][0]["image"]["thumbnail_url"].endswith("/thumbs/320/1.jpg")
+        assert data["readme"] == "# Feed"
+        assert data["reset"] is False
+        assert client.get("/api/projects/feed_project").json()["seq"] == data["seq"]
+        
+        client.delete("/api/projects/feed_project/images/1.jpg")
+        later = client.get("/api/projects/feed_project/changes", params={"since": data["seq"]}).json()
+        assert [(c["type"], c["filename"]) for c in later["changes"]] == [("deleted", "1.jpg")]
+        assert later["readme"] is None
+        
+        assert client.get("/api/projects/feed_project/changes").status_code == 422
+        assert client.get("/api/projects/missing/changes", params={"since": 0}).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_event_stream_pushes_changes(self, test_storage, sample_image_data, monkeypatch):
+        """Changes made while a client listens are pushed without polling."""
+        import asyncio
+        import json
+        from app import main
+        
+        monkeypatch.setattr(main, "storage", test_storage)
+        monkeypatch.setattr(main, "CHANGES_POLL_SECONDS", 30)
+        test_storage.create_project("sse_project")
+        events = main.change_events("sse_project", test_storage.get_change_seq("sse_project"))
+        try:
+            pending = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.1)
+            assert not pending.done()
+            assert test_storage.changes.listeners("sse_project") == 1
+            
+            await asyncio.to_thread(test_storage.save_image, "sse_project", sample_image_data)
+            message = await asyncio.wait_for(pending, timeout=5)
+            lines = message.strip().split("\n")
+            assert lines[0] == f"id: {test_storage.get_change_seq('sse_project')}"
+            assert lines[1] == "event: changes"
+            feed = json.loads(lines[2][len("data: "):])
+            assert [c["filename"] for c in feed["changes"]] == ["1.jpg"]
+        finally:
+            await events.aclose()
+        assert test_storage.changes.listeners("sse_project") == 0
+
+    @pytest.mark.asyncio
+    async def test_event_stream_survives_busy_pool(self, test_storage, sample_image_data, monkeypatch):
+        """A full io pool delays the stream instead of breaking it; idle polls skip the feed."""
+        import asyncio
+        from app import main
+        from app.executor import ExecutorBusy
+        from app.storage import ProjectStorage
+        
+        calls = []
+        class FlakyPool:
+            async def run(self, fn, *args):
+                calls.append(fn.__name__)
+                if len(calls) <= 2:
+                    raise ExecutorBusy("io")
+                return fn(*args)
+        monkeypatch.setattr(main, "storage", test_storage)
+        monkeypatch.setattr(main, "io_pool", FlakyPool())
+        monkeypatch.setattr(main, "RETRY_AFTER_SECONDS", 0.01)
+        monkeypatch.setattr(main, "CHANGES_POLL_SECONDS", 0.01)
+        test_storage.create_project("busy_sse")
+        since = test_storage.get_change_seq("busy_sse")
+        await asyncio.sleep(1.1)  # changes of the last second are always rechecked
+        events = main.change_events("busy_sse", since)
+        try:
+            pending = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.3)
+            assert not pending.done()
+            # Two refusals, one read of the feed, then polls that find nothing changed
+            assert calls == ["get_changes"] * 3
+            
+            # Another process saving is noticed by polling
+            other = ProjectStorage(base_dir=test_storage.base_dir)
+            await asyncio.to_thread(other.save_image, "busy_sse", sample_image_data)
+            message = await asyncio.wait_for(pending, timeout=5)
+            assert "1.jpg" in message
+        finally:
+            await events.aclose()
+
+    def test_event_stream_validation(self, client):
+        assert client.get("/api/projects/missing/events").status_code == 404
+        assert client.get("/api/projects/.bad/events").status_code == 400
+
 class TestReadmeAPI:
     def test_get_readme_empty(self, client):
         """Test getting README for project without one."""
@@ -224,4 +799,249 @@ class TestReadmeAPI:
     def test_readme_nonexistent_project(self, client):
         """Test getting README for non-existent project."""
         response = client.get("/api/projects/nonexistent/readme")
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+
+class TestOffloading:
+    @pytest.mark.asyncio
+    async def test_gets_stay_responsive_during_uploads(self, client, test_storage, sample_image_data, monkeypatch):
+        """Test that image GETs are served while slow uploads are in flight."""
+        test_storage.save_image("busy_test", sample_image_data)
+        
+        real_save = test_storage.save_image
+        def slow_save(project_name, image_data):
+            time.sleep(0.5)  # stands in for decoding a very large paste
+            return real_save(project_name, image_data)
+        monkeypatch.setattr(test_storage, 'save_image', slow_save)
+        
+        async with make_async_client() as ac:
+            uploads = [
+                asyncio.create_task(ac.post(
+                    "/api/projects/busy_test/images",
+                    files={"file": ("big.png", sample_image_data, "image/png")},
+                ))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.05)
+            
+            start = time.perf_counter()
+            for _ in range(5):
+                response = await ac.get("/api/projects/busy_test/images/1.jpg")
+                assert response.status_code == 200
+            elapsed = time.perf_counter() - start
+            
+            upload_responses = await asyncio.gather(*uploads)
+        
+        assert elapsed < 0.4
+        assert all(r.status_code == 200 for r in upload_responses)
+        assert len(test_storage.list_images("busy_test")) == 5
+
+    @pytest.mark.asyncio
+    async def test_upload_rejected_when_pool_full(self, client, test_storage, sample_image_data, monkeypatch):
+        """Test that uploads get 503 with Retry-After once the image pool queue is full."""
+        from app import main
+        monkeypatch.setattr(main, 'image_pool', BoundedExecutor("image", 1, 0))
+        
+        release = threading.Event()
+        real_save = test_storage.save_image
+        def blocked_save(project_name, image_data):
+            release.wait(5)
+            return real_save(project_name, image_data)
+        monkeypatch.setattr(test_storage, 'save_image', blocked_save)
+        
+        files = {"file": ("test.png", sample_image_data, "image/png")}
+        async with make_async_client() as ac:
+            first = asyncio.create_task(ac.post("/api/projects/full_pool/images", files=files))
+            await asyncio.sleep(0.05)
+            
+            second = await ac.post("/api/projects/full_pool/images", files=files)
+            assert second.status_code == 503
+            assert second.headers["retry-after"] == "1"
+            
+            release.set()
+            assert (await first).status_code == 200
+        
+        main.image_pool.shutdown()
+
+
+class TestStreamingUpload:
+    BOUNDARY = "testboundary"
+    
+    def multipart_chunks(self, total_size, consumed, chunk_size=64 * 1024):
+        """Yield a multipart body with one file part of total_size bytes."""
+        yield (
+            f"--{self.BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="big.png"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode()
+        chunk = b"x" * chunk_size
+        sent = 0
+        while sent < total_size:
+            consumed.append(len(chunk))
+            yield chunk
+            sent += len(chunk)
+        yield f"\r\n--{self.BOUNDARY}--\r\n".encode()
+    
+    @pytest.mark.asyncio
+    async def test_declared_length_rejected_before_reading(self, client):
+        """Test that an oversized Content-Length is refused without reading the body."""
+        consumed = []
+        
+        async def body():
+            for chunk in self.multipart_chunks(MAX_FILE_SIZE * 2, consumed):
+                yield chunk
+        
+        async with make_async_client() as ac:
+            response = await ac.post(
+                "/api/projects/stream_test/images",
+                content=body(),
+                headers={
+                    "Content-Type": f"multipart/form-data; boundary={self.BOUNDARY}",
+                    "Content-Length": str(MAX_FILE_SIZE * 2),
+                },
+            )
+        
+        assert response.status_code == 413
+        assert sum(consumed) == 0
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_aborts_at_limit(self, client):
+        """Test that a body without Content-Length stops being read once over the limit."""
+        consumed = []
+        
+        async def body():
+            for chunk in self.multipart_chunks(MAX_FILE_SIZE * 3, consumed):
+                yield chunk
+        
+        async with make_async_client() as ac:
+            response = await ac.post(
+                "/api/projects/stream_test/images",
+                content=body(),
+                headers={"Content-Type": f"multipart/form-data; boundary={self.BOUNDARY}"},
+            )
+        
+        assert response.status_code == 413
+        assert sum(consumed) <= MAX_FILE_SIZE + 2 * 64 * 1024
+
+    @pytest.mark.asyncio
+    async def test_memory_bounded_under_concurrent_uploads(self, client, test_storage, monkeypatch):
+        """Test that concurrent large uploads are spooled instead of held in memory."""
+        upload_size = 12 * 1024 * 1024
+        received = []
+        
+        def fake_save(project_name, image_data):
+            # Read the spooled upload the way Pillow would, in small pieces
+            assert not isinstance(image_data, bytes)
+            total = 0
+            while True:
+                piece = image_data.read(64 * 1024)
+                if not piece:
+                    break
+                total += len(piece)
+            received.append(total)
+            return "1.jpg"
+        monkeypatch.setattr(test_storage, 'save_image', fake_save)
+        
+        async def body(consumed):
+            for chunk in self.multipart_chunks(upload_size, consumed):
+                yield chunk
+        
+        tracemalloc.start()
+        try:
+            async with make_async_client() as ac:
+                responses = await asyncio.gather(*[
+                    ac.post(
+                        "/api/projects/stream_test/images",
+                        content=body([]),
+                        headers={"Content-Type": f"multipart/form-data; boundary={self.BOUNDARY}"},
+                    )
+                    for _ in range(4)
+                ])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        assert all(r.status_code == 200 for r in responses)
+        assert received == [upload_size] * 4
+        # 48MB went through; only the in-memory spool part of each upload may stay resident
+        assert peak < 12 * 1024 * 1024
+    
+    @pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="peak RSS comes from /proc")
+    def test_decode_memory_bounded_under_concurrent_uploads(self, temp_dir):
+        """Test real uploads decode at most one image per image worker at a time."""
+        # 18MB of pixels once decoded, a few KB on disk
+        path = temp_dir / "big.png"
+        image = Image.new('RGB', (3000, 2000), 'white')
+        image.paste((200, 30, 30), (500, 500, 2500, 1500))
+        image.save(path, format='PNG')
+        decoded_size = 3000 * 2000 * 3
+        
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            growth, statuses = pool.apply(_concurrent_upload_worker, (str(temp_dir / "data"), str(path), 8, 2))
+        
+        assert statuses == [200] * 8
+        # The decode really happened...
+        assert growth > decoded_size
+        # ...but only two at a time, not eight
+        assert growth < decoded_size * 5
+
+class TestJobsAPI:
+    def test_upload_queues_thumbnail_job(self, client, test_storage, sample_image_data):
+        """Test uploads leave thumbnails to a job whose status can be queried."""
+        files = {"file": ("test.png", io.BytesIO(sample_image_data), "image/png")}
+        client.post("/api/projects/jobs_test/images", files=files)
+        
+        response = client.get("/api/jobs")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["counts"] == {"pending": 1, "running": 0, "done": 0, "failed": 0}
+        job = data["jobs"][0]
+        assert (job["kind"], job["project"], job["payload"]) == ("thumbnails", "jobs_test", {"number": 1})
+        
+        test_storage.jobs.run_pending()
+        response = client.get(f"/api/jobs/{job['id']}")
+        assert response.json()["state"] == "done"
+        assert client.get("/api/jobs", params={"state": "pending"}).json()["jobs"] == []
+        
+        assert client.get("/api/jobs/9999").status_code == 404
+        assert client.get("/api/jobs", params={"state": "bogus"}).status_code == 422
+
+class TestSimilarSearchAPI:
+    def test_search_similar(self, client, sample_image_data):
+        """Test looking up the same screen in other projects."""
+        for project_name in ["build_1", "build_2"]:
+            files = {"file": ("test.png", io.BytesIO(sample_image_data), "image/png")}
+            client.post(f"/api/projects/{project_name}/images", files=files)
+        
+        response = client.get("/api/search/similar", params={"project": "build_1", "filename": "1.jpg"})
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["project"], data["filename"]) == ("build_1", "1.jpg")
+        assert [(r["project"], r["filename"], r["distance"]) for r in data["results"]] == [("build_2", "1.jpg", 0)]
+        
+        response = client.get("/api/search/similar", params={"project": "build_1", "filename": "2.jpg"})
+        assert response.status_code == 404
+        response = client.get("/api/search/similar", params={"project": "..", "filename": "1.jpg"})
+        assert response.status_code == 400
+        response = client.get(
+            "/api/search/similar", params={"project": "build_1", "filename": "1.jpg", "max_distance": 40}
+        )
+        assert response.status_code == 422
+
+class TestReadmeSearchAPI:
+    def test_search_readmes(self, client):
+        """Test finding projects by the text of their README."""
+        client.put("/api/projects/build_1/readme", json={"content": "# Build 1\n\nLogin screen crashes on <Android>"})
+        client.put("/api/projects/build_2/readme", json={"content": "Settings page looks fine"})
+        
+        response = client.get("/api/search", params={"q": "crash android"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["results"][0]["project"] == "build_1"
+        assert "<mark>crash</mark>es on &lt;<mark>Android</mark>&gt;" in data["results"][0]["snippet"]
+        
+        client.put("/api/projects/build_1/readme", json={"content": "Fixed"})
+        assert client.get("/api/search", params={"q": "crash"}).json()["total"] == 0
+        assert client.get("/api/search", params={"q": "   "}).status_code == 422
+        assert client.get("/api/search").status_code == 422
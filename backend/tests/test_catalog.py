@@ -0,0 +1,163 @@
+import time
+
+import pytest
+
+from app import catalog as catalog_module
+from app.catalog import ProjectCatalog
+
+
+class TestProjectCatalog:
+    def test_load_counts_images(self, temp_dir, project_catalog):
+        """The first listing scans the storage directory once."""
+        (temp_dir / "alpha").mkdir()
+        (temp_dir / "alpha" / "1.jpg").write_bytes(b"x")
+        (temp_dir / "alpha" / "2.png").write_bytes(b"x")
+        (temp_dir / "alpha" / "README.md").write_text("notes")
+        (temp_dir / "beta").mkdir()
+        (temp_dir / ".index").mkdir()
+        (temp_dir / "stray-file").write_text("not a project")
+
+        assert project_catalog.names() == ["alpha", "beta"]
+        assert project_catalog.get("alpha").image_count == 2
+        assert project_catalog.get("beta").image_count == 0
+        assert project_catalog.get("alpha").last_modified > 0
+
+    def test_storage_keeps_catalog_current(self, test_storage, sample_image_data):
+        """Creating projects and adding or deleting images needs no rescan."""
+        assert test_storage.list_projects() == []
+        test_storage.create_project("gamma")
+        filename = test_storage.save_image("gamma", sample_image_data)
+        test_storage.save_image("delta", sample_image_data)
+        assert test_storage.list_projects() == ["delta", "gamma"]
+        assert test_storage.catalog.get("gamma").image_count == 1
+
+        test_storage.delete_image("gamma", filename)
+        assert test_storage.catalog.get("gamma").image_count == 0
+
+        before = test_storage.catalog.get("delta").last_modified
+        time.sleep(0.01)
+        test_storage.write_readme("delta", "# notes")
+        assert test_storage.catalog.get("delta").last_modified > before
+
+    def test_rescan_picks_up_out_of_band_changes(self, temp_dir, test_storage, sample_image_data):
+        """Folders added or removed by other processes show up after a rescan."""
+        test_storage.save_image("known", sample_image_data)
+        assert test_storage.list_projects() == ["known"]
+
+        (temp_dir / "external").mkdir()
+        (temp_dir / "external" / "1.jpg").write_bytes(b"x")
+        (temp_dir / "known" / "2.jpg").write_bytes(b"x")
+        assert test_storage.list_projects() == ["known"]
+
+        test_storage.catalog.refresh()
+        assert test_storage.list_projects() == ["external", "known"]
+        assert test_storage.catalog.get("external").image_count == 1
+        assert test_storage.catalog.get("known").image_count == 2
+
+        (temp_dir / "external" / "1.jpg").unlink()
+        (temp_dir / "external").rmdir()
+        test_storage.catalog.refresh()
+        assert test_storage.list_projects() == ["known"]
+
+    def test_rescan_only_recounts_changed_projects(self, temp_dir, project_catalog, monkeypatch):
+        """Unchanged project directories are stat()ed but not listed again."""
+        for i in range(20):
+            (temp_dir / f"project-{i}").mkdir()
+        project_catalog.refresh()
+
+        scanned = []
+        original = ProjectCatalog._scan_project
+        monkeypatch.setattr(
+            ProjectCatalog, "_scan_project",
+            lambda self, path: scanned.append(path.name) or original(self, path),
+        )
+        time.sleep(0.01)
+        (temp_dir / "project-3" / "1.jpg").write_bytes(b"x")
+        project_catalog.refresh()
+        assert scanned == ["project-3"]
+        assert project_catalog.get("project-3").image_count == 1
+
+    @pytest.mark.skipif(catalog_module.watchfiles is None, reason="watchfiles not installed")
+    def test_watcher_sees_new_folders(self, temp_dir, project_catalog):
+        """With watchfiles installed, new folders appear without waiting for a rescan."""
+        project_catalog.start(rescan_interval=0)
+        try:
+            time.sleep(0.5)  # let the watcher settle
+            (temp_dir / "watched").mkdir()
+            deadline = time.monotonic() + 10
+            while "watched" not in project_catalog.names() and time.monotonic() < deadline:
+                time.sleep(0.1)
+            assert "watched" in project_catalog.names()
+        finally:
+            project_catalog.stop()
+
+    def test_periodic_rescan(self, temp_dir, project_catalog, monkeypatch):
+        """Without a watcher, the rescan thread still finds new folders."""
+        monkeypatch.setattr(catalog_module, "watchfiles", None)
+        project_catalog.start(rescan_interval=0.05)
+        try:
+            (temp_dir / "rescanned").mkdir()
+            deadline = time.monotonic() + 5
+            while "rescanned" not in project_catalog.names() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert "rescanned" in project_catalog.names()
+        finally:
+            project_catalog.stop()
+
+    def test_search(self, temp_dir, project_catalog):
+        """Prefix and substring searches, sort orders and paging."""
+        for name, images in [("Alpha", 1), ("alphabet", 5), ("beta", 3), ("gamma-alpha", 0), ("delta", 2)]:
+            (temp_dir / name).mkdir()
+            for number in range(1, images + 1):
+                (temp_dir / name / f"{number}.jpg").write_bytes(b"x")
+
+        infos, total = project_catalog.search("alp")
+        assert [info.name for info in infos] == ["Alpha", "alphabet"]
+        assert total == 2
+
+        infos, total = project_catalog.search("ALP", match="substring")
+        assert [info.name for info in infos] == ["Alpha", "alphabet", "gamma-alpha"]
+
+        infos, total = project_catalog.search("a", match="substring", sort="images", limit=2)
+        assert [info.name for info in infos] == ["alphabet", "beta"]
+        assert total == 5
+
+        infos, total = project_catalog.search(sort="name", limit=2, offset=2)
+        assert [info.name for info in infos] == ["beta", "delta"]
+        assert total == 5
+
+        assert project_catalog.search("zzz") == ([], 0)
+
+    def test_updates_leave_name_keys_alone(self, test_storage, sample_image_data, monkeypatch):
+        """Uploads and deletes only re-key the orders their change affects."""
+        catalog = test_storage.catalog
+        filename = test_storage.save_image("a-rather-long-project-name", sample_image_data)
+        touched = []
+        for keys in ("_by_name", "_suffixes", "_by_images", "_by_recent"):
+            for method in ("add", "discard"):
+                original = getattr(getattr(catalog, keys), method)
+                monkeypatch.setattr(getattr(catalog, keys), method,
+                                    lambda key, keys=keys, original=original: (touched.append(keys), original(key)))
+
+        test_storage.save_image("a-rather-long-project-name", sample_image_data)
+        test_storage.delete_image("a-rather-long-project-name", filename)
+        assert set(touched) <= {"_by_images", "_by_recent"}
+        assert catalog.get("a-rather-long-project-name").image_count == 1
+        infos, _ = test_storage.search_projects("long", match="substring")
+        assert [info.name for info in infos] == ["a-rather-long-project-name"]
+
+    def test_search_follows_updates(self, test_storage, sample_image_data):
+        """Sort orders track uploads and new projects."""
+        test_storage.save_image("first", sample_image_data)
+        time.sleep(0.01)
+        test_storage.create_project("second")
+        assert [info.name for info in test_storage.search_projects(sort="recent")[0]] == ["second", "first"]
+
+        time.sleep(0.01)
+        test_storage.save_image("first", sample_image_data)
+        infos, _ = test_storage.search_projects(sort="recent")
+        assert [info.name for info in infos] == ["first", "second"]
+        infos, _ = test_storage.search_projects("sec", match="substring")
+        assert [info.name for info in infos] == ["second"]
+        infos, _ = test_storage.search_projects("ond", match="substring")
+        assert [info.name for info in infos] == ["second"]
@@ -0,0 +1,133 @@
+import io
+import zipfile
+
+from PIL import Image
+
+from app import cli
+from app.importer import import_path, scan_directory
+
+
+def _png(color) -> bytes:
+    data = io.BytesIO()
+    Image.new('RGB', (16, 16), color=color).save(data, format='PNG')
+    return data.getvalue()
+
+
+COLORS = [(200, 0, 0), (0, 200, 0), (0, 0, 200), (200, 200, 0), (0, 200, 200)]
+
+
+def _make_tree(root):
+    """shot1..shot10 style names, a nested folder, a README and some noise."""
+    (root / "nested").mkdir(parents=True)
+    (root / ".hidden").mkdir()
+    files = {
+        "shot10.png": _png(COLORS[2]),
+        "shot2.png": _png(COLORS[1]),
+        "shot1.png": _png(COLORS[0]),
+        "nested/shot3.PNG": _png(COLORS[3]),
+        "broken.png": b"not an image",
+        "notes.txt": b"ignored",
+        ".hidden/secret.png": _png(COLORS[4]),
+        "README.md": "# 迁移的截图".encode("utf-8"),
+        "nested/README.md": b"# nested",
+    }
+    for name, data in files.items():
+        (root / name).write_bytes(data)
+    return files
+
+
+class TestImportPath:
+    def test_scan_directory_orders_naturally(self, temp_dir):
+        _make_tree(temp_dir / "src")
+        images, readme = scan_directory(temp_dir / "src")
+        assert [image.name for image in images] == [
+            "broken.png", "nested/shot3.PNG", "shot1.png", "shot2.png", "shot10.png",
+        ]
+        assert readme.name == "README.md"
+
+    def test_import_directory_with_worker_processes(self, test_storage, temp_dir):
+        """Images are converted in a process pool and numbered in name order."""
+        _make_tree(temp_dir / "src")
+        test_storage.save_image("imported", _png((9, 9, 9)))
+        events = []
+
+        result = import_path(
+            test_storage, "imported", temp_dir / "src", include_readme=True, workers=2,
+            progress=lambda *event: events.append(event),
+        )
+
+        assert result.imported == [
+            ("nested/shot3.PNG", "2.jpg"), ("shot1.png", "3.jpg"), ("shot2.png", "4.jpg"), ("shot10.png", "5.jpg"),
+        ]
+        assert [source for source, _ in result.errors] == ["broken.png"]
+        assert sorted(done for done, *_ in events) == [1, 2, 3, 4, 5]
+        assert all(total == 5 for _, total, *_ in events)
+
+        project_path = test_storage.get_project_path("imported")
+        for filename, color in [("3.jpg", COLORS[0]), ("4.jpg", COLORS[1]), ("5.jpg", COLORS[2])]:
+            with Image.open(project_path / filename) as image:
+                assert all(abs(a - b) < 8 for a, b in zip(image.getpixel((8, 8)), color))
+        assert test_storage.read_readme("imported") == "# 迁移的截图"
+        assert len(test_storage.list_images("imported")) == 5
+        assert test_storage.catalog.get("imported").image_count == 5
+        assert list((project_path / ".tmp").iterdir()) == []
+
+    def test_worker_storage_keeps_settings(self, temp_dir, monkeypatch):
+        """Worker processes store images like the importing storage does."""
+        from app import importer
+        from app.encoders import PngEncoder
+        from app.storage import ProjectStorage
+
+        storage = ProjectStorage(base_dir=temp_dir, encoder=PngEncoder(), durable=False)
+        created = []
+
+        class RecordingStorage(ProjectStorage):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                created.append(self)
+
+        monkeypatch.setattr(importer, "ProjectStorage", RecordingStorage)
+        (temp_dir / "shot.png").write_bytes(_png(COLORS[0]))
+        storage.create_project("settings")
+        source = scan_directory(temp_dir)[0][0]
+        prepared = importer._prepare(storage.base_dir, storage.encoder, storage.durable, "settings", source)
+        storage.discard_prepared(prepared)
+
+        worker_storage, = created
+        assert (worker_storage.base_dir, worker_storage.durable) == (temp_dir, False)
+        assert isinstance(worker_storage.encoder, PngEncoder)
+        assert prepared.ext == "png"
+
+    def test_import_zip(self, test_storage, temp_dir):
+        archive_path = temp_dir / "shots.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("b.png", _png(COLORS[1]))
+            archive.writestr("a.png", _png(COLORS[0]))
+            archive.writestr("__MACOSX/._a.png", b"resource fork")
+            archive.writestr("README.md", "# zip")
+
+        result = import_path(test_storage, "zipped", archive_path, workers=1)
+
+        assert result.imported == [("a.png", "1.jpg"), ("b.png", "2.jpg")]
+        assert result.errors == []
+        assert not result.readme
+        assert test_storage.read_readme("zipped") == ""
+
+
+class TestImportCli:
+    def test_cli_import(self, temp_dir, capsys):
+        _make_tree(temp_dir / "src")
+        storage_dir = temp_dir / "data"
+
+        status = cli.main([
+            "--storage-dir", str(storage_dir), "import", "cli_project", str(temp_dir / "src"),
+            "--workers", "1", "--readme",
+        ])
+
+        assert status == 1  # broken.png
+        out = capsys.readouterr().out
+        assert "shot10.png -> 4.jpg" in out
+        assert "Imported 4 images into cli_project, 1 failed, README imported" in out
+        assert sorted(path.name for path in (storage_dir / "cli_project").glob("*.jpg")) == [
+            "1.jpg", "2.jpg", "3.jpg", "4.jpg",
+        ]
@@ -0,0 +1,240 @@
+import shutil
+from pathlib import Path
+from PIL import Image
+from app.index import ImageIndex
+
+class TestImageIndex:
+    def test_listing_uses_index(self, test_storage, temp_dir, sample_image_data):
+        """Test that saved images are recorded with their metadata."""
+        project_name = "index_test"
+        test_storage.save_image(project_name, sample_image_data)
+        test_storage.save_image(project_name, sample_image_data)
+        
+        assert (temp_dir / ".index" / f"{project_name}.sqlite").exists()
+        
+        images = test_storage.list_images(project_name)
+        assert [img['filename'] for img in images] == ['1.jpg', '2.jpg']
+        assert images[0]['width'] == 100
+        assert images[0]['height'] == 100
+        assert images[0]['size'] == (temp_dir / project_name / '1.jpg').stat().st_size
+        assert images[0]['mtime'] > 0
+
+    def test_out_of_band_changes_trigger_rebuild(self, test_storage, temp_dir, sample_image_data):
+        """Test that files added or removed behind the index are picked up."""
+        project_name = "oob_test"
+        test_storage.save_image(project_name, sample_image_data)
+        project_path = temp_dir / project_name
+        
+        Image.new('RGB', (30, 20)).save(project_path / '7.jpg', 'JPEG')
+        images = test_storage.list_images(project_name)
+        assert [img['filename'] for img in images] == ['1.jpg', '7.jpg']
+        assert (images[1]['width'], images[1]['height']) == (30, 20)
+        assert test_storage.get_next_image_number(project_name) == 8
+        
+        (project_path / '1.jpg').unlink()
+        images = test_storage.list_images(project_name)
+        assert [img['filename'] for img in images] == ['7.jpg']
+
+    def test_missing_index_is_rebuilt(self, test_storage, temp_dir, sample_image_data):
+        """Test that the index is rebuilt from disk when deleted."""
+        project_name = "missing_test"
+        for _ in range(3):
+            test_storage.save_image(project_name, sample_image_data)
+        
+        shutil.rmtree(temp_dir / ".index")
+        
+        images = test_storage.list_images(project_name)
+        assert [img['filename'] for img in images] == ['1.jpg', '2.jpg', '3.jpg']
+        assert test_storage.save_image(project_name, sample_image_data) == '4.jpg'
+
+    def test_numbers_not_reused_after_deleting_newest(self, test_storage, sample_image_data):
+        """Test that deleting the newest image does not free its number."""
+        project_name = "highwater_test"
+        test_storage.save_image(project_name, sample_image_data)
+        test_storage.save_image(project_name, sample_image_data)
+        test_storage.delete_image(project_name, '2.jpg')
+        
+        assert test_storage.save_image(project_name, sample_image_data) == '3.jpg'
+
+    def test_readme_write_keeps_index_fresh(self, test_storage, temp_dir, sample_image_data, monkeypatch):
+        """Test that writing the README does not force a rebuild."""
+        project_name = "readme_index_test"
+        test_storage.save_image(project_name, sample_image_data)
+        test_storage.write_readme(project_name, "notes")
+        
+        def fail_rebuild(self, conn):
+            raise AssertionError("index should not be rebuilt")
+        monkeypatch.setattr(ImageIndex, '_rebuild', fail_rebuild)
+        
+        assert len(test_storage.list_images(project_name)) == 1
+
+    def test_reserve_numbers_block(self, temp_dir):
+        """Test reserving a contiguous block of numbers."""
+        project_path = temp_dir / "block"
+        project_path.mkdir()
+        index = ImageIndex(temp_dir / "block.sqlite", project_path)
+        
+        assert index.reserve_numbers(5) == 1
+        assert index.reserve_numbers() == 6
+        assert index.next_number() == 7
+
+    def test_migrates_index_without_extension_column(self, temp_dir):
+        """Test that indexes created before stored formats were configurable still open."""
+        import sqlite3
+        project_path = temp_dir / "old"
+        project_path.mkdir()
+        Image.new('RGB', (10, 10)).save(project_path / '1.jpg', 'JPEG')
+        db_path = temp_dir / "old.sqlite"
+        conn = sqlite3.connect(db_path)
+        conn.executescript(
+            "CREATE TABLE images (number INTEGER PRIMARY KEY, size INTEGER NOT NULL, "
+            "width INTEGER NOT NULL, height INTEGER NOT NULL, mtime REAL NOT NULL);"
+        )
+        conn.close()
+        
+        records = ImageIndex(db_path, project_path).list()
+        assert [record['filename'] for record in records] == ['1.jpg']
+
+    def test_change_feed(self, test_storage, temp_dir, sample_image_data):
+        """Test saves, deletes, README writes and out-of-band edits are all in the feed."""
+        project_name = "feed_test"
+        test_storage.create_project(project_name)
+        start = test_storage.get_change_seq(project_name)
+        test_storage.save_image(project_name, sample_image_data)
+        test_storage.save_image(project_name, sample_image_data)
+        test_storage.delete_image(project_name, "1.jpg")
+        test_storage.write_readme(project_name, "# Feed")
+        
+        feed = test_storage.get_changes(project_name, start)
+        assert [(c['type'], c['filename']) for c in feed['changes']] == [
+            ('added', '2.jpg'), ('deleted', '1.jpg'),
+        ]  # 1.jpg's add is superseded by its delete
+        assert feed['changes'][0]['image']['url'] == f"/api/projects/{project_name}/images/2.jpg"
+        assert feed['readme'] == "# Feed"
+        assert feed['seq'] == test_storage.get_change_seq(project_name) == start + 4
+        assert not feed['reset'] and not feed['more']
+        
+        # Caught up: nothing new
+        assert test_storage.get_changes(project_name, feed['seq'])['changes'] == []
+        
+        # Files changed behind the index's back show up once it notices
+        project_path = temp_dir / project_name
+        Image.new('RGB', (30, 20)).save(project_path / '9.jpg', 'JPEG')
+        (project_path / '2.jpg').unlink()
+        later = test_storage.get_changes(project_name, feed['seq'])
+        assert [(c['type'], c['filename']) for c in later['changes']] == [
+            ('deleted', '2.jpg'), ('added', '9.jpg'),
+        ]
+
+    def test_change_feed_paging_and_reset(self, temp_dir, monkeypatch):
+        """Test limits page through the feed and pruned history forces a reset."""
+        monkeypatch.setattr("app.index.CHANGES_RETAINED", 5)
+        project_path = temp_dir / "pruned"
+        project_path.mkdir()
+        index = ImageIndex(temp_dir / "pruned.sqlite", project_path)
+        for number in range(1, 9):
+            index.add(number, 1, 1, 1, 0.0)
+        
+        page = index.changes_since(3, limit=2)
+        assert [c['number'] for c in page['changes']] == [4, 5] and page['more']
+        page = index.changes_since(page['seq'], limit=10)
+        assert [c['number'] for c in page['changes']] == [6, 7, 8] and not page['more']
+        assert page['seq'] == index.change_seq() == 8
+        
+        # Changes 1-3 were pruned; a client from before them has to reload
+        assert index.changes_since(2, limit=10)['reset']
+        assert not index.changes_since(3, limit=10)['reset']
+        # A seq from a previous (deleted) index is from the future
+        assert index.changes_since(50, limit=10) == {'seq': 8, 'reset': True, 'more': False, 'changes': []}
+
+    def test_in_flight_commit_is_not_out_of_band(self, temp_dir, monkeypatch):
+        """Test reads between linking a reserved number and recording it don't rebuild."""
+        project_path = temp_dir / "in_flight"
+        project_path.mkdir()
+        index = ImageIndex(temp_dir / "in_flight.sqlite", project_path)
+        number = index.reserve_numbers()
+        Image.new('RGB', (30, 20)).save(project_path / f'{number}.jpg', 'JPEG')
+        
+        def fail_rebuild(self, conn):
+            raise AssertionError("index should not be rebuilt")
+        with monkeypatch.context() as patched:
+            patched.setattr(ImageIndex, '_rebuild', fail_rebuild)
+            assert index.list() == []
+            stat = (project_path / f'{number}.jpg').stat()
+            index.add(number, stat.st_size, 30, 20, stat.st_mtime)
+            assert [record['filename'] for record in index.list()] == ['1.jpg']
+            
+            index.expect_removal(number)
+            (project_path / f'{number}.jpg').unlink()
+            assert len(index.list()) == 1
+            index.remove(number)
+            assert index.list() == []
+        assert [c['kind'] for c in index.changes_since(0, 10)['changes']] == ['add', 'delete']
+        
+        # A writer that died after linking is caught up with once it times out
+        number = index.reserve_numbers()
+        Image.new('RGB', (30, 20)).save(project_path / f'{number}.jpg', 'JPEG')
+        assert index.list() == []
+        monkeypatch.setattr("app.index.PENDING_TIMEOUT", 0)
+        assert [record['filename'] for record in index.list()] == ['2.jpg']
+
+    def test_rebuild_only_opens_changed_files(self, test_storage, temp_dir, sample_image_data, monkeypatch):
+        """Test a rebuild reuses the dimensions of files it already knows."""
+        project_name = "incremental_test"
+        for _ in range(3):
+            test_storage.save_image(project_name, sample_image_data)
+        Image.new('RGB', (30, 20)).save(temp_dir / project_name / '9.jpg', 'JPEG')
+        
+        opened = []
+        original_open = Image.open
+        def counting_open(path, *args, **kwargs):
+            opened.append(Path(path).name)
+            return original_open(path, *args, **kwargs)
+        monkeypatch.setattr("app.index.Image.open", counting_open)
+        
+        images = test_storage.list_images(project_name)
+        assert [img['filename'] for img in images] == ['1.jpg', '2.jpg', '3.jpg', '9.jpg']
+        assert [(img['width'], img['height']) for img in images] == [(100, 100)] * 3 + [(30, 20)]
+        assert opened == ['9.jpg']
+
+    def test_change_feed_skips_repeated_add(self, temp_dir):
+        """Test a rebuild and the commit it raced don't both log the same add."""
+        project_path = temp_dir / "repeat"
+        project_path.mkdir()
+        index = ImageIndex(temp_dir / "repeat.sqlite", project_path)
+        index.add(1, 1, 1, 1, 0.0)
+        index.add(1, 1, 1, 1, 0.0)
+        index.remove(1)
+        index.add(1, 1, 1, 1, 0.0)
+        
+        assert [(c['kind'], c['number']) for c in index.changes_since(0, 10)['changes']] == [
+            ('add', 1), ('delete', 1), ('add', 1),
+        ]
+
+    def test_batch_commit_is_one_index_write(self, test_storage, temp_dir, monkeypatch):
+        """Test a batch is reserved and recorded in two transactions, not one per image."""
+        import io
+        from app import index as index_module
+        
+        project_name = "batch_write"
+        test_storage.create_project(project_name)
+        prepared = []
+        for shade in range(20):
+            data = io.BytesIO()
+            Image.new('RGB', (20, 10), (shade, 0, 0)).save(data, 'PNG')
+            prepared.append(test_storage.prepare_image(project_name, data.getvalue()))
+        test_storage.list_images(project_name)
+        
+        writes = []
+        original_transaction = index_module.transaction
+        def counting_transaction(conn):
+            writes.append(conn)
+            return original_transaction(conn)
+        monkeypatch.setattr(index_module, "transaction", counting_transaction)
+        
+        filenames = test_storage.commit_images(project_name, prepared)
+        assert filenames == [f"{number}.jpg" for number in range(1, 21)]
+        assert len(writes) == 2
+        assert [img['filename'] for img in test_storage.list_images(project_name)] == filenames
+        changes = test_storage._get_index(project_name).changes_since(0, 100)['changes']
+        assert [c['number'] for c in changes if c['kind'] == 'add'] == list(range(1, 21))
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from app.jobs import JobQueue
+
+
+class TestJobQueue:
+    def test_runs_jobs_in_order(self, job_queue):
+        seen = []
+        job_queue.register("record", lambda project, payload: seen.append((project, payload["n"])))
+
+        first = job_queue.enqueue("record", "alpha", {"n": 1})
+        job_queue.enqueue_many("record", "beta", [{"n": 2}, {"n": 3}])
+
+        assert job_queue.counts() == {"pending": 3, "running": 0, "done": 0, "failed": 0}
+        assert job_queue.run_pending() == 3
+        assert seen == [("alpha", 1), ("beta", 2), ("beta", 3)]
+        job = job_queue.get(first)
+        assert job["state"] == "done"
+        assert job["attempts"] == 1
+        assert job["payload"] == {"n": 1}
+        assert job_queue.get(9999) is None
+
+    def test_retries_with_backoff_then_fails(self, job_queue):
+        job_queue.max_attempts, job_queue.retry_delay = 3, 0.05
+        calls = []
+
+        def flaky(project, payload):
+            calls.append(time.monotonic())
+            raise OSError("disk on fire")
+
+        job_queue.register("flaky", flaky)
+        job_id = job_queue.enqueue("flaky", "alpha")
+
+        assert job_queue.run_pending() == 1
+        job = job_queue.get(job_id)
+        assert (job["state"], job["attempts"]) == ("pending", 1)
+        assert job["error"] == "OSError: disk on fire"
+        # Not runnable again before its retry delay
+        assert job_queue.run_pending() == 0
+
+        while job_queue.get(job_id)["state"] == "pending":
+            time.sleep(0.02)
+            job_queue.run_pending()
+        job = job_queue.get(job_id)
+        assert (job["state"], job["attempts"]) == ("failed", 3)
+        assert len(calls) == 3
+        assert calls[2] - calls[1] >= 0.1  # the delay doubles
+        assert [failed["id"] for failed in job_queue.list("failed")] == [job_id]
+
+    def test_resumes_after_restart(self, job_queue, jobs_db):
+        """Pending jobs, and jobs whose worker died, run in the next process."""
+        crashed = job_queue
+        crashed.lease = 0.5
+        crashed.enqueue("work", "alpha", {"n": 1})
+        crashed.enqueue("work", "alpha", {"n": 2})
+        assert crashed._claim()["payload"] == {"n": 1}  # then the process dies
+
+        restarted = JobQueue(jobs_db)
+        seen = []
+        restarted.register("work", lambda project, payload: seen.append(payload["n"]))
+        assert restarted.run_pending() == 1  # the claimed job is still leased
+        time.sleep(0.5)
+        assert restarted.run_pending() == 1
+        assert seen == [2, 1]
+        assert restarted.counts()["done"] == 2
+
+    def test_worker_threads(self, job_queue):
+        done = threading.Event()
+        job_queue.register("signal", lambda project, payload: done.set())
+
+        job_queue.start(workers=2)
+        try:
+            job_queue.enqueue("signal", "alpha")
+            assert done.wait(5)
+        finally:
+            job_queue.stop()
+        assert job_queue.counts()["done"] == 1
+
+    def test_finished_jobs_are_pruned(self, job_queue):
+        job_queue.retention, job_queue.max_attempts = 0, 1
+        job_queue.register("noop", lambda project, payload: None)
+        job_queue.register("broken", lambda project, payload: 1 / 0)
+        job_queue.enqueue("noop", "alpha")
+        job_queue.enqueue("broken", "alpha")
+        job_queue.enqueue("noop", "beta")
+        job_queue.run_pending()
+        assert job_queue.counts() == {"pending": 0, "running": 0, "done": 2, "failed": 1}
+
+        job_queue._prune()
+        assert job_queue.counts() == {"pending": 0, "running": 0, "done": 0, "failed": 0}
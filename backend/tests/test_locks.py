@@ -0,0 +1,109 @@
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import app
+from app.locks import KeyedLocks
+from app.storage import ProjectStorage
+
+
+class TestKeyedLocks:
+    def test_mutual_exclusion(self):
+        """Threads holding the same key never overlap."""
+        locks = KeyedLocks()
+        inside = []
+        overlaps = []
+
+        def work():
+            for _ in range(200):
+                with locks.hold("project"):
+                    inside.append(1)
+                    if len(inside) > 1:
+                        overlaps.append(1)
+                    inside.pop()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert overlaps == []
+        assert len(locks) == 0
+        assert locks.stats()["acquisitions"] == 1600
+
+    def test_entries_live_only_while_in_use(self):
+        """A key's lock exists while held or waited for, and is dropped after."""
+        locks = KeyedLocks()
+        with locks.hold("a"):
+            with locks.hold("b"):
+                assert len(locks) == 2
+            assert len(locks) == 1
+        assert len(locks) == 0
+
+    def test_contention_stats(self):
+        """Waiting for a held key is counted as contention."""
+        locks = KeyedLocks()
+        acquired = threading.Event()
+        results = []
+
+        def waiter():
+            acquired.wait()
+            with locks.hold("a") as contended:
+                results.append(contended)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        with locks.hold("a") as contended:
+            assert contended is False
+            acquired.set()
+            time.sleep(0.05)
+            # The waiter keeps the entry alive
+            assert len(locks) == 1
+        thread.join()
+
+        assert results == [True]
+        stats = locks.stats()
+        assert stats["locks"] == 0
+        assert stats["acquisitions"] == 2
+        assert stats["contended"] == 1
+        assert stats["wait_seconds"] > 0
+
+    def test_abandoned_keys_keep_memory_flat(self):
+        """Locking 100k distinct keys once each leaves no memory behind."""
+        locks = KeyedLocks()
+
+        def touch(start, count):
+            for i in range(start, start + count):
+                with locks.hold(f"auto-{i}"):
+                    pass
+
+        touch(0, 1_000)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            touch(1_000, 100_000)
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+
+        app_only = [tracemalloc.Filter(True, str(Path(app.__file__).parent / "*"))]
+        growth = sum(
+            stat.size_diff
+            for stat in after.filter_traces(app_only).compare_to(before.filter_traces(app_only), "filename")
+        )
+        # A dict entry plus lock per key would be over 10MB
+        assert growth < 64 * 1024
+        assert len(locks) == 0
+
+    def test_abandoned_projects_release_locks(self, temp_dir):
+        """ProjectStorage keeps no lock for projects nobody is working on."""
+        test_storage = ProjectStorage(base_dir=temp_dir)
+        for i in range(100_000):
+            with test_storage._project_lock(f"auto-{i}"):
+                pass
+
+        stats = test_storage.lock_stats()
+        assert stats["locks"] == 0
+        assert stats["acquisitions"] == 100_000
+        assert stats["contended"] == 0
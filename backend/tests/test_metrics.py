@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from app.metrics import OVERFLOW_LABEL, Counter, Gauge, Histogram, Registry
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+class TestMetrics:
+    def test_counter_render(self, registry):
+        """Counters render HELP/TYPE lines and one sample per label set."""
+        counter = Counter("requests_total", "Requests", ["route"], registry=registry)
+        counter.labels("/a").inc()
+        counter.labels("/a").inc(2)
+        counter.labels('/b"').inc()
+        output = registry.render()
+        assert "# TYPE requests_total counter" in output
+        assert 'requests_total{route="/a"} 3' in output
+        assert 'requests_total{route="/b\\""} 1' in output
+
+    def test_counter_rejects_decrease(self, registry):
+        counter = Counter("c_total", "C", registry=registry)
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_gauge_track_inprogress(self, registry):
+        gauge = Gauge("in_flight", "In flight", registry=registry)
+        with gauge.track_inprogress():
+            assert "in_flight 1" in registry.render()
+        assert "in_flight 0" in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        output = registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in output
+        assert 'latency_seconds_bucket{le="1"} 3' in output
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in output
+        assert "latency_seconds_count 4" in output
+        assert "latency_seconds_sum 3.65" in output
+
+    def test_max_series_folds_into_overflow(self, registry):
+        """Label sets beyond max_series share one overflow series."""
+        counter = Counter("per_project_total", "Per project", ["project"], max_series=2, registry=registry)
+        for project in ("a", "b", "c", "d"):
+            counter.labels(project).inc()
+        assert counter.labels("a").get() == 1
+        assert counter.labels("c") is counter.labels(OVERFLOW_LABEL)
+        assert counter.labels(OVERFLOW_LABEL).get() == 2
+
+    def test_concurrent_updates(self, registry):
+        """Updates from many threads are not lost."""
+        counter = Counter("hits_total", "Hits", ["worker"], registry=registry)
+        histogram = Histogram("work_seconds", "Work", registry=registry)
+
+        def work():
+            for _ in range(1000):
+                counter.labels("x").inc()
+                histogram.observe(0.01)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.labels("x").get() == 8000
+        assert "work_seconds_count 8000" in registry.render()
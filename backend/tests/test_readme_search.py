@@ -0,0 +1,146 @@
+import os
+from pathlib import Path
+
+from app.readme_search import make_snippet
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def projects(result):
+    return [match["project"] for match in result["results"]]
+
+
+class TestReadmeIndex:
+    def test_ranking_and_terms(self, readme_index):
+        readme_index.update("alpha", "Login crash. Crash again after crash on login.", 1, 1)
+        readme_index.update("beta", "One crash in the settings page, then a long description of everything else", 1, 1)
+        readme_index.update("gamma", "Nothing to see here", 1, 1)
+
+        result = readme_index.search("crash")
+        assert result["total"] == 2
+        assert projects(result) == ["alpha", "beta"]
+        assert result["results"][0]["score"] > result["results"][1]["score"]
+        # Every term must match, case-insensitively and as a word prefix
+        assert projects(readme_index.search("CRASH settings")) == ["beta"]
+        assert projects(readme_index.search("sett")) == ["beta"]
+        assert readme_index.search("ettings")["total"] == 0
+        assert readme_index.search("crash missing")["total"] == 0
+        assert readme_index.search("  ")["total"] == 0
+        # Paging
+        assert projects(readme_index.search("crash", limit=1, offset=1)) == ["beta"]
+
+    def test_ranks_every_match(self, readme_index, monkeypatch):
+        readme_index.update("best", "crash crash crash", 1, 1)
+        for i in range(30):
+            readme_index.update(f"weak{i}", f"one crash among many other words in note {i}", 1, 1)
+
+        # Written first, still ranked first
+        result = readme_index.search("crash", limit=5)
+        assert result["total"] == 31
+        assert projects(result)[0] == "best"
+        scores = [match["score"] for match in readme_index.search("crash", limit=50)["results"]]
+        assert scores == sorted(scores, reverse=True)
+
+        # Capped, only the 10 most recent matches are ranked
+        monkeypatch.setattr("app.readme_search.README_SEARCH_MAX_RANKED", 10)
+        result = readme_index.search("crash", limit=5)
+        assert result["total"] == 31
+        assert "best" not in projects(result)
+        assert projects(readme_index.search("crash", limit=5, offset=20))  # pages past the cap still fill
+
+    def test_chinese(self, readme_index):
+        readme_index.update("alpha", "登录页面在弹窗后崩溃，UI错位", 1, 1)
+        readme_index.update("beta", "设置页面正常", 1, 1)
+
+        assert projects(readme_index.search("崩溃")) == ["alpha"]
+        assert sorted(projects(readme_index.search("页面"))) == ["alpha", "beta"]
+        assert projects(readme_index.search("ui 页面正常")) == []
+        assert projects(readme_index.search("ui 弹窗后")) == ["alpha"]
+        assert projects(readme_index.search("登录页面在弹窗后崩溃")) == ["alpha"]
+        assert projects(readme_index.search("页面在崩溃")) == []
+        # Single characters, at the start, middle or end of a run
+        assert projects(readme_index.search("登")) == ["alpha"]
+        assert projects(readme_index.search("常")) == ["beta"]
+        assert projects(readme_index.search("位")) == ["alpha"]
+        assert readme_index.search("好")["total"] == 0
+
+    def test_query_syntax_is_literal(self, readme_index):
+        readme_index.update("alpha", "near the OR button: 100% broken", 1, 1)
+
+        assert projects(readme_index.search('NEAR( OR "button"')) == ["alpha"]
+        assert projects(readme_index.search("100%")) == ["alpha"]
+        assert readme_index.search("* %_ -")["total"] == 0
+
+    def test_update_and_remove(self, readme_index):
+        readme_index.update("alpha", "first version", 1, 1)
+        readme_index.update("alpha", "second version", 2, 2)
+        assert readme_index.search("first")["total"] == 0
+        assert projects(readme_index.search("second")) == ["alpha"]
+
+        readme_index.update("alpha", "", 3, 0)
+        assert readme_index.search("version")["total"] == 0
+        readme_index.update("alpha", "third version", 4, 4)
+        readme_index.remove("alpha")
+        assert readme_index.search("version")["total"] == 0
+
+    def test_sync_picks_up_out_of_band_edits(self, temp_dir, readme_index):
+        alpha = write(temp_dir / "alpha" / "README.md", "alpha notes")
+        beta = write(temp_dir / "beta" / "README.md", "beta notes")
+        readmes = {"alpha": alpha, "beta": beta, "gamma": None}
+
+        assert readme_index.sync(readmes) == 2
+        assert readme_index.search("notes")["total"] == 2
+        assert readme_index.sync(readmes) == 0  # nothing changed, nothing read
+
+        write(alpha, "alpha changed by hand")
+        os.utime(alpha, ns=(1, 1))
+        beta.unlink()
+        readmes["gamma"] = write(temp_dir / "gamma" / "README.md", "gamma notes")
+        assert readme_index.sync(readmes) == 3
+        assert projects(readme_index.search("notes")) == ["gamma"]
+        assert projects(readme_index.search("hand")) == ["alpha"]
+
+        del readmes["alpha"]
+        assert readme_index.sync(readmes) == 1
+        assert readme_index.search("hand")["total"] == 0
+
+    def test_sync_batches_keep_concurrent_updates(self, temp_dir, readme_index, monkeypatch):
+        from app import readme_search
+
+        monkeypatch.setattr(readme_search, "SYNC_BATCH", 2)
+        readmes = {f"p{i}": write(temp_dir / f"p{i}" / "README.md", f"notes {i}") for i in range(5)}
+        batches = []
+        original_write = readme_search.write
+        original_read_text = Path.read_text
+
+        def counting_write(*args):
+            batches.append(args)
+            return original_write(*args)
+
+        def read_text(path, *args, **kwargs):
+            text = original_read_text(path, *args, **kwargs)
+            if path == readmes["p3"] and text == "notes 3":
+                # Rewritten through the API between the sync's read and its write
+                write(path, "notes newer")
+                readme_index.update("p3", "notes newer", 7, 7)
+            return text
+        monkeypatch.setattr(readme_search, "write", counting_write)
+        monkeypatch.setattr(Path, "read_text", read_text)
+
+        assert readme_index.sync(readmes) == 5
+        assert len(batches) == 1 + 3  # the update, then 5 READMEs in batches of 2
+        assert projects(readme_index.search("newer")) == ["p3"]
+        assert readme_index.search("notes")["total"] == 5
+
+
+class TestMakeSnippet:
+    def test_escapes_and_marks(self):
+        text = "x" * 100 + " Found a <b>Crash</b> & more " + "y" * 100
+        snippet = make_snippet(text, ["crash", "b"])
+        assert snippet.startswith("…") and snippet.endswith("…")
+        assert "&lt;<mark>b</mark>&gt;<mark>Crash</mark>&lt;/<mark>b</mark>&gt; &amp; more" in snippet
+        assert make_snippet("short text", ["missing"]) == "short text"
@@ -0,0 +1,118 @@
+import io
+import random
+import threading
+
+from PIL import Image, ImageDraw
+
+from app import similarity as similarity_module
+from app.similarity import SimilarityIndex, dhash
+
+
+def make_screen(seed: int, size=(800, 500)) -> Image.Image:
+    """A screenshot-like image: panels and text lines in random places."""
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0] - 100), rng.randrange(size[1] - 60)
+        draw.rectangle((x, y, x + rng.randrange(40, 300), y + rng.randrange(20, 200)),
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image
+
+
+def distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class TestDhash:
+    def test_same_screen_hashes_alike(self):
+        screen = make_screen(1)
+        recompressed = io.BytesIO()
+        screen.resize((400, 250)).save(recompressed, format='JPEG', quality=60)
+        edited = screen.copy()
+        ImageDraw.Draw(edited).text((700, 480), "build 1234", fill=(0, 0, 0))
+
+        original = dhash(screen)
+        assert distance(original, dhash(Image.open(recompressed))) <= 6
+        assert distance(original, dhash(edited)) <= 4
+        assert all(distance(original, dhash(make_screen(seed))) > 12 for seed in range(2, 12))
+
+    def test_transparency_counts_as_white(self):
+        image = Image.new('RGBA', (90, 80), (0, 0, 0, 0))
+        ImageDraw.Draw(image).rectangle((0, 0, 44, 79), fill=(0, 0, 0, 255))
+        flattened = Image.new('RGB', (90, 80), 'white')
+        ImageDraw.Draw(flattened).rectangle((0, 0, 44, 79), fill='black')
+        assert dhash(image) == dhash(flattened) == dhash(image.convert('P'))
+
+
+class TestSimilarityIndex:
+    def brute_force(self, entries, query, max_distance):
+        return sorted(
+            (project, number, distance(value, query))
+            for project, number, _, value in entries
+            if distance(value, query) <= max_distance
+        )
+
+    def test_matches_brute_force(self, monkeypatch):
+        """Searches find exactly what a linear scan finds, across rebuilds."""
+        monkeypatch.setattr(similarity_module, 'MIN_REBUILD', 50)
+        rng = random.Random(7)
+        centers = [rng.getrandbits(64) for _ in range(20)]
+
+        def near(center):
+            for bit in rng.sample(range(64), rng.randrange(12)):
+                center ^= 1 << bit
+            return center
+
+        entries = [(f"build{i % 5}", i, "jpg", near(rng.choice(centers))) for i in range(1000)]
+        index = SimilarityIndex()
+        index.load(entries[:600])
+        for entry in entries[600:]:
+            index.add(*entry)  # some of these in the unsorted part, some rebuilt
+        index.add(*entries[0])  # already there
+        for project, number, _, value in entries[:100]:
+            index.remove(project, number, value)
+        live = entries[100:]
+        assert len(index) == len(live)
+
+        for query in centers[:5] + [near(centers[5]), rng.getrandbits(64)]:
+            for max_distance in (0, 3, 8, 15):
+                found = index.search(query, max_distance, limit=len(live))
+                assert sorted((p, n, d) for p, n, _, d in found) == self.brute_force(live, query, max_distance)
+                assert [d for *_, d in found] == sorted(d for *_, d in found)
+
+    def test_limit_keeps_closest(self):
+        index = SimilarityIndex()
+        for number, value in enumerate([0b1, 0b111, 0b0, 0b11]):
+            index.add("p", number, "png", value)
+        assert index.search(0, 4, limit=2) == [("p", 2, "png", 0), ("p", 0, "png", 1)]
+
+    def test_discard_without_hash(self):
+        index = SimilarityIndex()
+        index.add("a", 1, "jpg", 5)
+        index.add("b", 1, "jpg", 5)
+        index.discard("b", 1)
+        index.discard("b", 2)
+        index.discard("c", 1)
+        assert index.search(5, 0, limit=10) == [("a", 1, "jpg", 0)]
+        assert len(index) == 1
+
+    def test_load_does_not_block_adds(self):
+        """Entries are read before the lock is taken, so a slow load doesn't stall writers."""
+        index = SimilarityIndex()
+        reading = threading.Event()
+        added = threading.Event()
+
+        def entries():
+            yield ("a", 1, "jpg", 1)
+            reading.set()
+            assert added.wait(5), "add() waited for the load"
+            yield ("a", 2, "jpg", 2)
+
+        loader = threading.Thread(target=index.load, args=(entries(),))
+        loader.start()
+        assert reading.wait(5)
+        index.add("b", 1, "png", 3)
+        added.set()
+        loader.join()
+        assert len(index) == 3 and index.loaded
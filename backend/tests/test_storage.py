@@ -3,8 +3,52 @@ import threading
 import time
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import os
 from app.storage import ProjectStorage
 
+def _color_for(worker: int, index: int):
+    return (worker * 40 % 256, index % 256, index // 256 * 17 % 256)
+
+def _upload_worker(base_dir: str, project_name: str, worker: int, count: int):
+    """Upload ``count`` distinctly colored PNGs from a separate process."""
+    from PIL import Image
+    import io
+    from app.encoders import PngEncoder
+    
+    storage = ProjectStorage(base_dir=base_dir, encoder=PngEncoder())
+    
+    def upload(index):
+        img_bytes = io.BytesIO()
+        Image.new('RGB', (8, 8), color=_color_for(worker, index)).save(img_bytes, format='PNG')
+        return storage.save_image(project_name, img_bytes.getvalue())
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        return list(executor.map(upload, range(count)))
+
+def _peak_rss() -> int:
+    """Peak resident memory of this process in bytes (Linux only)."""
+    # Unlike ru_maxrss, VmHWM isn't carried over from the parent across exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmHWM not found")
+
+def _peak_memory_worker(base_dir: str, path: str, max_dimension: int):
+    """Save one image in a fresh process; returns (peak RSS growth in bytes, stored size)."""
+    from app import storage as storage_module
+    
+    storage_module.MAX_STORED_DIMENSION = max_dimension
+    storage = ProjectStorage(base_dir=base_dir)
+    data = Path(path).read_bytes()
+    before = _peak_rss()
+    filename = storage.save_image("memory_test", data)
+    after = _peak_rss()
+    record = storage.list_images("memory_test")[0]
+    assert record['filename'] == filename
+    return after - before, (record['width'], record['height'])
+
 class TestProjectStorage:
     def test_validate_project_name(self, test_storage):
         """Test project name validation."""
@@ -185,4 +229,601 @@ class TestProjectStorage:
         
         # Invalid image filenames
         assert test_storage.get_image_path("test", "invalid.txt") is None
-        assert test_storage.delete_image("test", "invalid.txt") is False
\ No newline at end of file
+        assert test_storage.delete_image("test", "invalid.txt") is False
+
+    def test_concurrent_upload_stress(self, test_storage, sample_image_data):
+        """Test many concurrent uploads produce gap-free, collision-free numbering."""
+        from PIL import Image
+        
+        project_name = "stress_test"
+        count = 60
+        
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            futures = [
+                executor.submit(test_storage.save_image, project_name, sample_image_data)
+                for _ in range(count)
+            ]
+            filenames = [future.result() for future in futures]
+        
+        assert sorted(filenames, key=lambda f: int(f.split('.')[0])) == [f"{i}.jpg" for i in range(1, count + 1)]
+        
+        images = test_storage.list_images(project_name)
+        assert [img['filename'] for img in images] == [f"{i}.jpg" for i in range(1, count + 1)]
+        for filename in filenames:
+            with Image.open(test_storage.get_image_path(project_name, filename)) as saved_img:
+                saved_img.verify()
+        
+        # No temp files are left behind
+        temp_dir = test_storage.get_project_path(project_name) / ".tmp"
+        assert list(temp_dir.iterdir()) == []
+
+    def test_encoding_happens_outside_project_lock(self, test_storage, sample_image_data):
+        """Test that decode/encode does not wait for the project lock."""
+        project_name = "lock_scope_test"
+        test_storage.create_project(project_name)
+        
+        with test_storage._project_lock(project_name):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(test_storage.prepare_image, project_name, sample_image_data)
+                prepared = future.result(timeout=5)
+        
+        assert prepared.path.exists()
+        assert (prepared.width, prepared.height) == (100, 100)
+        assert test_storage.commit_images(project_name, [prepared]) == ["1.jpg"]
+        assert not prepared.path.exists()
+
+    def test_thumbnails(self, test_storage):
+        """Test thumbnails are generated by a background job and removed on delete."""
+        from PIL import Image
+        import io
+        
+        project_name = "thumb_test"
+        img = Image.new('RGB', (1600, 800), color='blue')
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format='PNG')
+        
+        filename = test_storage.save_image(project_name, img_bytes.getvalue())
+        thumb_path = test_storage.get_project_path(project_name) / ".thumbs" / "320" / filename
+        assert not thumb_path.exists()
+        assert test_storage.jobs.counts()["pending"] == 1
+        assert test_storage.jobs.run_pending() == 1
+        assert thumb_path.exists()
+        with Image.open(thumb_path) as thumb:
+            assert thumb.size == (320, 160)
+        
+        images = test_storage.list_images(project_name)
+        assert images[0]['thumbnail_url'] == f"/api/projects/{project_name}/thumbs/320/{filename}"
+        assert images[0]['thumbnails'] == {"320": images[0]['thumbnail_url']}
+        
+        test_storage.delete_image(project_name, filename)
+        assert not thumb_path.exists()
+        assert test_storage.get_thumbnail_path(project_name, 320, filename) is None
+
+    def test_thumbnail_backfill(self, test_storage):
+        """Test thumbnails are generated lazily for images stored without one."""
+        from PIL import Image
+        
+        project_name = "backfill_test"
+        test_storage.create_project(project_name)
+        Image.new('RGB', (640, 640)).save(test_storage.get_project_path(project_name) / "1.jpg", 'JPEG')
+        
+        thumb_path = test_storage.get_thumbnail_path(project_name, 320, "1.jpg")
+        assert thumb_path is not None
+        with Image.open(thumb_path) as thumb:
+            assert thumb.size == (320, 320)
+        
+        # Unknown sizes are not generated
+        assert test_storage.get_thumbnail_path(project_name, 123, "1.jpg") is None
+
+    def test_duplicate_upload_is_linked(self, test_storage, sample_image_data, monkeypatch):
+        """Test that re-uploading the same bytes links instead of re-encoding."""
+        from app import storage as storage_module
+        
+        project_name = "dedup_test"
+        first = test_storage.save_image(project_name, sample_image_data)
+        
+        encodes = []
+        real_save_jpeg = storage_module.save_jpeg_temp
+        def counting_save_jpeg(*args, **kwargs):
+            encodes.append(args)
+            return real_save_jpeg(*args, **kwargs)
+        monkeypatch.setattr(storage_module, 'save_jpeg_temp', counting_save_jpeg)
+        
+        second = test_storage.save_image(project_name, sample_image_data)
+        assert (first, second) == ("1.jpg", "2.jpg")
+        assert encodes == []
+        
+        first_path = test_storage.get_image_path(project_name, first)
+        second_path = test_storage.get_image_path(project_name, second)
+        assert first_path.stat().st_ino == second_path.stat().st_ino
+        assert len(test_storage.list_images(project_name)) == 2
+        
+        # Deleting the original keeps the linked copy intact
+        test_storage.delete_image(project_name, first)
+        assert second_path.read_bytes()
+
+    def test_duplicate_pixels_across_formats(self, test_storage):
+        """Test that the same picture as PNG and lossless WebP is detected."""
+        from PIL import Image
+        import io
+        
+        project_name = "dedup_formats"
+        img = Image.new('RGB', (64, 48), color=(10, 200, 30))
+        png_bytes = io.BytesIO()
+        img.save(png_bytes, format='PNG')
+        webp_bytes = io.BytesIO()
+        img.save(webp_bytes, format='WEBP', lossless=True)
+        
+        first = test_storage.save_image(project_name, png_bytes.getvalue())
+        second = test_storage.save_image(project_name, webp_bytes.getvalue())
+        
+        first_path = test_storage.get_image_path(project_name, first)
+        second_path = test_storage.get_image_path(project_name, second)
+        assert first_path.stat().st_ino == second_path.stat().st_ino
+
+    def test_duplicate_reuse_mode(self, test_storage, sample_image_data, monkeypatch):
+        """Test that reuse mode returns the existing filename."""
+        from app import storage as storage_module
+        monkeypatch.setattr(storage_module, 'DEDUP_MODE', 'reuse')
+        
+        project_name = "dedup_reuse"
+        assert test_storage.save_image(project_name, sample_image_data) == "1.jpg"
+        assert test_storage.save_image(project_name, sample_image_data) == "1.jpg"
+        assert len(test_storage.list_images(project_name)) == 1
+        
+        # Once the original is gone the upload is stored again
+        test_storage.delete_image(project_name, "1.jpg")
+        assert test_storage.save_image(project_name, sample_image_data) == "2.jpg"
+
+    def test_dedup_off(self, test_storage, sample_image_data, monkeypatch):
+        """Test that deduplication can be disabled."""
+        from app import storage as storage_module
+        monkeypatch.setattr(storage_module, 'DEDUP_MODE', 'off')
+        
+        project_name = "dedup_off"
+        first = test_storage.save_image(project_name, sample_image_data)
+        second = test_storage.save_image(project_name, sample_image_data)
+        
+        first_path = test_storage.get_image_path(project_name, first)
+        second_path = test_storage.get_image_path(project_name, second)
+        assert first_path.stat().st_ino != second_path.stat().st_ino
+
+    def test_webp_output(self, temp_dir, sample_image_data):
+        """Test storing images as WebP with alpha kept."""
+        from PIL import Image
+        import io
+        from app.encoders import WebpEncoder
+        
+        webp_storage = ProjectStorage(base_dir=temp_dir, encoder=WebpEncoder(lossless=True))
+        project_name = "webp_test"
+        
+        img = Image.new('RGBA', (50, 40), color=(255, 0, 0, 128))
+        png_bytes = io.BytesIO()
+        img.save(png_bytes, format='PNG')
+        
+        filename = webp_storage.save_image(project_name, png_bytes.getvalue())
+        assert filename == "1.webp"
+        
+        with Image.open(webp_storage.get_image_path(project_name, filename)) as saved_img:
+            assert saved_img.format == 'WEBP'
+            assert saved_img.mode == 'RGBA'
+        
+        images = webp_storage.list_images(project_name)
+        assert images[0]['filename'] == "1.webp"
+        assert images[0]['media_type'] == "image/webp"
+        assert images[0]['thumbnail_url'].endswith("/thumbs/320/1.jpg")
+        assert webp_storage.get_thumbnail_path(project_name, 320, "1.jpg") is not None
+        
+        assert webp_storage.delete_image(project_name, filename) is True
+        assert webp_storage.list_images(project_name) == []
+
+    def test_registered_encoder(self, temp_dir, sample_image_data, monkeypatch):
+        """Test images in a registered format are indexed, listed, served and searchable."""
+        from PIL import Image
+        from app import encoders
+        
+        class TiffEncoder(encoders.Encoder):
+            name = "tiff"
+            pil_format = "TIFF"
+            extension = "tif"
+            
+            def encode(self, image, fp):
+                image.save(fp, "TIFF")
+        
+        monkeypatch.setattr(encoders, "ENCODERS", dict(encoders.ENCODERS))
+        monkeypatch.setattr(encoders, "MEDIA_TYPES", dict(encoders.MEDIA_TYPES))
+        encoders.register_encoder(TiffEncoder)
+        tiff_storage = ProjectStorage(base_dir=temp_dir, encoder=encoders.get_encoder("tiff"))
+        
+        for project_name in ["tiff_a", "tiff_b"]:
+            assert tiff_storage.save_image(project_name, sample_image_data) == "1.tif"
+        with Image.open(tiff_storage.get_image_path("tiff_a", "1.tif")) as saved_img:
+            assert saved_img.format == 'TIFF'
+        images = tiff_storage.list_images("tiff_a")
+        assert [(img['filename'], img['media_type']) for img in images] == [("1.tif", "image/tif")]
+        assert tiff_storage.list_project_infos()[0].image_count == 1
+        similar = tiff_storage.find_similar("tiff_a", "1.tif", max_distance=0)
+        assert [(r['project'], r['filename']) for r in similar] == [("tiff_b", "1.tif")]
+        
+        # Also picked up from disk when the index is rebuilt
+        Image.new('RGB', (30, 20)).save(temp_dir / "tiff_a" / "5.tif", 'TIFF')
+        assert [img['filename'] for img in tiff_storage.list_images("tiff_a")] == ["1.tif", "5.tif"]
+        assert tiff_storage.delete_image("tiff_a", "1.tif") is True
+
+    def test_jpeg_passthrough(self, test_storage):
+        """Test JPEG inputs are stored byte-for-byte without re-encoding."""
+        from PIL import Image
+        import io
+        
+        project_name = "passthrough_test"
+        img = Image.new('RGB', (80, 60), color='green')
+        jpeg_bytes = io.BytesIO()
+        img.save(jpeg_bytes, format='JPEG', quality=50)
+        
+        filename = test_storage.save_image(project_name, jpeg_bytes.getvalue())
+        stored = test_storage.get_image_path(project_name, filename).read_bytes()
+        assert stored == jpeg_bytes.getvalue()
+        
+        # Non-JPEG inputs are still converted
+        png_bytes = io.BytesIO()
+        img.save(png_bytes, format='PNG')
+        filename = test_storage.save_image(project_name, png_bytes.getvalue())
+        with Image.open(test_storage.get_image_path(project_name, filename)) as saved_img:
+            assert saved_img.format == 'JPEG'
+
+    def test_multiprocess_upload_stress(self, temp_dir):
+        """Test worker processes sharing a project never lose or overwrite images."""
+        from PIL import Image
+        
+        project_name = "multiprocess_test"
+        workers, per_worker = 4, 40
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers) as pool:
+            results = pool.starmap(
+                _upload_worker,
+                [(str(temp_dir), project_name, worker, per_worker) for worker in range(workers)],
+            )
+        
+        total = workers * per_worker
+        filenames = [filename for result in results for filename in result]
+        assert sorted(filenames, key=lambda f: int(f.split('.')[0])) == [f"{i}.png" for i in range(1, total + 1)]
+        
+        # Every upload's pixels are on disk under the name it was given
+        storage = ProjectStorage(base_dir=temp_dir)
+        for worker, result in enumerate(results):
+            for index, filename in enumerate(result):
+                with Image.open(storage.get_project_path(project_name) / filename) as saved_img:
+                    assert saved_img.getpixel((0, 0)) == _color_for(worker, index)
+        assert len(storage.list_images(project_name)) == total
+
+    def test_commit_skips_numbers_taken_behind_index(self, test_storage, sample_image_data):
+        """Test a file the index doesn't know about is never overwritten."""
+        from PIL import Image
+        import io
+        
+        project_name = "collision_test"
+        test_storage.save_image(project_name, sample_image_data)
+        
+        # Another writer created 2.jpg, and the index accepted the new mtime
+        intruder = test_storage.get_project_path(project_name) / "2.jpg"
+        intruder.write_bytes(b"not ours")
+        index = test_storage._get_index(project_name)
+        index.mark_synced()
+        assert index.next_number() == 2
+        
+        img_bytes = io.BytesIO()
+        Image.new('RGB', (10, 10), color='blue').save(img_bytes, format='PNG')
+        assert test_storage.save_image(project_name, img_bytes.getvalue()) == "3.jpg"
+        assert intruder.read_bytes() == b"not ours"
+
+    def test_export_zip_is_a_snapshot(self, test_storage, sample_image_data):
+        """Test an export holds the project as it was when it started."""
+        from PIL import Image
+        import io
+        import zipfile
+        
+        project_name = "export_test"
+        first = test_storage.save_image(project_name, sample_image_data)
+        img_bytes = io.BytesIO()
+        Image.new('RGB', (10, 10), color='blue').save(img_bytes, format='PNG')
+        second = test_storage.save_image(project_name, img_bytes.getvalue())
+        test_storage.write_readme(project_name, "# Before")
+        project_path = test_storage.get_project_path(project_name)
+        expected = {name: (project_path / name).read_bytes() for name in [first, second]}
+        
+        archive = test_storage.export_zip(project_name)
+        
+        # Changes after the export started don't show up in it
+        test_storage.delete_image(project_name, first)
+        img_bytes = io.BytesIO()
+        Image.new('RGB', (10, 10), color='green').save(img_bytes, format='PNG')
+        test_storage.save_image(project_name, img_bytes.getvalue())
+        test_storage.write_readme(project_name, "# After")
+        
+        chunks = list(archive)
+        assert max(map(len, chunks)) <= 512 * 1024
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as exported:
+            assert exported.namelist() == [first, second, "README.md"]
+            assert exported.testzip() is None
+            for name, data in expected.items():
+                assert exported.read(name) == data
+                assert exported.getinfo(name).compress_type == zipfile.ZIP_STORED
+            assert exported.read("README.md") == b"# Before"
+        
+        # The snapshot is gone once the archive was sent
+        assert list((project_path / ".tmp").glob("export-*")) == []
+        assert test_storage.export_zip("missing_project") is None
+
+    def test_readme_replaced_atomically(self, test_storage, monkeypatch):
+        """Test a failed README write leaves the old text and no temp file."""
+        project_name = "atomic_readme"
+        test_storage.write_readme(project_name, "# Old")
+        
+        def fail(*args):
+            raise OSError("disk full")
+        monkeypatch.setattr("app.storage.os.replace", fail)
+        with pytest.raises(OSError):
+            test_storage.write_readme(project_name, "# New")
+        monkeypatch.undo()
+        
+        assert test_storage.read_readme(project_name) == "# Old"
+        assert list((test_storage.get_project_path(project_name) / ".tmp").iterdir()) == []
+        assert test_storage.search_readmes("old")["total"] == 1
+        assert test_storage.search_readmes("new")["total"] == 0
+
+    def test_readme_search_index(self, test_storage):
+        """Test the README index follows API writes and, after a sync, edits on disk."""
+        test_storage.write_readme("searched", "Crash on the login screen")
+        assert [r["project"] for r in test_storage.search_readmes("login")["results"]] == ["searched"]
+        
+        readme_path = test_storage.get_project_path("searched") / "README.md"
+        readme_path.write_text("Edited by hand", encoding='utf-8')
+        os.utime(readme_path, ns=(1, 1))
+        test_storage.create_project("no_readme")
+        assert test_storage.search_readmes("hand")["total"] == 0
+        
+        assert test_storage.sync_readme_index() == 1
+        assert test_storage.search_readmes("login")["total"] == 0
+        assert [r["project"] for r in test_storage.search_readmes("hand")["results"]] == ["searched"]
+
+    def test_readme_saved_when_indexing_fails(self, test_storage, monkeypatch):
+        """Test a locked search index doesn't fail the write; a job indexes it later."""
+        import sqlite3
+        from app.readme_search import ReadmeIndex
+        
+        original_update = ReadmeIndex.update
+        def locked(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+        monkeypatch.setattr(ReadmeIndex, "update", locked)
+        test_storage.write_readme("unindexed", "Crash on the login screen")
+        assert test_storage.read_readme("unindexed") == "Crash on the login screen"
+        assert test_storage.search_readmes("login")["total"] == 0
+        
+        monkeypatch.setattr(ReadmeIndex, "update", original_update)
+        assert [job['kind'] for job in test_storage.jobs.list("pending")] == ["readme"]
+        test_storage.jobs.run_pending()
+        assert [r["project"] for r in test_storage.search_readmes("login")["results"]] == ["unindexed"]
+
+    def test_failed_encode_leaves_nothing_listed(self, temp_dir, sample_image_data):
+        """Test an image that fails to write never appears under its final name."""
+        from app.encoders import JpegEncoder
+        
+        class FailingEncoder(JpegEncoder):
+            def encode(self, image, fp):
+                fp.write(b"partial")
+                raise OSError("disk full")
+        
+        storage = ProjectStorage(base_dir=temp_dir, encoder=FailingEncoder())
+        with pytest.raises(OSError):
+            storage.save_image("failed_write", sample_image_data)
+        project_path = storage.get_project_path("failed_write")
+        assert storage.list_images("failed_write") == []
+        assert list(project_path.glob("*.jpg")) == []
+        assert list((project_path / ".tmp").iterdir()) == []
+
+    @pytest.mark.parametrize("durable", [True, False])
+    def test_durability_modes(self, temp_dir, sample_image_data, monkeypatch, durable):
+        """Test durable mode fsyncs files and directories, fast mode doesn't."""
+        import os
+        from app.config import THUMBNAIL_SIZES
+        
+        synced = []
+        real_fsync = os.fsync
+        def fsync(fd):
+            synced.append(fd)
+            real_fsync(fd)
+        monkeypatch.setattr("app.storage.os.fsync", fsync)
+        
+        storage = ProjectStorage(base_dir=temp_dir, durable=durable)
+        storage.save_image("durable_test", sample_image_data)
+        storage.write_readme("durable_test", "# Notes")
+        # Image and the project directory; README and the directory
+        assert len(synced) == (4 if durable else 0)
+        # Thumbnails, written later by a background job
+        storage.jobs.run_pending()
+        assert len(synced) == (len(THUMBNAIL_SIZES) + 4 if durable else 0)
+
+    def test_cleanup_temp_files(self, test_storage, sample_image_data):
+        """Test startup cleanup removes only old leftovers."""
+        import os
+        
+        project_name = "cleanup_test"
+        test_storage.save_image(project_name, sample_image_data)
+        temp_dir = test_storage.get_temp_dir(project_name)
+        old_file = temp_dir / "upload-old.jpg"
+        old_file.write_bytes(b"partial")
+        old_dir = temp_dir / "export-old"
+        old_dir.mkdir()
+        (old_dir / "1.jpg").write_bytes(b"x")
+        young_file = temp_dir / "upload-young.jpg"
+        young_file.write_bytes(b"in progress")
+        # Import archives wait outside any project
+        old_archive = test_storage.get_temp_dir() / "import-old.zip"
+        old_archive.write_bytes(b"PK")
+        long_ago = time.time() - 7200
+        for path in [old_file, old_dir, old_archive]:
+            os.utime(path, (long_ago, long_ago))
+        
+        assert test_storage.cleanup_temp_files(3600) == 3
+        assert sorted(path.name for path in temp_dir.iterdir()) == ["upload-young.jpg"]
+        assert not old_archive.exists()
+        assert len(test_storage.list_images(project_name)) == 1
+
+    def test_decompression_bomb_rejected(self, test_storage, bomb_png_data):
+        """Test oversized images are refused from the header, before decoding."""
+        from app.storage import ImageTooLarge
+        
+        with pytest.raises(ImageTooLarge):
+            test_storage.save_image("bomb_test", bomb_png_data)
+        assert test_storage.list_images("bomb_test") == []
+        assert list(test_storage.get_temp_dir("bomb_test").iterdir()) == []
+
+    def test_dimension_limits(self, test_storage, monkeypatch):
+        """Test the per-side and total pixel limits are both enforced."""
+        from PIL import Image
+        import io
+        from app import storage as storage_module
+        from app.storage import ImageTooLarge
+        
+        png_bytes = io.BytesIO()
+        Image.new('RGB', (300, 10), color='blue').save(png_bytes, format='PNG')
+        
+        monkeypatch.setattr(storage_module, 'MAX_IMAGE_DIMENSION', 200)
+        with pytest.raises(ImageTooLarge, match="300x10"):
+            test_storage.save_image("limits_test", png_bytes.getvalue())
+        
+        monkeypatch.setattr(storage_module, 'MAX_IMAGE_DIMENSION', 1000)
+        monkeypatch.setattr(storage_module, 'MAX_IMAGE_PIXELS', 2999)
+        with pytest.raises(ImageTooLarge, match="3000 pixels"):
+            test_storage.save_image("limits_test", png_bytes.getvalue())
+        
+        monkeypatch.setattr(storage_module, 'MAX_IMAGE_PIXELS', 3000)
+        assert test_storage.save_image("limits_test", png_bytes.getvalue()) == "1.jpg"
+
+    def test_max_stored_dimension(self, test_storage, monkeypatch):
+        """Test large inputs are stored scaled down to the configured size."""
+        from PIL import Image
+        import io
+        from app import storage as storage_module
+        monkeypatch.setattr(storage_module, 'MAX_STORED_DIMENSION', 100)
+        
+        project_name = "downscale_test"
+        inputs = [
+            ('JPEG', Image.new('RGB', (800, 600), color='green')),  # reduced-resolution decode
+            ('PNG', Image.new('RGBA', (400, 100), color=(255, 0, 0, 128))),
+            ('PNG', Image.new('P', (300, 300))),
+            ('PNG', Image.new('RGB', (80, 60), color='blue')),  # already fits
+        ]
+        for image_format, image in inputs:
+            data = io.BytesIO()
+            image.save(data, format=image_format)
+            filename = test_storage.save_image(project_name, data.getvalue())
+            with Image.open(test_storage.get_image_path(project_name, filename)) as stored:
+                assert stored.format == 'JPEG'
+        
+        sizes = [(image['width'], image['height']) for image in test_storage.list_images(project_name)]
+        assert sizes == [(100, 75), (100, 25), (100, 100), (80, 60)]
+        thumb_path = test_storage.get_thumbnail_path(project_name, 320, "1.jpg")
+        with Image.open(thumb_path) as thumb:
+            assert thumb.size == (100, 75)
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="peak RSS comes from /proc")
+    def test_max_stored_dimension_memory_ceiling(self, temp_dir):
+        """Test a downscaled JPEG never occupies its full size in memory."""
+        from PIL import Image
+        
+        # 144MB of pixels when decoded in full, a few KB on disk
+        path = temp_dir / "huge.jpg"
+        Image.new('RGB', (8000, 6000), color='white').save(path, format='JPEG')
+        full_size = 8000 * 6000 * 3
+        
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            full_growth, full_stored = pool.apply(_peak_memory_worker, (str(temp_dir / "full"), str(path), 0))
+        with context.Pool(1) as pool:
+            reduced_growth, reduced_stored = pool.apply(_peak_memory_worker, (str(temp_dir / "reduced"), str(path), 1000))
+        
+        assert full_stored == (8000, 6000)
+        assert full_growth > full_size * 0.9
+        assert reduced_stored == (1000, 750)
+        assert reduced_growth < full_size / 8
+
+    def test_find_similar_across_projects(self, test_storage):
+        """Test the similarity index follows saves and deletes in every project."""
+        import io
+        from tests.test_similarity import make_screen
+        
+        def upload(project_name, image, image_format='PNG'):
+            data = io.BytesIO()
+            image.save(data, format=image_format)
+            return test_storage.save_image(project_name, data.getvalue())
+        
+        login = make_screen(1)
+        upload("build-1", login)
+        upload("build-1", make_screen(2))
+        upload("build-2", make_screen(3))
+        upload("build-2", login.resize((600, 375)), 'JPEG')
+        upload("build-3", login)  # same bytes again: a linked duplicate
+        
+        results = test_storage.find_similar("build-1", "1.jpg", max_distance=8)
+        assert sorted((r['project'], r['filename']) for r in results) == [("build-2", "2.jpg"), ("build-3", "1.jpg")]
+        assert {r['filename']: r['distance'] for r in results}["1.jpg"] == 0
+        rescaled = next(r for r in results if r['project'] == "build-2")
+        assert rescaled['url'] == "/api/projects/build-2/images/2.jpg"
+        assert rescaled['thumbnail_url'] == "/api/projects/build-2/thumbs/320/2.jpg"
+        
+        test_storage.delete_image("build-3", "1.jpg")
+        results = test_storage.find_similar("build-1", "1.jpg", max_distance=8)
+        assert [(r['project'], r['filename']) for r in results] == [("build-2", "2.jpg")]
+        assert test_storage.find_similar("build-1", "9.jpg", max_distance=8) is None
+        assert test_storage.find_similar("build-1", "1.png", max_distance=8) is None
+
+    def test_similarity_backfill(self, temp_dir, sample_image_data):
+        """Test images stored before perceptual hashes get them from a job."""
+        import sqlite3
+        
+        storage = ProjectStorage(base_dir=temp_dir)
+        storage.save_image("old_project", sample_image_data)
+        db_path = temp_dir / ".index" / "old_project.sqlite"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE image_hashes SET dhash = NULL")
+        
+        # A fresh process: the index is loaded from disk
+        storage = ProjectStorage(base_dir=temp_dir)
+        storage.load_similarity_index()
+        assert len(storage.similar) == 0
+        assert [job['kind'] for job in storage.jobs.list("pending")] == ["dhashes", "thumbnails"]
+        storage.jobs.run_pending()
+        assert len(storage.similar) == 1
+        assert storage._get_index("old_project").get_dhash(1) is not None
+        assert storage.find_similar("old_project", "1.jpg", max_distance=0) == []
+    
+    def test_similarity_follows_other_processes(self, temp_dir, sample_image_data, monkeypatch):
+        """Test saves and deletes made through another worker reach this one's index."""
+        monkeypatch.setattr("app.storage.SIMILARITY_SYNC_SECONDS", 3600)
+        worker = ProjectStorage(base_dir=temp_dir)
+        worker.save_image("shared", sample_image_data)
+        worker.load_similarity_index()
+        other = ProjectStorage(base_dir=temp_dir)
+        other.save_image("shared", sample_image_data)
+        other.save_image("elsewhere", sample_image_data)
+        other.delete_image("shared", "1.jpg")
+        
+        # Throttled: not looked at yet
+        worker.sync_similarity_index()
+        assert len(worker.similar) == 1
+        worker.catalog.refresh()  # as its periodic rescan would, for the new project
+        worker.sync_similarity_index(force=True)
+        value = worker._get_index("shared").get_dhash(2)
+        assert sorted((p, n) for p, n, _, _ in worker.similar.search(value, 0, 10)) == [("elsewhere", 1), ("shared", 2)]
+        assert len(worker.similar) == 2
+        
+        # Settled projects that didn't change aren't read again
+        from app.index import ImageIndex
+        time.sleep(1.1)
+        worker.sync_similarity_index(force=True)
+        reads = []
+        monkeypatch.setattr(ImageIndex, "changes_since", lambda self, *args: reads.append(args))
+        worker.sync_similarity_index(force=True)
+        assert reads == []
+
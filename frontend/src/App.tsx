@@ -1,25 +1,55 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { ProjectSelector } from './components/ProjectSelector';
 import { PasteArea } from './components/PasteArea';
 import { ReadmeEditor } from './components/ReadmeEditor';
 import { ImageGrid } from './components/ImageGrid';
 import { api, ApiError } from './api';
-import { ProjectDetail } from './types';
+import { ChangeFeed, ImageInfo, ProjectDetail } from './types';
+
+const IMAGE_PAGE_SIZE = 60;
+
+const imageNumber = (filename: string) => parseInt(filename, 10);
 
 function App() {
   const [currentProject, setCurrentProject] = useState<string | null>(null);
   const [projectDetail, setProjectDetail] = useState<ProjectDetail | null>(null);
+  const [images, setImages] = useState<ImageInfo[]>([]);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showProjectSelector, setShowProjectSelector] = useState(false);
   const [loading, setLoading] = useState(false);
   const [uploading, setUploading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // Change sequence number the shown images and README are current to
+  const seqRef = useRef(0);
+  const nextCursorRef = useRef<number | null>(null);
 
   useEffect(() => {
-    if (currentProject) {
-      loadProjectDetail();
-    } else {
+    nextCursorRef.current = nextCursor;
+  }, [nextCursor]);
+
+  useEffect(() => {
+    if (!currentProject) {
       setProjectDetail(null);
+      setImages([]);
+      setNextCursor(null);
+      return;
     }
+
+    let source: EventSource | null = null;
+    let cancelled = false;
+    loadProjectDetail().then(() => {
+      // Follow changes made here, in other tabs and by other clients
+      if (cancelled || typeof EventSource === 'undefined') return;
+      source = new EventSource(api.projectEventsUrl(currentProject, seqRef.current));
+      source.addEventListener('changes', event => {
+        applyChanges(JSON.parse((event as MessageEvent).data));
+      });
+    });
+    return () => {
+      cancelled = true;
+      source?.close();
+    };
   }, [currentProject]);
 
   const loadProjectDetail = async () => {
@@ -28,8 +58,16 @@ function App() {
     try {
       setLoading(true);
       setError(null);
-      const detail = await api.getProjectDetail(currentProject);
+      // Images are paged separately so large projects load quickly
+      const [detail, page] = await Promise.all([
+        api.getProjectDetail(currentProject, false),
+        api.listImages(currentProject, { limit: IMAGE_PAGE_SIZE }),
+      ]);
+      // Replaying from the older of the two can't miss a change
+      seqRef.current = Math.min(detail.seq ?? 0, page.seq ?? 0);
       setProjectDetail(detail);
+      setImages(page.images);
+      setNextCursor(page.next_cursor);
     } catch (err) {
       setError(err instanceof ApiError ? err.message : 'Failed to load project');
     } finally {
@@ -37,6 +75,62 @@ function App() {
     }
   };
 
+  const applyChanges = (feed: ChangeFeed) => {
+    if (feed.reset) {
+      // Too far behind to catch up change by change
+      loadProjectDetail();
+      return;
+    }
+    // The event stream and our own syncs can deliver the same changes
+    if (feed.seq <= seqRef.current) return;
+    const changes = feed.changes.filter(change => change.seq > seqRef.current);
+    seqRef.current = feed.seq;
+
+    if (changes.length > 0) {
+      setImages(prev => {
+        const byFilename = new Map(prev.map(image => [image.filename, image]));
+        for (const change of changes) {
+          byFilename.delete(change.filename);
+          const cursor = nextCursorRef.current;
+          // Images past the loaded pages come with "load more"
+          if (change.type === 'added' && change.image && (cursor === null || imageNumber(change.filename) <= cursor)) {
+            byFilename.set(change.filename, change.image);
+          }
+        }
+        return [...byFilename.values()].sort((a, b) => imageNumber(a.filename) - imageNumber(b.filename));
+      });
+    }
+    if (feed.readme !== null) {
+      const readme = feed.readme;
+      setProjectDetail(prev => prev && { ...prev, readme });
+    }
+  };
+
+  // Fetch the changes we just made instead of reloading the whole project
+  const syncChanges = async () => {
+    if (!currentProject) return;
+    let feed: ChangeFeed;
+    do {
+      feed = await api.getChanges(currentProject, seqRef.current);
+      applyChanges(feed);
+    } while (feed.more && !feed.reset);
+  };
+
+  const loadMoreImages = async () => {
+    if (!currentProject || nextCursor === null || loadingMore) return;
+
+    try {
+      setLoadingMore(true);
+      const page = await api.listImages(currentProject, { limit: IMAGE_PAGE_SIZE, cursor: nextCursor });
+      setImages(prev => [...prev, ...page.images]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError(err instanceof ApiError ? err.message : 'Failed to load images');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleProjectSelect = (projectName: string) => {
     setCurrentProject(projectName);
     setShowProjectSelector(false);
@@ -49,12 +143,18 @@ function App() {
     setError(null);
 
     try {
-      // Upload files sequentially to maintain order
-      for (const file of files) {
-        await api.uploadImage(currentProject, file);
+      if (files.length > 1) {
+        // Batch requests of up to MAX_BATCH_FILES; numbers follow the input order
+        const { results } = await api.uploadImages(currentProject, files);
+        const failed = results.filter(result => result.error);
+        if (failed.length > 0) {
+          setError(failed.map(result => `${result.original_filename}: ${result.error}`).join('; '));
+        }
+      } else {
+        await api.uploadImage(currentProject, files[0]);
       }
-      // Refresh project detail to show new images
-      await loadProjectDetail();
+      // Show the new images
+      await syncChanges();
     } catch (err) {
       setError(err instanceof ApiError ? err.message : 'Failed to upload images');
     } finally {
@@ -68,8 +168,8 @@ function App() {
     try {
       setError(null);
       await api.deleteImage(currentProject, filename);
-      // Refresh project detail to remove deleted image
-      await loadProjectDetail();
+      // Remove the deleted image
+      await syncChanges();
     } catch (err) {
       setError(err instanceof ApiError ? err.message : 'Failed to delete image');
     }
@@ -140,9 +240,12 @@ function App() {
 
           {currentProject ? (
             <ImageGrid
-              images={projectDetail?.images || []}
+              images={images}
               onDeleteImage={handleDeleteImage}
               loading={loading}
+              hasMore={nextCursor !== null}
+              loadingMore={loadingMore}
+              onLoadMore={loadMoreImages}
             />
           ) : (
             <div style={{ 
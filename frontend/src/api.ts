@@ -1,6 +1,8 @@
-import { Project, ProjectDetail } from './types';
+import { BatchImageResult, ChangeFeed, ImagePage, Project, ProjectDetail, ProjectList, ProjectListOptions } from './types';
 
 const API_BASE = '/api';
+// The server's default MAX_BATCH_FILES; bigger drops go in several requests
+export const MAX_BATCH_FILES = 100;
 
 export class ApiError extends Error {
   constructor(message: string, public status: number) {
@@ -35,8 +37,34 @@ async function fetchApi<T>(url: string, options?: RequestInit): Promise<T> {
 
 export const api = {
   // Projects
-  async listProjects(): Promise<{ projects: string[] }> {
-    return fetchApi('/projects');
+  async listProjects(options: ProjectListOptions = {}): Promise<ProjectList> {
+    const params = new URLSearchParams();
+    if (options.q) params.set('q', options.q);
+    if (options.match) params.set('match', options.match);
+    if (options.sort) params.set('sort', options.sort);
+    if (options.limit !== undefined) params.set('limit', String(options.limit));
+    if (options.offset) params.set('offset', String(options.offset));
+    if (options.details) params.set('details', 'true');
+    const query = params.toString();
+
+    const response = await fetch(`${API_BASE}/projects${query ? `?${query}` : ''}`, {
+      headers: { 'Content-Type': 'application/json' },
+    });
+    if (!response.ok) {
+      let errorMessage = `HTTP ${response.status}`;
+      try {
+        const errorData = await response.json();
+        errorMessage = errorData.detail || errorData.message || errorMessage;
+      } catch {
+        errorMessage = response.statusText || errorMessage;
+      }
+      throw new ApiError(errorMessage, response.status);
+    }
+
+    const data = await response.json();
+    // The total number of matches comes in a header so the body stays a plain list
+    const total = Number(response.headers?.get('X-Total-Count') ?? data.projects.length);
+    return { ...data, total };
   },
 
   async createProject(name: string): Promise<Project> {
@@ -46,11 +74,34 @@ export const api = {
     });
   },
 
-  async getProjectDetail(name: string): Promise<ProjectDetail> {
-    return fetchApi(`/projects/${encodeURIComponent(name)}`);
+  async getProjectDetail(name: string, includeImages: boolean = true): Promise<ProjectDetail> {
+    const query = includeImages ? '' : '?include_images=false';
+    return fetchApi(`/projects/${encodeURIComponent(name)}${query}`);
   },
 
   // Images
+  async listImages(
+    projectName: string,
+    options: { limit?: number; cursor?: number | null; order?: 'asc' | 'desc' } = {}
+  ): Promise<ImagePage> {
+    const params = new URLSearchParams();
+    if (options.limit !== undefined) params.set('limit', String(options.limit));
+    if (options.cursor !== undefined && options.cursor !== null) params.set('cursor', String(options.cursor));
+    if (options.order) params.set('order', options.order);
+    const query = params.toString();
+    return fetchApi(`/projects/${encodeURIComponent(projectName)}/images${query ? `?${query}` : ''}`);
+  },
+
+  // Changes since a seq from getProjectDetail/listImages (or a previous feed)
+  async getChanges(projectName: string, since: number): Promise<ChangeFeed> {
+    return fetchApi(`/projects/${encodeURIComponent(projectName)}/changes?since=${since}`);
+  },
+
+  // Server-Sent Events URL pushing a ChangeFeed as each change happens
+  projectEventsUrl(projectName: string, since: number): string {
+    return `${API_BASE}/projects/${encodeURIComponent(projectName)}/events?since=${since}`;
+  },
+
   async uploadImage(projectName: string, file: File): Promise<{ filename: string; url: string }> {
     const formData = new FormData();
     formData.append('file', file);
@@ -74,6 +125,58 @@ export const api = {
     return response.json();
   },
 
+  async uploadImages(
+    projectName: string,
+    files: File[],
+    batchSize: number = MAX_BATCH_FILES,
+  ): Promise<{ results: BatchImageResult[] }> {
+    // Chunks are uploaded in order, so numbers still follow the input order
+    const results: BatchImageResult[] = [];
+    for (let start = 0; start < files.length; start += batchSize) {
+      const chunk = files.slice(start, start + batchSize);
+      try {
+        const response = await api.uploadBatch(projectName, chunk);
+        results.push(...response.results.map(result => ({ ...result, index: result.index + start })));
+      } catch (err) {
+        if (!(err instanceof ApiError)) throw err;
+        // A refused chunk fails its own files; the others are separate requests
+        results.push(...chunk.map((file, i) => ({
+          index: start + i,
+          original_filename: file.name,
+          filename: null,
+          url: null,
+          error: err.message,
+        })));
+      }
+    }
+    return { results };
+  },
+
+  async uploadBatch(projectName: string, files: File[]): Promise<{ results: BatchImageResult[] }> {
+    const formData = new FormData();
+    for (const file of files) {
+      formData.append('file', file);
+    }
+
+    const response = await fetch(`${API_BASE}/projects/${encodeURIComponent(projectName)}/images:batch`, {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (!response.ok) {
+      let errorMessage = `HTTP ${response.status}`;
+      try {
+        const errorData = await response.json();
+        errorMessage = errorData.detail || errorData.message || errorMessage;
+      } catch {
+        errorMessage = response.statusText || errorMessage;
+      }
+      throw new ApiError(errorMessage, response.status);
+    }
+
+    return response.json();
+  },
+
   async deleteImage(projectName: string, filename: string): Promise<{ deleted: boolean }> {
     return fetchApi(`/projects/${encodeURIComponent(projectName)}/images/${encodeURIComponent(filename)}`, {
       method: 'DELETE',
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { ImageInfo } from '../types';
 import { ImageViewer } from './ImageViewer';
 
@@ -6,10 +6,38 @@ interface ImageGridProps {
   images: ImageInfo[];
   onDeleteImage: (filename: string) => void;
   loading?: boolean;
+  hasMore?: boolean;
+  loadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-export const ImageGrid: React.FC<ImageGridProps> = ({ images, onDeleteImage, loading = false }) => {
+export const ImageGrid: React.FC<ImageGridProps> = ({
+  images,
+  onDeleteImage,
+  loading = false,
+  hasMore = false,
+  loadingMore = false,
+  onLoadMore,
+}) => {
   const [selectedImage, setSelectedImage] = useState<ImageInfo | null>(null);
+  const sentinelRef = useRef<HTMLDivElement>(null);
+
+  // Load the next page when the end of the grid scrolls into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !hasMore || !onLoadMore || typeof IntersectionObserver === 'undefined') return;
+
+    const observer = new IntersectionObserver(
+      entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+          onLoadMore();
+        }
+      },
+      { rootMargin: '400px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [hasMore, onLoadMore, images.length]);
 
   const handleImageClick = (image: ImageInfo) => {
     setSelectedImage(image);
@@ -60,7 +88,7 @@ export const ImageGrid: React.FC<ImageGridProps> = ({ images, onDeleteImage, loa
             title={`点击查看大图: ${image.filename}`}
           >
             <img 
-              src={image.url} 
+              src={image.thumbnail_url || image.url} 
               alt={image.filename}
               loading="lazy"
             />
@@ -76,6 +104,18 @@ export const ImageGrid: React.FC<ImageGridProps> = ({ images, onDeleteImage, loa
         ))}
       </div>
 
+      {hasMore && (
+        <div ref={sentinelRef} style={{ textAlign: 'center', padding: '1rem' }}>
+          <button
+            className="btn btn-secondary"
+            onClick={onLoadMore}
+            disabled={loadingMore}
+          >
+            {loadingMore ? '加载中...' : '加载更多'}
+          </button>
+        </div>
+      )}
+
       {selectedImage && (
         <ImageViewer
           imageUrl={selectedImage.url}
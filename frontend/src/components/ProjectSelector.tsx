@@ -1,5 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { api, ApiError } from '../api';
+import { ProjectSort, ProjectSummary } from '../types';
+
+const PAGE_SIZE = 50;
+const SEARCH_DEBOUNCE_MS = 250;
 
 interface ProjectSelectorProps {
   onProjectSelect: (projectName: string) => void;
@@ -7,26 +11,52 @@ interface ProjectSelectorProps {
 }
 
 export const ProjectSelector: React.FC<ProjectSelectorProps> = ({ onProjectSelect, onClose }) => {
-  const [projects, setProjects] = useState<string[]>([]);
+  const [projects, setProjects] = useState<ProjectSummary[]>([]);
+  const [total, setTotal] = useState(0);
+  const [query, setQuery] = useState('');
+  const [sort, setSort] = useState<ProjectSort>('recent');
   const [newProjectName, setNewProjectName] = useState('');
   const [loading, setLoading] = useState(true);
+  const [searching, setSearching] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [creating, setCreating] = useState(false);
+  // Only the latest request may update the list; earlier ones may finish later
+  const requestId = useRef(0);
+  const firstLoad = useRef(true);
 
   useEffect(() => {
-    loadProjects();
-  }, []);
+    // Load right away on open, then wait for typing to pause
+    const delay = firstLoad.current ? 0 : SEARCH_DEBOUNCE_MS;
+    firstLoad.current = false;
+    const timer = setTimeout(() => loadProjects(0), delay);
+    return () => clearTimeout(timer);
+  }, [query, sort]);
 
-  const loadProjects = async () => {
+  const loadProjects = async (offset: number) => {
+    const id = ++requestId.current;
     try {
-      setLoading(true);
+      setSearching(true);
       setError(null);
-      const response = await api.listProjects();
-      setProjects(response.projects);
+      const response = await api.listProjects({
+        q: query.trim(),
+        match: 'substring',
+        sort,
+        limit: PAGE_SIZE,
+        offset,
+        details: true,
+      });
+      if (id !== requestId.current) return;
+      const page = response.items ?? response.projects.map(name => ({ name, image_count: 0, last_modified: 0 }));
+      setProjects(prev => (offset === 0 ? page : [...prev, ...page]));
+      setTotal(response.total);
     } catch (err) {
+      if (id !== requestId.current) return;
       setError(err instanceof ApiError ? err.message : 'Failed to load projects');
     } finally {
-      setLoading(false);
+      if (id === requestId.current) {
+        setLoading(false);
+        setSearching(false);
+      }
     }
   };
 
@@ -96,25 +126,51 @@ export const ProjectSelector: React.FC<ProjectSelectorProps> = ({ onProjectSelec
             </div>
 
             {/* 现有项目列表 */}
-            {projects.length > 0 && (
+            {(projects.length > 0 || query) && (
               <>
                 <h3 style={{ margin: '0 0 1rem 0', color: '#333' }}>现有项目</h3>
+                <div className="project-search">
+                  <input
+                    type="search"
+                    placeholder="搜索项目..."
+                    value={query}
+                    onChange={(e) => setQuery(e.target.value)}
+                  />
+                  <select value={sort} onChange={(e) => setSort(e.target.value as ProjectSort)} aria-label="排序">
+                    <option value="recent">最近更新</option>
+                    <option value="name">名称</option>
+                    <option value="images">图片数量</option>
+                  </select>
+                </div>
                 <div className="project-list">
                   {projects.map(project => (
                     <div
-                      key={project}
+                      key={project.name}
                       className="project-item"
-                      onClick={() => onProjectSelect(project)}
+                      onClick={() => onProjectSelect(project.name)}
                       style={{ cursor: 'pointer' }}
                     >
-                      📁 {project}
+                      📁 {project.name}
+                      <span className="project-meta">{project.image_count} 张</span>
                     </div>
                   ))}
                 </div>
+                {projects.length === 0 && !searching && (
+                  <div style={{ textAlign: 'center', color: '#666', padding: '1rem' }}>没有匹配的项目</div>
+                )}
+                {projects.length < total && (
+                  <button
+                    className="btn"
+                    onClick={() => loadProjects(projects.length)}
+                    disabled={searching}
+                  >
+                    {searching ? '加载中...' : `加载更多（${projects.length} / ${total}）`}
+                  </button>
+                )}
               </>
             )}
 
-            {projects.length === 0 && (
+            {projects.length === 0 && !query && (
               <div style={{ 
                 textAlign: 'center', 
                 color: '#666', 
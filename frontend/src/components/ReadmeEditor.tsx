@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { api, ApiError } from '../api';
 
 interface ReadmeEditorProps {
@@ -12,8 +12,13 @@ export const ReadmeEditor: React.FC<ReadmeEditorProps> = ({ projectName, initial
   const [content, setContent] = useState(initialContent);
   const [saveStatus, setSaveStatus] = useState<SaveStatus>('saved');
   const [error, setError] = useState<string | null>(null);
+  const saveStatusRef = useRef(saveStatus);
+  saveStatusRef.current = saveStatus;
 
   useEffect(() => {
+    // initialContent also changes when the README is edited elsewhere;
+    // don't throw away typing that hasn't been saved yet
+    if (saveStatusRef.current === 'unsaved' || saveStatusRef.current === 'saving') return;
     setContent(initialContent);
     setSaveStatus('saved');
   }, [initialContent]);
@@ -23,7 +23,23 @@ describe('API', () => {
       expect(mockFetch).toHaveBeenCalledWith('/api/projects', {
         headers: { 'Content-Type': 'application/json' },
       })
-      expect(result).toEqual(mockResponse)
+      expect(result).toEqual({ ...mockResponse, total: 2 })
+    })
+
+    it('should pass search options and read the total count header', async () => {
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        headers: new Headers({ 'X-Total-Count': '120' }),
+        json: () => Promise.resolve({ projects: ['web-home'] }),
+      })
+
+      const result = await api.listProjects({ q: 'web', match: 'substring', sort: 'recent', limit: 50, offset: 50 })
+
+      expect(mockFetch).toHaveBeenCalledWith(
+        '/api/projects?q=web&match=substring&sort=recent&limit=50&offset=50',
+        { headers: { 'Content-Type': 'application/json' } },
+      )
+      expect(result).toEqual({ projects: ['web-home'], total: 120 })
     })
 
     it('should handle fetch error', async () => {
@@ -92,6 +108,73 @@ describe('API', () => {
     })
   })
 
+  describe('uploadImages', () => {
+    it('should upload several images in one request', async () => {
+      const files = [
+        new File(['a'], 'a.png', { type: 'image/png' }),
+        new File(['b'], 'b.png', { type: 'image/png' }),
+      ]
+      const mockResponse = {
+        results: [
+          { index: 0, original_filename: 'a.png', filename: '1.jpg', url: '/api/projects/test-project/images/1.jpg', error: null },
+          { index: 1, original_filename: 'b.png', filename: null, url: null, error: 'Failed to save image' },
+        ],
+      }
+
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve(mockResponse),
+      })
+
+      const result = await api.uploadImages('test-project', files)
+
+      expect(mockFetch).toHaveBeenCalledWith(
+        '/api/projects/test-project/images:batch',
+        expect.objectContaining({
+          method: 'POST',
+          body: expect.any(FormData),
+        })
+      )
+      const body = mockFetch.mock.calls[0][1].body as FormData
+      expect(body.getAll('file')).toHaveLength(2)
+      expect(result).toEqual(mockResponse)
+    })
+
+    it('should split drops larger than the server limit and merge the results', async () => {
+      const files = ['a', 'b', 'c', 'd', 'e'].map(name => new File([name], `${name}.png`, { type: 'image/png' }))
+      const saved = (index: number, name: string, filename: string) => ({
+        index, original_filename: name, filename, url: `/api/projects/test-project/images/${filename}`, error: null,
+      })
+
+      mockFetch
+        .mockResolvedValueOnce({
+          ok: true,
+          json: () => Promise.resolve({ results: [saved(0, 'a.png', '1.jpg'), saved(1, 'b.png', '2.jpg')] }),
+        })
+        .mockResolvedValueOnce({
+          ok: false,
+          status: 503,
+          json: () => Promise.resolve({ detail: 'Server busy' }),
+        })
+        .mockResolvedValueOnce({
+          ok: true,
+          json: () => Promise.resolve({ results: [saved(0, 'e.png', '3.jpg')] }),
+        })
+
+      const { results } = await api.uploadImages('test-project', files, 2)
+
+      expect(mockFetch).toHaveBeenCalledTimes(3)
+      expect(mockFetch.mock.calls.map(call => (call[1].body as FormData).getAll('file').length)).toEqual([2, 2, 1])
+      expect(results.map(result => [result.index, result.original_filename, result.filename, result.error])).toEqual([
+        [0, 'a.png', '1.jpg', null],
+        [1, 'b.png', '2.jpg', null],
+        [2, 'c.png', null, 'Server busy'],
+        [3, 'd.png', null, 'Server busy'],
+        [4, 'e.png', '3.jpg', null],
+      ])
+    })
+  })
+
   describe('getProjectDetail', () => {
     it('should get project details successfully', async () => {
       const mockResponse = {
@@ -114,6 +197,23 @@ describe('API', () => {
     })
   })
 
+  describe('listImages', () => {
+    it('should request a page with limit and cursor', async () => {
+      const mockResponse = { images: [], total: 10, next_cursor: null }
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve(mockResponse),
+      })
+
+      const result = await api.listImages('test-project', { limit: 50, cursor: 100 })
+
+      expect(mockFetch).toHaveBeenCalledWith('/api/projects/test-project/images?limit=50&cursor=100', {
+        headers: { 'Content-Type': 'application/json' },
+      })
+      expect(result).toEqual(mockResponse)
+    })
+  })
+
   describe('updateReadme', () => {
     it('should update README successfully', async () => {
       const content = '# Updated README'
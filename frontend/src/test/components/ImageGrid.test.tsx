@@ -50,6 +50,27 @@ describe('ImageGrid', () => {
     expect(deleteButtons).toHaveLength(2)
   })
 
+  it('uses thumbnails in the grid when available', () => {
+    const images: ImageInfo[] = [
+      {
+        filename: '1.jpg',
+        url: '/api/projects/test/images/1.jpg',
+        thumbnail_url: '/api/projects/test/thumbs/320/1.jpg',
+      },
+    ]
+    render(<ImageGrid images={images} onDeleteImage={vi.fn()} />)
+    
+    expect(screen.getByRole('img')).toHaveAttribute('src', '/api/projects/test/thumbs/320/1.jpg')
+  })
+
+  it('offers to load more images when more pages exist', () => {
+    const onLoadMore = vi.fn()
+    render(<ImageGrid images={mockImages} onDeleteImage={vi.fn()} hasMore={true} onLoadMore={onLoadMore} />)
+
+    fireEvent.click(screen.getByText('加载更多'))
+    expect(onLoadMore).toHaveBeenCalled()
+  })
+
   it('handles delete confirmation and calls onDeleteImage', () => {
     const onDeleteImage = vi.fn()
     const mockConfirm = vi.mocked(window.confirm)
@@ -164,6 +164,36 @@ describe('ProjectSelector', () => {
     expect(createButton).toBeDisabled()
   })
 
+  it('searches projects on the server after typing pauses', async () => {
+    const user = userEvent.setup()
+    
+    vi.mocked(api.api.listProjects).mockResolvedValue({
+      projects: ['web-home', 'docs'],
+      total: 2
+    })
+    
+    render(
+      <ProjectSelector 
+        onProjectSelect={mockOnProjectSelect} 
+        onClose={mockOnClose} 
+      />
+    )
+    
+    await waitFor(() => {
+      expect(screen.getByText(/web-home/)).toBeInTheDocument()
+    })
+    
+    await user.type(screen.getByPlaceholderText('搜索项目...'), 'web')
+    
+    await waitFor(() => {
+      expect(api.api.listProjects).toHaveBeenLastCalledWith(
+        expect.objectContaining({ q: 'web', offset: 0 })
+      )
+    })
+    // One request on open and one once typing stopped, not one per keystroke
+    expect(api.api.listProjects).toHaveBeenCalledTimes(2)
+  })
+
   it('handles API errors', async () => {
     vi.mocked(api.api.listProjects).mockRejectedValue(
       new api.ApiError('Network error', 500)
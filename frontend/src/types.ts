@@ -3,15 +3,76 @@ export interface Project {
   created?: boolean;
 }
 
+export interface ProjectSummary {
+  name: string;
+  image_count: number;
+  last_modified: number;
+}
+
+export type ProjectSort = 'name' | 'recent' | 'images';
+
+export interface ProjectListOptions {
+  q?: string;
+  match?: 'prefix' | 'substring';
+  sort?: ProjectSort;
+  limit?: number;
+  offset?: number;
+  details?: boolean;
+}
+
+export interface ProjectList {
+  projects: string[];
+  items?: ProjectSummary[];
+  total: number;
+}
+
 export interface ProjectDetail {
   name: string;
   images: ImageInfo[];
   readme: string;
+  seq?: number;
 }
 
 export interface ImageInfo {
   filename: string;
   url: string;
+  media_type?: string;
+  thumbnail_url?: string;
+  thumbnails?: Record<string, string>;
+  size?: number;
+  width?: number;
+  height?: number;
+  mtime?: number;
+}
+
+export interface ImagePage {
+  images: ImageInfo[];
+  total: number;
+  next_cursor: number | null;
+  seq?: number;
+}
+
+export interface ImageChange {
+  seq: number;
+  type: 'added' | 'deleted';
+  filename: string;
+  image: ImageInfo | null;
+}
+
+export interface ChangeFeed {
+  seq: number;
+  reset: boolean;
+  more: boolean;
+  changes: ImageChange[];
+  readme: string | null;
+}
+
+export interface BatchImageResult {
+  index: number;
+  original_filename: string;
+  filename: string | null;
+  url: string | null;
+  error: string | null;
 }
 
 export interface ApiResponse<T> {